@@ -1,3 +1,4 @@
+import os
 import pickle
 
 import numpy as np
@@ -7,6 +8,9 @@ from numpy.typing import ArrayLike
 from pyter.infer import Inference
 from pyter.models import AbstractModel
 
+from data_io import read_cleaned_data
+from predictive import resolve_predictive_stores
+
 
 def spread_draws(
     posteriors: dict,
@@ -180,12 +184,14 @@ def load_mcmc(path: str) -> Inference:
 
     Returns
     -------
-    The loaded object
+    The loaded object, with its predictive
+    checks read from the directory saved
+    alongside it.
     """
     with open(path, "rb") as file:
         infer = pickle.load(file)
 
-    return infer
+    return resolve_predictive_stores(infer, os.path.dirname(path))
 
 
 def get_sample_index(
@@ -662,7 +668,8 @@ def get_tidy_results(
     ----------
     data_path : str
         Path to the input data, as a delimited
-        text file.
+        text file or a columnar (.parquet or .arrow)
+        file.
 
     titer_infer_path : str
         Path to pickled MCMC results for raw titers.
@@ -684,7 +691,7 @@ def get_tidy_results(
     posterior checks}, plus the data itself
     """
 
-    data = pl.read_csv(data_path, separator=separator)
+    data = read_cleaned_data(data_path, separator=separator)
 
     # if not include_pilot: data = data.filter(~pl.col("is_pilot"))
 
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the parsing of Excel formatted
+titration data
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import polars as pl
+from polars.testing import assert_frame_equal
+
+import clean_data as cd
+
+
+def time_parse(
+    excel_file_path: str,
+    n_repeats: int = 3,
+    **kwargs
+) -> tuple[float, pl.DataFrame]:
+    """
+    Time parse_titration_data() on a single
+    Excel file, keeping the fastest of several
+    repeats.
+
+    Parameters
+    ----------
+    excel_file_path : str
+        Path to the excel file to parse.
+
+    n_repeats : int
+        Number of times to repeat the parse.
+        Default 3.
+
+    **kwargs :
+        Keyword arguments passed to
+        parse_titration_data()
+
+    Returns
+    -------
+    A tuple of the fastest wall-clock time in seconds
+    and the parsed data.
+    """
+    best = float("inf")
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        parsed = cd.parse_titration_data(excel_file_path, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, parsed
+
+
+def measure_parse_memory(
+    excel_file_path: str,
+    **kwargs
+) -> float:
+    """
+    Measure the peak memory allocated while running
+    parse_titration_data() on a single Excel file,
+    as traced by tracemalloc. Run separately from
+    time_parse(), since tracing slows parsing.
+
+    Parameters
+    ----------
+    excel_file_path : str
+        Path to the excel file to parse.
+
+    **kwargs :
+        Keyword arguments passed to
+        parse_titration_data()
+
+    Returns
+    -------
+    The peak traced memory, in MiB.
+    """
+    tracemalloc.start()
+    try:
+        cd.parse_titration_data(excel_file_path, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def make_synthetic_plates(
+    n_plates: int,
+    seed: int = 0,
+) -> list[pd.DataFrame]:
+    """
+    Make synthetic parsed 96-well plates, laid out
+    like the output of parse_plate()[0]: a row label
+    column, 12 well columns of "+" calls and empty
+    wells, and a positive well count column. Each
+    well column is positive down to a random
+    endpoint dilution.
+
+    Parameters
+    ----------
+    n_plates : int
+        Number of plates to make.
+
+    seed : int
+        Seed for the random number generator.
+        Default 0.
+
+    Returns
+    -------
+    A list of Pandas DataFrames, one per plate.
+    """
+    rng = np.random.default_rng(seed)
+    endpoints = rng.integers(0, 9, size=(n_plates, 1, 12))
+    calls = np.arange(8)[np.newaxis, :, np.newaxis] < endpoints
+    columns = ["well_row"] + list(range(1, 13)) + ["positive wells"]
+    return [
+        pd.DataFrame(
+            np.column_stack(
+                [
+                    list("ABCDEFGH"),
+                    np.where(plate_calls, "+", None).astype(object),
+                    np.full(8, None, dtype=object),
+                ]
+            ),
+            columns=columns,
+        )
+        for plate_calls in calls
+    ]
+
+
+def time_plate_conversion(
+    n_plates: int,
+    n_repeats: int = 3,
+) -> pl.DataFrame:
+    """
+    Time the conversion of synthetic plates to
+    long form, plate by plate via clean_single_plate()
+    and in one batch via stack_plates() and
+    clean_plate_batch(), checking that the two
+    agree.
+
+    Parameters
+    ----------
+    n_plates : int
+        Number of synthetic plates to convert.
+
+    n_repeats : int
+        Number of times to repeat each conversion,
+        keeping the fastest. Default 3.
+
+    Returns
+    -------
+    A table of timings, as a polars DataFrame.
+
+    Raises
+    ------
+    AssertionError if the two conversions disagree.
+    """
+    plates = make_synthetic_plates(n_plates)
+    conversions = {
+        "per_plate": lambda: pl.concat(
+            [cd.clean_single_plate(plate) for plate in plates]
+        ),
+        "batched": lambda: cd.clean_plate_batch(
+            *cd.stack_plates(plates)
+        ),
+    }
+
+    rows = []
+    reference = None
+    for name, convert in conversions.items():
+        best = float("inf")
+        for _ in range(n_repeats):
+            start = time.perf_counter()
+            result = convert()
+            best = min(best, time.perf_counter() - start)
+        if reference is None:
+            reference = (best, result)
+        else:
+            assert_frame_equal(result, reference[1])
+        rows.append(
+            {
+                "conversion": name,
+                "n_plates": n_plates,
+                "seconds": best,
+                "plates_per_second": n_plates / best,
+                "speedup": reference[0] / best,
+            }
+        )
+    return pl.DataFrame(rows)
+
+
+def main(
+    excel_file_path_milk: str,
+    excel_file_path_surface: str,
+    excel_file_path_wastewater: str,
+    excel_file_path_rerun: str,
+    backends: list[str] = None,
+    n_repeats: int = 3,
+    n_synthetic_plates: int = None,
+) -> pl.DataFrame:
+    """
+    Time each parser backend on the four Excel files
+    of titration data and measure its peak memory use,
+    checking that all backends produce identical output,
+    and print a table of timings and memory use. Optionally also time the conversion of
+    synthetic plates to long form with
+    time_plate_conversion().
+
+    Parameters
+    ----------
+    excel_file_path_milk: str
+        Path to the excel file with raw milk data
+
+    excel_file_path_surface: str
+        Path to the excel file with surface data
+
+    excel_file_path_wastewater: str
+        Path to the excel file with wastewater
+        and deionized water data
+
+    excel_file_path_rerun: str
+        Path to the excel file with the rerun data
+
+    backends : list[str]
+        Parser backends to compare. The first one
+        is the reference for speedups and output
+        checks. Default ["pandas_per_plate", "pandas",
+        "openpyxl"].
+
+    n_repeats : int
+        Number of times to repeat each parse.
+        Default 3.
+
+    n_synthetic_plates : int
+        Number of synthetic plates for which to time
+        plate conversion. If None, skip. Default None.
+
+    Returns
+    -------
+    The table of parser backend timings and memory
+    use, as a polars DataFrame.
+
+    Raises
+    ------
+    AssertionError if two backends disagree on the
+    parsed output of a file.
+    """
+    if backends is None:
+        backends = ["pandas_per_plate", "pandas", "openpyxl"]
+
+    rows = []
+    for excel_file_path, parse_kwargs in cd.get_workbook_parse_arguments(
+        excel_file_path_milk,
+        excel_file_path_surface,
+        excel_file_path_wastewater,
+        excel_file_path_rerun,
+    ):
+        reference = None
+        for backend in backends:
+            seconds, parsed = time_parse(
+                excel_file_path,
+                n_repeats=n_repeats,
+                backend=backend,
+                **parse_kwargs
+            )
+            if reference is None:
+                reference = (seconds, parsed)
+            else:
+                assert_frame_equal(parsed, reference[1])
+            rows.append(
+                {
+                    "file": excel_file_path,
+                    "backend": backend,
+                    "n_plates": parsed.height // 96,
+                    "seconds": seconds,
+                    "speedup": reference[0] / seconds,
+                    "peak_mib": measure_parse_memory(
+                        excel_file_path,
+                        backend=backend,
+                        **parse_kwargs
+                    ),
+                }
+            )
+
+    tab = pl.DataFrame(rows)
+    with pl.Config(tbl_rows=-1, tbl_width_chars=120, fmt_str_lengths=80):
+        print(tab)
+        if n_synthetic_plates is not None:
+            print(
+                time_plate_conversion(
+                    n_synthetic_plates, n_repeats=n_repeats
+                )
+            )
+    return tab
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Time the parsing of Excel formatted "
+            "titration data with each parser backend, "
+            "and measure its peak memory use"
+        )
+    )
+    parser.add_argument(
+        "excel_file_path_milk",
+        type=str,
+        help="Path to the Excel file of raw milk data",
+    )
+    parser.add_argument(
+        "excel_file_path_surface",
+        type=str,
+        help="Path to the Excel file of surface data",
+    )
+    parser.add_argument(
+        "excel_file_path_wastewater",
+        type=str,
+        help=(
+            "Path to the Excel file of wastewater and "
+            "deionized water data"
+        ),
+    )
+    parser.add_argument(
+        "excel_file_path_rerun",
+        type=str,
+        help="Path to the Excel file of rerun data",
+    )
+    parser.add_argument(
+        "-b",
+        "--backends",
+        type=str,
+        nargs="+",
+        help=(
+            "Parser backends to compare; the first "
+            "is the reference"
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "-n",
+        "--n-repeats",
+        type=int,
+        help="Number of times to repeat each parse",
+        default=3,
+    )
+    parser.add_argument(
+        "--synthetic-plates",
+        type=int,
+        help=(
+            "Also time the conversion of this many "
+            "synthetic plates to long form"
+        ),
+        default=None,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        parsed["excel_file_path_milk"],
+        parsed["excel_file_path_surface"],
+        parsed["excel_file_path_wastewater"],
+        parsed["excel_file_path_rerun"],
+        backends=parsed["backends"],
+        n_repeats=parsed["n_repeats"],
+        n_synthetic_plates=parsed["synthetic_plates"],
+    )
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+"""
+Check that fitting to counts of positive wells
+gives the same posterior as fitting to the
+individual wells, and compare fit times
+"""
+
+import argparse
+import os
+
+import numpy as np
+import polars as pl
+import toml
+
+from benchmark_fit import get_min_ess
+from compilation import FitTimer
+from config import get_model_parameter
+from data_io import read_cleaned_data
+from model_factory import model_factory
+from sampling import build_inference
+
+
+def get_max_standardized_difference(
+    samples: dict,
+    reference_samples: dict,
+    quantiles: list[float] = None,
+) -> float:
+    """
+    Get the largest difference between posterior
+    quantiles of two fits, over all parameters, in
+    units of the reference posterior standard deviation.
+
+    Parameters
+    ----------
+    samples : dict
+        Posterior samples, as output by
+        MCMC.get_samples().
+
+    reference_samples : dict
+        Posterior samples to compare to.
+
+    quantiles : list[float]
+        Quantiles to compare. Default
+        [0.05, 0.5, 0.95].
+
+    Returns
+    -------
+    The largest standardized difference.
+    """
+    if quantiles is None:
+        quantiles = [0.05, 0.5, 0.95]
+    max_difference = 0.0
+    for name, reference in reference_samples.items():
+        reference = np.asarray(reference)
+        difference = np.abs(
+            np.quantile(np.asarray(samples[name]), quantiles, axis=0)
+            - np.quantile(reference, quantiles, axis=0)
+        ) / np.std(reference, axis=0)
+        max_difference = max(max_difference, float(np.max(difference)))
+    return max_difference
+
+
+def main(
+    data_path: str,
+    mcmc_config_path: str,
+    prior_config_dir: str,
+    model_names: list[str] = None,
+    save_path: str = None,
+    separator: str = "\t",
+) -> pl.DataFrame:
+    """
+    Fit each model to the individual wells and to
+    counts of positive wells, and print a table of the
+    number of likelihood terms, wall-clock time, ESS per
+    second, and the largest difference between the
+    posterior quantiles of the two fits, in posterior
+    standard deviations (see
+    get_max_standardized_difference()). Differences
+    should be within Monte Carlo error.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to the cleaned data to fit to.
+
+    mcmc_config_path : str
+        Path to a TOML-formatted configuration
+        file specifying parameters for the MCMC.
+
+    prior_config_dir : str
+        Directory holding the prior configuration
+        for each model, as priors_<model_name>.toml.
+
+    model_names : list[str]
+        Models to check. Default
+        ["individual_titer", "halflife"].
+
+    save_path : str
+        If given, also save the table of results
+        as a .tsv file to this path. Default None.
+
+    separator : str
+        Separator for the delimited data
+        text file. Default '\t'.
+
+    Returns
+    -------
+    The table of results, as a polars DataFrame.
+    """
+    if model_names is None:
+        model_names = ["individual_titer", "halflife"]
+
+    mcmc_config = toml.load(mcmc_config_path)
+    data = read_cleaned_data(data_path, separator=separator)
+    timer = FitTimer()
+    rows = []
+    for model_name in model_names:
+        prior_params = toml.load(
+            os.path.join(
+                prior_config_dir, "priors_{}.toml".format(model_name)
+            )
+        )
+        n_chains = get_model_parameter(mcmc_config, model_name, "n_chains")
+
+        reference_samples = None
+        for compress_wells in [False, True]:
+            m_data, model = model_factory(
+                model_name,
+                data,
+                prior_params,
+                compress_wells=compress_wells,
+            )
+            infer = build_inference(mcmc_config, model_name)
+            with timer.phase(
+                "{}-{}".format(
+                    model_name, "counts" if compress_wells else "wells"
+                )
+            ):
+                infer.infer(
+                    data=m_data,
+                    model=model,
+                    random_seed=get_model_parameter(
+                        mcmc_config, model_name, "seed"
+                    ),
+                    num_chains=n_chains,
+                    chain_method="sequential",
+                )
+            timing = timer.phases[-1]
+            samples = infer.mcmc_runner.get_samples()
+            if reference_samples is None:
+                reference_samples = samples
+            min_ess, _ = get_min_ess(
+                infer.mcmc_runner.get_samples(group_by_chain=True)
+            )
+            rows.append(
+                {
+                    "model": model_name,
+                    "compress_wells": compress_wells,
+                    "n_terms": (
+                        model.n_wells.size
+                        if compress_wells
+                        else data.height
+                    ),
+                    "seconds": timing["seconds"],
+                    "ess_per_second": min_ess / timing["seconds"],
+                    "max_standardized_difference": (
+                        get_max_standardized_difference(
+                            samples, reference_samples
+                        )
+                    ),
+                }
+            )
+
+    tab = pl.DataFrame(rows)
+    with pl.Config(tbl_rows=-1, tbl_width_chars=120):
+        print(tab)
+    if save_path is not None:
+        tab.write_csv(save_path, separator="\t")
+    return tab
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare posteriors and fit times of each "
+            "model fit to individual wells and to counts "
+            "of positive wells"
+        )
+    )
+    parser.add_argument(
+        "data_path",
+        type=str,
+        help="Path to the cleaned data to fit to",
+    )
+    parser.add_argument(
+        "mcmc_config_path",
+        type=str,
+        help=(
+            "Path to a TOML-formatted configuration file "
+            "specifying configuration for the mcmc"
+        ),
+    )
+    parser.add_argument(
+        "prior_config_dir",
+        type=str,
+        help=(
+            "Directory of TOML-formatted prior configuration "
+            "files, named priors_<model_name>.toml"
+        ),
+    )
+    parser.add_argument(
+        "-m",
+        "--models",
+        type=str,
+        nargs="+",
+        help="Models to compare",
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--save-path",
+        type=str,
+        help="Path to save the table of results (.tsv)",
+        default=None,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        parsed["data_path"],
+        parsed["mcmc_config_path"],
+        parsed["prior_config_dir"],
+        model_names=parsed["models"],
+        save_path=parsed["save_path"],
+    )
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the wall-clock time and sampling
+efficiency of each multi-chain method
+when fitting each model
+"""
+
+import argparse
+import os
+
+import numpy as np
+import numpyro
+import polars as pl
+import toml
+from numpyro.diagnostics import summary
+
+from compilation import FitTimer, enable_compilation_cache
+from config import get_model_parameter
+from data_io import read_cleaned_data
+from sampling import CHAIN_METHODS, build_model, run_inference
+
+
+def get_min_ess(samples: dict) -> tuple[float, str]:
+    """
+    Get the smallest bulk effective sample size
+    among all scalar parameters of a fit.
+
+    Parameters
+    ----------
+    samples : dict
+        Posterior samples grouped by chain, as
+        output by MCMC.get_samples(group_by_chain=True).
+
+    Returns
+    -------
+    A tuple of the smallest effective sample size
+    and the name of the parameter with it.
+    """
+    min_ess = float("inf")
+    min_name = None
+    for name, stats in summary(samples).items():
+        ess = float(np.min(stats["n_eff"]))
+        if ess < min_ess:
+            min_ess = ess
+            min_name = name
+    return (min_ess, min_name)
+
+
+def main(
+    data_path: str,
+    mcmc_config_path: str,
+    prior_config_dir: str,
+    model_names: list[str] = None,
+    chain_methods: list[str] = None,
+    save_path: str = None,
+    separator: str = "\t",
+) -> pl.DataFrame:
+    """
+    Fit each model with each chain method, and print
+    a table of wall-clock time, time spent compiling,
+    smallest effective sample size (ESS) among the
+    parameters, ESS per second, and divergences.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to the cleaned data to fit to.
+
+    mcmc_config_path : str
+        Path to a TOML-formatted configuration
+        file specifying parameters for the MCMC.
+
+    prior_config_dir : str
+        Directory holding the prior configuration
+        for each model, as priors_<model_name>.toml.
+
+    model_names : list[str]
+        Models to benchmark. Default
+        ["individual_titer", "halflife"].
+
+    chain_methods : list[str]
+        Chain methods to benchmark; see
+        sampling.get_chain_method(). Default all
+        of sampling.CHAIN_METHODS.
+
+    save_path : str
+        If given, also save the table of results
+        as a .tsv file to this path. Default None.
+
+    separator : str
+        Separator for the delimited data
+        text file. Default '\t'.
+
+    Returns
+    -------
+    The table of results, as a polars DataFrame.
+    """
+    if model_names is None:
+        model_names = ["individual_titer", "halflife"]
+    if chain_methods is None:
+        chain_methods = CHAIN_METHODS
+
+    mcmc_config = toml.load(mcmc_config_path)
+    # enough host devices for parallel chains
+    # with any of the models
+    numpyro.set_host_device_count(
+        max(
+            get_model_parameter(mcmc_config, model_name, "n_chains")
+            for model_name in model_names
+        )
+    )
+    compilation_cache_dir = get_model_parameter(
+        mcmc_config, "default", "compilation_cache_dir", strict=False
+    )
+    if compilation_cache_dir is not None:
+        enable_compilation_cache(compilation_cache_dir)
+
+    data = read_cleaned_data(data_path, separator=separator)
+    timer = FitTimer()
+    rows = []
+    for model_name in model_names:
+        prior_params = toml.load(
+            os.path.join(
+                prior_config_dir, "priors_{}.toml".format(model_name)
+            )
+        )
+        m_data, model = build_model(
+            data, mcmc_config, prior_params, model_name
+        )
+        n_chains = get_model_parameter(mcmc_config, model_name, "n_chains")
+
+        for chain_method in chain_methods:
+            print(
+                "Fitting {} with {} chains...".format(
+                    model_name, chain_method
+                )
+            )
+            with timer.phase("{}-{}".format(model_name, chain_method)):
+                infer = run_inference(
+                    data,
+                    mcmc_config,
+                    prior_params,
+                    model_name,
+                    n_chains,
+                    get_model_parameter(mcmc_config, model_name, "seed"),
+                    chain_method,
+                    m_data=m_data,
+                    model=model,
+                )
+            timing = timer.phases[-1]
+            min_ess, min_ess_parameter = get_min_ess(
+                infer.mcmc_runner.get_samples(group_by_chain=True)
+            )
+            rows.append(
+                {
+                    "model": model_name,
+                    "chain_method": chain_method,
+                    "n_chains": n_chains,
+                    "seconds": timing["seconds"],
+                    "compile_seconds": timing["compile_seconds"],
+                    "min_ess": min_ess,
+                    "min_ess_parameter": min_ess_parameter,
+                    "ess_per_second": min_ess / timing["seconds"],
+                    "n_divergent": int(
+                        np.sum(
+                            infer.mcmc_runner.get_extra_fields()[
+                                "diverging"
+                            ]
+                        )
+                    ),
+                }
+            )
+
+    tab = pl.DataFrame(rows)
+    with pl.Config(tbl_rows=-1, tbl_width_chars=120, fmt_str_lengths=40):
+        print(tab)
+    if save_path is not None:
+        tab.write_csv(save_path, separator="\t")
+    return tab
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark wall-clock time and effective "
+            "samples per second of each chain method "
+            "for each model"
+        )
+    )
+    parser.add_argument(
+        "data_path",
+        type=str,
+        help="Path to the cleaned data to fit to",
+    )
+    parser.add_argument(
+        "mcmc_config_path",
+        type=str,
+        help=(
+            "Path to a TOML-formatted configuration file "
+            "specifying configuration for the mcmc"
+        ),
+    )
+    parser.add_argument(
+        "prior_config_dir",
+        type=str,
+        help=(
+            "Directory of TOML-formatted prior configuration "
+            "files, named priors_<model_name>.toml"
+        ),
+    )
+    parser.add_argument(
+        "-m",
+        "--models",
+        type=str,
+        nargs="+",
+        help="Models to benchmark",
+        default=None,
+    )
+    parser.add_argument(
+        "-c",
+        "--chain-methods",
+        type=str,
+        nargs="+",
+        choices=CHAIN_METHODS,
+        help="Chain methods to benchmark",
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--save-path",
+        type=str,
+        help="Path to save the table of results (.tsv)",
+        default=None,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        parsed["data_path"],
+        parsed["mcmc_config_path"],
+        parsed["prior_config_dir"],
+        model_names=parsed["models"],
+        chain_methods=parsed["chain_methods"],
+        save_path=parsed["save_path"],
+    )
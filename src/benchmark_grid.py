@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+"""
+Check that grid fits of the individual titer
+model match MCMC fits, and compare fit times
+"""
+
+import argparse
+import os
+
+import polars as pl
+import toml
+
+from benchmark_compression import get_max_standardized_difference
+from benchmark_fit import get_min_ess
+from compilation import FitTimer, enable_compilation_cache
+from config import get_model_parameter
+from data_io import read_cleaned_data
+from grid_posterior import GRID_MODELS, fit_grid
+from sampling import build_model, run_inference
+
+
+def main(
+    data_path: str,
+    mcmc_config_path: str,
+    prior_config_dir: str,
+    model_names: list[str] = None,
+    save_path: str = None,
+    separator: str = "\t",
+) -> pl.DataFrame:
+    """
+    Fit each model with MCMC and on a grid (see
+    grid_posterior.fit_grid()), and print a table of the
+    wall-clock time, ESS per second, and the largest
+    difference between the posterior quantiles of the
+    grid fit and those of the MCMC fit, in posterior
+    standard deviations (see
+    benchmark_compression.get_max_standardized_difference()).
+    Differences should be within Monte Carlo error.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to the cleaned data to fit to.
+
+    mcmc_config_path : str
+        Path to a TOML-formatted configuration
+        file specifying parameters for the MCMC.
+
+    prior_config_dir : str
+        Directory holding the prior configuration
+        for each model, as priors_<model_name>.toml.
+
+    model_names : list[str]
+        Models to check. Default
+        grid_posterior.GRID_MODELS.
+
+    save_path : str
+        If given, also save the table of results
+        as a .tsv file to this path. Default None.
+
+    separator : str
+        Separator for the delimited data
+        text file. Default '\t'.
+
+    Returns
+    -------
+    The table of results, as a polars DataFrame.
+    """
+    if model_names is None:
+        model_names = GRID_MODELS
+
+    mcmc_config = toml.load(mcmc_config_path)
+    compilation_cache_dir = get_model_parameter(
+        mcmc_config, "default", "compilation_cache_dir", strict=False
+    )
+    if compilation_cache_dir is not None:
+        enable_compilation_cache(compilation_cache_dir)
+
+    data = read_cleaned_data(data_path, separator=separator)
+    timer = FitTimer()
+    rows = []
+    for model_name in model_names:
+        prior_params = toml.load(
+            os.path.join(
+                prior_config_dir, "priors_{}.toml".format(model_name)
+            )
+        )
+        m_data, model = build_model(
+            data, mcmc_config, prior_params, model_name
+        )
+        n_chains = get_model_parameter(mcmc_config, model_name, "n_chains")
+        seed = get_model_parameter(mcmc_config, model_name, "seed")
+
+        reference_samples = None
+        for engine in ["nuts", "grid"]:
+            print("Fitting {} with {}...".format(model_name, engine))
+            with timer.phase("{}-{}".format(model_name, engine)):
+                if engine == "nuts":
+                    infer = run_inference(
+                        data,
+                        mcmc_config,
+                        prior_params,
+                        model_name,
+                        n_chains,
+                        seed,
+                        "sequential",
+                        m_data=m_data,
+                        model=model,
+                    )
+                else:
+                    infer = fit_grid(
+                        data,
+                        m_data,
+                        model,
+                        mcmc_config,
+                        model_name,
+                        n_chains,
+                        seed,
+                    )
+            timing = timer.phases[-1]
+            samples = infer.mcmc_runner.get_samples()
+            if reference_samples is None:
+                reference_samples = samples
+            min_ess, _ = get_min_ess(
+                infer.mcmc_runner.get_samples(group_by_chain=True)
+            )
+            rows.append(
+                {
+                    "model": model_name,
+                    "engine": engine,
+                    "seconds": timing["seconds"],
+                    "ess_per_second": min_ess / timing["seconds"],
+                    "max_standardized_difference": (
+                        get_max_standardized_difference(
+                            samples, reference_samples
+                        )
+                    ),
+                }
+            )
+
+    tab = pl.DataFrame(rows)
+    with pl.Config(tbl_rows=-1, tbl_width_chars=120):
+        print(tab)
+    if save_path is not None:
+        tab.write_csv(save_path, separator="\t")
+    return tab
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare posteriors and fit times of grid "
+            "and MCMC fits of the individual titer model"
+        )
+    )
+    parser.add_argument(
+        "data_path",
+        type=str,
+        help="Path to the cleaned data to fit to",
+    )
+    parser.add_argument(
+        "mcmc_config_path",
+        type=str,
+        help=(
+            "Path to a TOML-formatted configuration file "
+            "specifying configuration for the mcmc"
+        ),
+    )
+    parser.add_argument(
+        "prior_config_dir",
+        type=str,
+        help=(
+            "Directory of TOML-formatted prior configuration "
+            "files, named priors_<model_name>.toml"
+        ),
+    )
+    parser.add_argument(
+        "-m",
+        "--models",
+        type=str,
+        nargs="+",
+        choices=GRID_MODELS,
+        help="Models to compare",
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--save-path",
+        type=str,
+        help="Path to save the table of results (.tsv)",
+        default=None,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        parsed["data_path"],
+        parsed["mcmc_config_path"],
+        parsed["prior_config_dir"],
+        model_names=parsed["models"],
+        save_path=parsed["save_path"],
+    )
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark how the parsing of Excel formatted
+titration data scales, using synthetic workbooks
+of increasing size
+"""
+
+import argparse
+import os
+import tempfile
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from benchmark_clean_data import measure_parse_memory, time_parse
+from make_synthetic_workbook import write_synthetic_workbook
+
+
+def benchmark_workbook(
+    excel_file_path: str,
+    column_span: str,
+    backends: list[str],
+    n_repeats: int = 3,
+) -> list[dict]:
+    """
+    Time each parser backend on a single synthetic
+    workbook and measure its peak memory use,
+    checking that all backends produce identical
+    output.
+
+    Parameters
+    ----------
+    excel_file_path : str
+        Path to the synthetic workbook.
+
+    column_span : str
+        Column span of its plates, passed to the
+        parser as usecols.
+
+    backends : list[str]
+        Parser backends to benchmark; see
+        clean_data.iter_sheet_plates().
+
+    n_repeats : int
+        Number of times to repeat each parse,
+        keeping the fastest. Default 3.
+
+    Returns
+    -------
+    A list of results, one dict per backend.
+
+    Raises
+    ------
+    AssertionError if two backends disagree on the
+    parsed output.
+    """
+    parse_kwargs = dict(
+        metadata_row_offset=-1,
+        virus_name="synthetic",
+        usecols=column_span,
+    )
+    rows = []
+    reference = None
+    for backend in backends:
+        seconds, parsed = time_parse(
+            excel_file_path,
+            n_repeats=n_repeats,
+            backend=backend,
+            **parse_kwargs
+        )
+        if reference is None:
+            reference = parsed
+        else:
+            assert_frame_equal(parsed, reference)
+        n_plates = parsed.height // 96
+        rows.append(
+            {
+                "column_span": column_span,
+                "backend": backend,
+                "n_plates": n_plates,
+                "seconds": seconds,
+                "plates_per_second": n_plates / seconds,
+                "peak_mib": measure_parse_memory(
+                    excel_file_path,
+                    backend=backend,
+                    **parse_kwargs
+                ),
+            }
+        )
+    return rows
+
+
+def main(
+    plates_per_sheet: list[int],
+    backends: list[str] = None,
+    column_spans: list[str] = None,
+    media: list[str] = None,
+    temperatures: list[str] = None,
+    n_repeats: int = 3,
+    save_path: str = None,
+    workbook_dir: str = None,
+) -> pl.DataFrame:
+    """
+    Write synthetic workbooks with increasing numbers
+    of plates, benchmark each parser backend on each
+    with benchmark_workbook(), and print a table of
+    parse throughput (plates per second) and peak
+    memory use.
+
+    Parameters
+    ----------
+    plates_per_sheet : list[int]
+        Workbook sizes to benchmark, as numbers of
+        plates (timepoints) per sheet.
+
+    backends : list[str]
+        Parser backends to benchmark. Default
+        ["pandas", "openpyxl"].
+
+    column_spans : list[str]
+        Column spans of the synthetic plates to
+        benchmark. Default ["A:N", "B:O"].
+
+    media : list[str]
+        Media of the synthetic workbooks, one sheet
+        each per temperature. Default ["raw milk", "steel"].
+
+    temperatures : list[str]
+        Temperatures of the synthetic workbooks, one
+        sheet each per medium. Default ["4C", "22C"].
+
+    n_repeats : int
+        Number of times to repeat each parse,
+        keeping the fastest. Default 3.
+
+    save_path : str
+        If given, also save the table of results
+        as a .tsv file to this path. Default None.
+
+    workbook_dir : str
+        Directory in which to keep the synthetic
+        workbooks. If None, write them to a temporary
+        directory that is removed afterwards. Default None.
+
+    Returns
+    -------
+    The table of results, as a polars DataFrame.
+    """
+    if backends is None:
+        backends = ["pandas", "openpyxl"]
+    if column_spans is None:
+        column_spans = ["A:N", "B:O"]
+    if media is None:
+        media = ["raw milk", "steel"]
+    if temperatures is None:
+        temperatures = ["4C", "22C"]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if workbook_dir is None:
+            workbook_dir = temp_dir
+        os.makedirs(workbook_dir, exist_ok=True)
+
+        rows = []
+        for n_plates in plates_per_sheet:
+            for column_span in column_spans:
+                excel_file_path = os.path.join(
+                    workbook_dir,
+                    "synthetic_{}_{}.xlsx".format(
+                        n_plates, column_span.replace(":", "")
+                    ),
+                )
+                write_synthetic_workbook(
+                    excel_file_path,
+                    media,
+                    temperatures,
+                    ["{}h".format(6 * i) for i in range(n_plates)],
+                    column_span=column_span,
+                )
+                rows.extend(
+                    benchmark_workbook(
+                        excel_file_path,
+                        column_span,
+                        backends,
+                        n_repeats=n_repeats,
+                    )
+                )
+
+    tab = pl.DataFrame(rows)
+    with pl.Config(tbl_rows=-1, tbl_width_chars=120):
+        print(tab)
+    if save_path is not None:
+        tab.write_csv(save_path, separator="\t")
+    return tab
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark parse throughput and peak memory "
+            "of each parser backend on synthetic "
+            "titration workbooks of increasing size"
+        )
+    )
+    parser.add_argument(
+        "-p",
+        "--plates-per-sheet",
+        type=int,
+        nargs="+",
+        help="Workbook sizes, as numbers of plates per sheet",
+        default=[16, 64, 256],
+    )
+    parser.add_argument(
+        "-b",
+        "--backends",
+        type=str,
+        nargs="+",
+        help=(
+            "Parser backends to benchmark; the first "
+            "is the reference for output checks"
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--column-spans",
+        type=str,
+        nargs="+",
+        choices=["A:N", "B:O"],
+        help="Column spans of the synthetic plates",
+        default=None,
+    )
+    parser.add_argument(
+        "--media",
+        type=str,
+        nargs="+",
+        help="Media of the synthetic workbooks",
+        default=None,
+    )
+    parser.add_argument(
+        "--temperatures",
+        type=str,
+        nargs="+",
+        help="Temperatures of the synthetic workbooks",
+        default=None,
+    )
+    parser.add_argument(
+        "-n",
+        "--n-repeats",
+        type=int,
+        help="Number of times to repeat each parse",
+        default=3,
+    )
+    parser.add_argument(
+        "-o",
+        "--save-path",
+        type=str,
+        help="Path to save the table of results (.tsv)",
+        default=None,
+    )
+    parser.add_argument(
+        "--workbook-dir",
+        type=str,
+        help=(
+            "Directory in which to keep the synthetic "
+            "workbooks (default: a temporary directory)"
+        ),
+        default=None,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        parsed["plates_per_sheet"],
+        backends=parsed["backends"],
+        column_spans=parsed["column_spans"],
+        media=parsed["media"],
+        temperatures=parsed["temperatures"],
+        n_repeats=parsed["n_repeats"],
+        save_path=parsed["save_path"],
+        workbook_dir=parsed["workbook_dir"],
+    )
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark fitting each model in float32
+and in float64, and check how much the
+posterior medians differ between the two
+"""
+
+import argparse
+import os
+
+import numpy as np
+import polars as pl
+import toml
+
+from benchmark_fit import get_min_ess
+from compilation import (
+    PRECISIONS,
+    FitTimer,
+    enable_compilation_cache,
+    set_precision,
+)
+from config import get_model_parameter
+from data_io import read_cleaned_data
+from sampling import build_model, get_chain_method, run_inference
+
+
+def get_max_median_difference(
+    samples: dict,
+    reference_samples: dict,
+    sites: list[str],
+) -> float:
+    """
+    Get the largest absolute difference between the
+    posterior medians of two fits, over all elements
+    of the given sites.
+
+    Parameters
+    ----------
+    samples : dict
+        Posterior samples, as output by
+        MCMC.get_samples().
+
+    reference_samples : dict
+        Posterior samples to compare to.
+
+    sites : list[str]
+        Sites to compare. Sites missing from
+        either fit are skipped.
+
+    Returns
+    -------
+    The largest difference, or None if
+    no site is in both fits.
+    """
+    differences = [
+        float(
+            np.max(
+                np.abs(
+                    np.median(np.asarray(samples[site]), axis=0)
+                    - np.median(np.asarray(reference_samples[site]), axis=0)
+                )
+            )
+        )
+        for site in sites
+        if site in samples and site in reference_samples
+    ]
+    return max(differences) if differences else None
+
+
+def main(
+    data_path: str,
+    mcmc_config_path: str,
+    prior_config_dir: str,
+    model_names: list[str] = None,
+    sites: list[str] = None,
+    save_path: str = None,
+    separator: str = "\t",
+) -> pl.DataFrame:
+    """
+    Fit each model at each of compilation.PRECISIONS,
+    with the chain method in the MCMC configuration, and
+    print a table of wall-clock time, time spent compiling,
+    ESS per second, divergences, and the largest difference
+    between the posterior medians of the given sites and
+    those of the float64 fit (see get_max_median_difference()).
+    The two fits draw different random numbers, so
+    differences include Monte Carlo error.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to the cleaned data to fit to.
+
+    mcmc_config_path : str
+        Path to a TOML-formatted configuration
+        file specifying parameters for the MCMC.
+
+    prior_config_dir : str
+        Directory holding the prior configuration
+        for each model, as priors_<model_name>.toml.
+
+    model_names : list[str]
+        Models to benchmark. Default ["halflife"].
+
+    sites : list[str]
+        Sites whose posterior medians to compare.
+        Default ["log_halflife"].
+
+    save_path : str
+        If given, also save the table of results
+        as a .tsv file to this path. Default None.
+
+    separator : str
+        Separator for the delimited data
+        text file. Default '\t'.
+
+    Returns
+    -------
+    The table of results, as a polars DataFrame.
+    """
+    if model_names is None:
+        model_names = ["halflife"]
+    if sites is None:
+        sites = ["log_halflife"]
+
+    mcmc_config = toml.load(mcmc_config_path)
+    compilation_cache_dir = get_model_parameter(
+        mcmc_config, "default", "compilation_cache_dir", strict=False
+    )
+    if compilation_cache_dir is not None:
+        enable_compilation_cache(compilation_cache_dir)
+
+    data = read_cleaned_data(data_path, separator=separator)
+    timer = FitTimer()
+    rows = []
+    for model_name in model_names:
+        prior_params = toml.load(
+            os.path.join(
+                prior_config_dir, "priors_{}.toml".format(model_name)
+            )
+        )
+        n_chains = get_model_parameter(mcmc_config, model_name, "n_chains")
+        chain_method = get_chain_method(
+            n_chains,
+            get_model_parameter(
+                mcmc_config, model_name, "n_cores", strict=False
+            )
+            or 1,
+            get_model_parameter(
+                mcmc_config, model_name, "chain_method", strict=False
+            ),
+        )
+
+        samples = {}
+        # fit float64 first, as the reference
+        for precision in reversed(PRECISIONS):
+            print("Fitting {} in {}...".format(model_name, precision))
+            # set the precision in the configuration too,
+            # for fits in worker processes
+            precision_config = dict(
+                mcmc_config,
+                **{
+                    model_name: dict(
+                        mcmc_config.get(model_name, {}),
+                        precision=precision,
+                    )
+                },
+            )
+            set_precision(precision)
+            m_data, model = build_model(
+                data, precision_config, prior_params, model_name
+            )
+            with timer.phase("{}-{}".format(model_name, precision)):
+                infer = run_inference(
+                    data,
+                    precision_config,
+                    prior_params,
+                    model_name,
+                    n_chains,
+                    get_model_parameter(mcmc_config, model_name, "seed"),
+                    chain_method,
+                    m_data=m_data,
+                    model=model,
+                )
+            timing = timer.phases[-1]
+            samples[precision] = infer.mcmc_runner.get_samples()
+            min_ess, _ = get_min_ess(
+                infer.mcmc_runner.get_samples(group_by_chain=True)
+            )
+            rows.append(
+                {
+                    "model": model_name,
+                    "precision": precision,
+                    "chain_method": chain_method,
+                    "seconds": timing["seconds"],
+                    "compile_seconds": timing["compile_seconds"],
+                    "ess_per_second": min_ess / timing["seconds"],
+                    "n_divergent": int(
+                        np.sum(
+                            infer.mcmc_runner.get_extra_fields()[
+                                "diverging"
+                            ]
+                        )
+                    ),
+                    "max_median_difference": get_max_median_difference(
+                        samples[precision], samples["float64"], sites
+                    ),
+                }
+            )
+    set_precision()
+
+    tab = pl.DataFrame(rows)
+    with pl.Config(tbl_rows=-1, tbl_width_chars=120):
+        print(tab)
+    if save_path is not None:
+        tab.write_csv(save_path, separator="\t")
+    return tab
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare fit times, divergences, and posterior "
+            "medians of each model fit in float32 and float64"
+        )
+    )
+    parser.add_argument(
+        "data_path",
+        type=str,
+        help="Path to the cleaned data to fit to",
+    )
+    parser.add_argument(
+        "mcmc_config_path",
+        type=str,
+        help=(
+            "Path to a TOML-formatted configuration file "
+            "specifying configuration for the mcmc"
+        ),
+    )
+    parser.add_argument(
+        "prior_config_dir",
+        type=str,
+        help=(
+            "Directory of TOML-formatted prior configuration "
+            "files, named priors_<model_name>.toml"
+        ),
+    )
+    parser.add_argument(
+        "-m",
+        "--models",
+        type=str,
+        nargs="+",
+        help="Models to benchmark",
+        default=None,
+    )
+    parser.add_argument(
+        "--sites",
+        type=str,
+        nargs="+",
+        help="Sites whose posterior medians to compare",
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--save-path",
+        type=str,
+        help="Path to save the table of results (.tsv)",
+        default=None,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        parsed["data_path"],
+        parsed["mcmc_config_path"],
+        parsed["prior_config_dir"],
+        model_names=parsed["models"],
+        sites=parsed["sites"],
+        save_path=parsed["save_path"],
+    )
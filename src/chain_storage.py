@@ -0,0 +1,170 @@
+"""
+Helper functions for shrinking fits before
+they are saved: keeping only some sample
+sites, thinning draws, and storing draws
+at a lower precision
+"""
+
+import copy
+
+import jax
+import numpy as np
+from pyter.infer import Inference
+
+
+def get_storage_dtype(dtype: str = None):
+    """
+    Get the numpy dtype in which to store
+    floating point draws.
+
+    Parameters
+    ----------
+    dtype : str
+        Name of a floating point numpy dtype,
+        e.g. "float32" or "float16", or None
+        to keep draws as they are. Default None.
+
+    Returns
+    -------
+    The numpy dtype, or None.
+
+    Raises
+    ------
+    ValueError if dtype is not a floating
+    point dtype.
+    """
+    if dtype is None:
+        return None
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.floating):
+        raise ValueError(
+            "Storage dtype must be a floating point "
+            "dtype; got '{}'".format(dtype)
+        )
+    return dtype
+
+
+def cast_floating(values, dtype=None):
+    """
+    Cast an array to a storage dtype if it
+    holds floating point values, and otherwise
+    (or if dtype is None) leave it as it is.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array to cast.
+
+    dtype :
+        Storage dtype, as output by
+        get_storage_dtype(). Default None.
+
+    Returns
+    -------
+    The array.
+    """
+    if dtype is None or not np.issubdtype(values.dtype, np.floating):
+        return values
+    return values.astype(dtype)
+
+
+def prune_inference(
+    infer: Inference,
+    sites: list[str] = None,
+    thin: int = 1,
+    dtype: str = None,
+    offset: int = 0,
+) -> Inference:
+    """
+    Shrink a fit by keeping only some sample sites,
+    keeping only every thin-th draw of each chain,
+    and casting floating point draws to a storage
+    dtype. Extra fields (e.g. diverging) are thinned
+    and cast, but always kept.
+
+    A pruned fit's MCMC runner reports the draws it
+    keeps as its num_samples, unthinned, so that it
+    supports get_samples(), get_extra_fields(), and
+    arviz.from_numpyro() (see check_pruned_fits.py),
+    but it cannot be resumed with MCMC.run(). If only
+    some sites are kept, arviz.from_numpyro() needs
+    log_likelihood=False, as the model's likelihood
+    depends on sites that were dropped.
+
+    Parameters
+    ----------
+    infer : Inference
+        The fit.
+
+    sites : list[str]
+        Sites to keep. Sites not in the fit are
+        ignored. If None, keep all sites. Default None.
+
+    thin : int
+        Keep every thin-th draw. Default 1
+        (keep all draws).
+
+    dtype : str
+        Name of a floating point dtype in which
+        to store draws; see get_storage_dtype().
+        If None, keep the dtype. Default None.
+
+    offset : int
+        Index of the first draw of each chain to keep,
+        e.g. to thin an extension of a fit in step with
+        the fit. Default 0.
+
+    Returns
+    -------
+    A pruned copy of the fit.
+    """
+    dtype = get_storage_dtype(dtype)
+    if sites is None and thin == 1 and dtype is None and offset == 0:
+        return infer
+    runner = copy.copy(infer.mcmc_runner)
+    pruned = copy.copy(infer)
+    pruned.mcmc_runner = runner
+    sample_field = runner._sample_field
+
+    def prune_field(values):
+        return jax.tree_util.tree_map(
+            lambda states: cast_floating(
+                np.asarray(states[:, offset::thin]), dtype
+            ),
+            values,
+        )
+
+    states = {}
+    for field, values in runner._states.items():
+        if field == sample_field and sites is not None:
+            values = {
+                name: site_values
+                for name, site_values in values.items()
+                if name in sites
+            }
+        states[field] = prune_field(values)
+    runner._states = states
+    # arviz.from_numpyro() takes the draws per chain
+    # to be num_samples // thinning
+    runner.num_samples = int(
+        np.shape(jax.tree_util.tree_leaves(states[sample_field])[0])[1]
+    )
+    runner.thinning = 1
+    # draws are on the host, so keep them there
+    runner._states_flat = jax.tree_util.tree_map(
+        lambda states: np.reshape(states, (-1,) + states.shape[2:]),
+        states,
+    )
+    if sites is not None:
+        runner._last_state = runner._last_state._replace(
+            **{
+                sample_field: {
+                    name: site_values
+                    for name, site_values in getattr(
+                        runner._last_state, sample_field
+                    ).items()
+                    if name in sites
+                }
+            }
+        )
+    return pruned
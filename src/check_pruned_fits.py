@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+"""
+Check, on a small simulated fit and without Pyter,
+that fits shrunk with chain_storage.prune_inference()
+and fits extended with resume.append_draws() still
+convert to arviz InferenceData with
+arviz.from_numpyro(), as table_diagnostics.py needs,
+for a range of thinning intervals
+"""
+
+import argparse
+from types import SimpleNamespace
+
+import arviz as az
+import jax
+import jax.numpy as jnp
+import numpy as np
+import numpyro
+import numpyro.distributions as dist
+from numpyro.infer import MCMC, NUTS
+
+from chain_storage import prune_inference
+from resume import append_draws, extend_runner
+
+
+def normal_model(obs=None, n_params: int = 3):
+    """
+    numpyro model with normal means, one per
+    observation, and a normal scale parameter, so
+    that arviz.from_numpyro() also computes a
+    log likelihood of each observation.
+
+    Parameters
+    ----------
+    obs : array-like
+        Observations, n_params of them.
+        Default None.
+
+    n_params : int
+        Number of means. Default 3.
+    """
+    x = numpyro.sample("x", dist.Normal(0.0, 1.0).expand([n_params]))
+    y = numpyro.sample("y", dist.Normal(0.0, 1.0))
+    numpyro.sample("obs", dist.Normal(x, jnp.exp(y)), obs=obs)
+
+
+def fit_normal_model(n_chains: int, n_draws: int, seed: int):
+    """
+    Fit normal_model() with NUTS, collecting
+    the diverging extra field.
+
+    Parameters
+    ----------
+    n_chains : int
+        Number of chains.
+
+    n_draws : int
+        Number of draws per chain, with
+        as many warmup iterations.
+
+    seed : int
+        Random seed.
+
+    Returns
+    -------
+    A stand-in for a Pyter Inference, holding
+    the MCMC runner as mcmc_runner.
+    """
+    runner = MCMC(
+        NUTS(normal_model),
+        num_warmup=n_draws,
+        num_samples=n_draws,
+        num_chains=n_chains,
+        chain_method="sequential",
+        progress_bar=False,
+    )
+    runner.run(
+        jax.random.PRNGKey(seed),
+        obs=jnp.linspace(-1.0, 1.0, 3),
+        extra_fields=("diverging",),
+    )
+    return SimpleNamespace(mcmc_runner=runner)
+
+
+def check_conversion(
+    infer,
+    n_chains: int,
+    n_draws: int,
+    log_likelihood: bool = True,
+) -> None:
+    """
+    Check that a fit converts with arviz.from_numpyro()
+    to InferenceData with the given numbers of chains
+    and draws per chain, holding the fit's draws.
+
+    Parameters
+    ----------
+    infer :
+        The fit.
+
+    n_chains : int
+        Expected number of chains.
+
+    n_draws : int
+        Expected number of draws per chain.
+
+    log_likelihood : bool
+        Compute and check the log likelihood
+        of the observations? Default True.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError if the InferenceData do not match.
+    """
+    inference_data = az.from_numpyro(
+        infer.mcmc_runner, log_likelihood=log_likelihood
+    )
+    posterior = inference_data.posterior
+    samples = infer.mcmc_runner.get_samples(group_by_chain=True)
+    for name, values in samples.items():
+        if posterior[name].shape[:2] != (n_chains, n_draws):
+            raise ValueError(
+                "Site {} converts with {} chains of {} draws, "
+                "expected {} of {}".format(
+                    name, *posterior[name].shape[:2], n_chains, n_draws
+                )
+            )
+        if not np.array_equal(posterior[name].values, np.asarray(values)):
+            raise ValueError(
+                "Site {} converts with different draws".format(name)
+            )
+    if not log_likelihood:
+        return
+    shape = inference_data.log_likelihood["obs"].shape[:2]
+    if shape != (n_chains, n_draws):
+        raise ValueError(
+            "The log likelihood converts with {} chains of {} draws, "
+            "expected {} of {}".format(*shape, n_chains, n_draws)
+        )
+
+
+def main(
+    n_chains: int = 2,
+    n_draws: int = 100,
+    n_extra_draws: int = 50,
+    max_thin: int = 4,
+    seed: int = 0,
+) -> None:
+    """
+    Fit a small model, then prune it with each
+    thinning interval up to max_thin and each offset,
+    storing draws as float16, and check that each
+    pruned fit converts with arviz.from_numpyro(),
+    with its log likelihood if all sites are kept,
+    and without it, as in table_diagnostics.py, if
+    only one site is. Then extend the fit, thinning
+    the extension in step with the fit as
+    fit_model.py does, and check that the extended
+    fit converts too.
+
+    Parameters
+    ----------
+    n_chains : int
+        Number of chains. Default 2.
+
+    n_draws : int
+        Number of draws per chain. Default 100.
+
+    n_extra_draws : int
+        Number of draws per chain by which
+        to extend the fit. Default 50.
+
+    max_thin : int
+        Largest thinning interval. Default 4.
+
+    seed : int
+        Random seed. Default 0.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError if a pruned or extended
+    fit does not convert.
+    """
+    infer = fit_normal_model(n_chains, n_draws, seed)
+    check_conversion(infer, n_chains, n_draws)
+    for thin in range(1, max_thin + 1):
+        for offset in range(thin):
+            n_kept = len(range(offset, n_draws, thin))
+            for sites in [None, ["x"]]:
+                pruned = prune_inference(
+                    infer,
+                    sites=sites,
+                    thin=thin,
+                    dtype="float16",
+                    offset=offset,
+                )
+                check_conversion(
+                    pruned, n_chains, n_kept, log_likelihood=sites is None
+                )
+        print("thin = {}: pruned fits convert".format(thin))
+
+    extension = SimpleNamespace(
+        mcmc_runner=extend_runner(
+            infer.mcmc_runner, ["diverging"], n_extra_draws
+        )
+    )
+    for thin in range(1, max_thin + 1):
+        offset = -n_draws % thin
+        extended = append_draws(
+            prune_inference(infer, thin=thin),
+            prune_inference(extension, thin=thin, offset=offset),
+        )
+        check_conversion(
+            extended,
+            n_chains,
+            len(range(0, n_draws, thin))
+            + len(range(offset, n_extra_draws, thin)),
+        )
+        print("thin = {}: extended fits convert".format(thin))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Check that fits shrunk by thinning and keeping "
+            "only some sites convert with arviz.from_numpyro()."
+        )
+    )
+    parser.add_argument(
+        "--n-chains",
+        type=int,
+        help="Number of chains",
+        default=2,
+    )
+    parser.add_argument(
+        "--n-draws",
+        type=int,
+        help="Number of draws per chain",
+        default=100,
+    )
+    parser.add_argument(
+        "--n-extra-draws",
+        type=int,
+        help="Number of draws per chain by which to extend the fit",
+        default=50,
+    )
+    parser.add_argument(
+        "--max-thin",
+        type=int,
+        help="Largest thinning interval to check",
+        default=4,
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Random seed",
+        default=0,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        n_chains=parsed["n_chains"],
+        n_draws=parsed["n_draws"],
+        n_extra_draws=parsed["n_extra_draws"],
+        max_thin=parsed["max_thin"],
+        seed=parsed["seed"],
+    )
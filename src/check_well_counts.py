@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+
+"""
+Check, on a small simulated titration and without
+Pyter, that the binomial well count likelihood of
+well_counts.py gives the same log density (up to the
+binomial coefficients) and the same posterior as the
+Bernoulli likelihood of the individual wells, for each
+form the well status distribution can take
+"""
+
+import argparse
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+import numpyro
+import numpyro.distributions as dist
+import polars as pl
+from jax.scipy.special import gammaln
+from numpyro.infer import MCMC, NUTS
+from numpyro.infer.util import log_density
+
+from well_counts import WellCountLikelihood, compress_well_data
+
+# ways of writing the well status distribution
+# that WellCountLikelihood must handle
+PARAMETRIZATIONS = ["probs", "logits", "expanded", "masked", "independent"]
+
+
+def simulate_wells(
+    n_samples: int = 4,
+    n_dilutions: int = 6,
+    n_replicates: int = 4,
+    seed: int = 0,
+) -> pl.DataFrame:
+    """
+    Simulate a titration: wells at a series of
+    ten-fold dilutions of each sample, positive with
+    probability 1 - exp(-10^(log titer + log10 dilution)).
+
+    Parameters
+    ----------
+    n_samples : int
+        Number of samples. Default 4.
+
+    n_dilutions : int
+        Number of dilutions per sample. Default 6.
+
+    n_replicates : int
+        Number of wells per sample and
+        dilution. Default 4.
+
+    seed : int
+        Random seed. Default 0.
+
+    Returns
+    -------
+    A polars DataFrame with columns sample_index,
+    log10_dilution, and well_status, one row per well.
+    """
+    rng = np.random.default_rng(seed)
+    log_titers = rng.uniform(2, 4, size=n_samples)
+    sample_index, log10_dilution = [
+        np.ravel(grid)
+        for grid in np.meshgrid(
+            np.arange(n_samples),
+            -np.arange(1, n_dilutions + 1),
+            np.arange(n_replicates),
+            indexing="ij",
+        )[:2]
+    ]
+    probs = -np.expm1(-(10.0 ** (log_titers[sample_index] + log10_dilution)))
+    return pl.DataFrame(
+        {
+            "sample_index": sample_index,
+            "log10_dilution": log10_dilution,
+            "well_status": rng.uniform(size=probs.shape) < probs,
+        }
+    )
+
+
+def titration_model(
+    sample_index,
+    log10_dilution,
+    n_samples: int,
+    parametrization: str = "probs",
+    well_status=None,
+):
+    """
+    numpyro model of a titration, with a normal
+    prior on each sample's log titer and a Bernoulli
+    likelihood for each well's status, written in
+    the given parametrization.
+
+    Parameters
+    ----------
+    sample_index : array-like
+        Sample of each well.
+
+    log10_dilution : array-like
+        Log10 dilution of each well.
+
+    n_samples : int
+        Number of samples.
+
+    parametrization : str
+        One of PARAMETRIZATIONS. "masked" leaves
+        out the wells of the first sample.
+        Default "probs".
+
+    well_status : array-like
+        Observed status of each well. Default None.
+    """
+    log_titer = numpyro.sample(
+        "log_titer", dist.Normal(3.0, 1.0).expand([n_samples])
+    )
+    log_rate = jnp.log(10.0) * (log_titer[sample_index] + log10_dilution)
+    if parametrization == "probs":
+        fn = dist.Bernoulli(probs=-jnp.expm1(-jnp.exp(log_rate)))
+    else:
+        # log(p / (1 - p)) for p = 1 - exp(-rate)
+        logits = jnp.log(jnp.expm1(jnp.exp(log_rate)))
+        fn = dist.Bernoulli(logits=logits)
+    if parametrization == "expanded":
+        fn = dist.Bernoulli(logits=logits[None, :]).expand(
+            (1, len(logits))
+        )
+        well_status = None if well_status is None else well_status[None, :]
+    elif parametrization == "masked":
+        fn = fn.mask(jnp.asarray(sample_index) != 0)
+    elif parametrization == "independent":
+        fn = fn.to_event(1)
+    numpyro.sample("well_status", fn, obs=well_status)
+
+
+def get_model_arguments(
+    wells: pl.DataFrame,
+    n_samples: int,
+    parametrization: str,
+    compressed: bool,
+):
+    """
+    Get the model and its keyword arguments
+    to fit to simulated wells, either one well at a
+    time or as counts of positive wells.
+
+    Parameters
+    ----------
+    wells : pl.DataFrame
+        Wells, as output by simulate_wells().
+
+    n_samples : int
+        Number of samples.
+
+    parametrization : str
+        One of PARAMETRIZATIONS.
+
+    compressed : bool
+        Fit to counts of positive wells, with
+        WellCountLikelihood?
+
+    Returns
+    -------
+    A tuple (model, kwargs) of the model and
+    the keyword arguments to pass it.
+    """
+    if not compressed:
+        return (
+            titration_model,
+            dict(
+                sample_index=wells["sample_index"].to_numpy(),
+                log10_dilution=wells["log10_dilution"].to_numpy(),
+                n_samples=n_samples,
+                parametrization=parametrization,
+                well_status=jnp.asarray(wells["well_status"].to_numpy()),
+            ),
+        )
+    counts = compress_well_data(wells)
+    n_positive = counts["n_positive"].to_numpy()
+
+    def model(**kwargs):
+        with WellCountLikelihood(
+            n_positive=n_positive, n_wells=counts["n_wells"].to_numpy()
+        ):
+            titration_model(**kwargs)
+
+    return (
+        model,
+        dict(
+            sample_index=counts["sample_index"].to_numpy(),
+            log10_dilution=counts["log10_dilution"].to_numpy(),
+            n_samples=n_samples,
+            parametrization=parametrization,
+            well_status=jnp.asarray(n_positive > 0),
+        ),
+    )
+
+
+def get_log_binomial_coefficients(
+    wells: pl.DataFrame, parametrization: str
+) -> float:
+    """
+    Get the sum of the log binomial coefficients of
+    the counts of positive wells, by which the log
+    densities of the two likelihoods differ.
+
+    Parameters
+    ----------
+    wells : pl.DataFrame
+        Wells, as output by simulate_wells().
+
+    parametrization : str
+        One of PARAMETRIZATIONS.
+
+    Returns
+    -------
+    The sum, over the wells the likelihood counts.
+    """
+    counts = compress_well_data(wells)
+    if parametrization == "masked":
+        counts = counts.filter(pl.col("sample_index") != 0)
+    n_positive = counts["n_positive"].to_numpy()
+    n_wells = counts["n_wells"].to_numpy()
+    return float(
+        np.sum(
+            gammaln(n_wells + 1.0)
+            - gammaln(n_positive + 1.0)
+            - gammaln(n_wells - n_positive + 1.0)
+        )
+    )
+
+
+def main(n_checks: int = 10, n_draws: int = 1000, seed: int = 0) -> None:
+    """
+    For each parametrization, compare the log density
+    of fits to the individual wells and to counts of
+    positive wells at random parameter values, and the
+    posterior quantiles of the log titers of the two,
+    printing the largest differences.
+
+    Parameters
+    ----------
+    n_checks : int
+        Number of random parameter values at which
+        to compare log densities. Default 10.
+
+    n_draws : int
+        Number of posterior draws of each fit, with as
+        many warmup iterations. If 0, do not compare
+        posteriors. Default 1000.
+
+    seed : int
+        Random seed. Default 0.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError if the log densities differ by
+    more than floating point error.
+    """
+    wells = simulate_wells(seed=seed)
+    n_samples = wells["sample_index"].n_unique()
+    rng = np.random.default_rng(seed)
+    for parametrization in PARAMETRIZATIONS:
+        models = [
+            get_model_arguments(wells, n_samples, parametrization, compressed)
+            for compressed in [False, True]
+        ]
+        offset = get_log_binomial_coefficients(wells, parametrization)
+        max_error = 0.0
+        for _ in range(n_checks):
+            params = dict(log_titer=rng.uniform(1, 5, size=n_samples))
+            well_density, count_density = [
+                float(log_density(model, (), kwargs, params)[0])
+                for model, kwargs in models
+            ]
+            max_error = max(
+                max_error,
+                abs(count_density - offset - well_density)
+                / abs(well_density),
+            )
+        if max_error > 1e-4:
+            raise ValueError(
+                "Log densities of the {} likelihood differ by {:.2g} "
+                "(relative)".format(parametrization, max_error)
+            )
+        message = "{}: largest relative log density difference {:.2g}".format(
+            parametrization, max_error
+        )
+
+        if n_draws > 0:
+            draws = []
+            for model, kwargs in models:
+                runner = MCMC(
+                    NUTS(model),
+                    num_warmup=n_draws,
+                    num_samples=n_draws,
+                    progress_bar=False,
+                )
+                runner.run(jax.random.PRNGKey(seed), **kwargs)
+                draws.append(np.asarray(runner.get_samples()["log_titer"]))
+            difference = np.abs(
+                np.quantile(draws[1], [0.05, 0.5, 0.95], axis=0)
+                - np.quantile(draws[0], [0.05, 0.5, 0.95], axis=0)
+            ) / np.std(draws[0], axis=0)
+            message += (
+                "; largest posterior quantile difference {:.2g} "
+                "posterior sds".format(float(np.max(difference)))
+            )
+        print(message)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Check that the binomial well count likelihood "
+            "matches the Bernoulli likelihood of the "
+            "individual wells on simulated data."
+        )
+    )
+    parser.add_argument(
+        "--n-checks",
+        type=int,
+        help=(
+            "Number of random parameter values at which "
+            "to compare log densities"
+        ),
+        default=10,
+    )
+    parser.add_argument(
+        "--n-draws",
+        type=int,
+        help=(
+            "Number of posterior draws of each fit; "
+            "0 to compare log densities only"
+        ),
+        default=1000,
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Random seed",
+        default=0,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        n_checks=parsed["n_checks"],
+        n_draws=parsed["n_draws"],
+        seed=parsed["seed"],
+    )
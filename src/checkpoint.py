@@ -0,0 +1,297 @@
+"""
+Helper functions for running the MCMC sampler in
+segments and saving its draws and state to a
+checkpoint after each segment, so that an interrupted
+fit restarts from the last checkpoint rather than
+from scratch
+"""
+
+import os
+import pickle
+import shutil
+
+import jax
+import numpy as np
+from numpyro.infer import MCMC
+
+
+def get_checkpoint_dir(output_path: str) -> str:
+    """
+    Get the directory in which to checkpoint a fit
+    that will be saved to output_path, as
+    <stem>_checkpoint, e.g. halflife.pickle ->
+    halflife_checkpoint.
+
+    Parameters
+    ----------
+    output_path : str
+        Path of the saved fit.
+
+    Returns
+    -------
+    The path of the checkpoint directory.
+    """
+    stem, _ = os.path.splitext(output_path)
+    return "{}_checkpoint".format(stem)
+
+
+def prepare_checkpoint_dir(checkpoint_dir: str, fingerprint: str) -> bool:
+    """
+    Make a checkpoint directory for a fit, keeping the
+    checkpoints in it only if they are of the same fit,
+    i.e. have the same fingerprint.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        The directory, as output by get_checkpoint_dir().
+
+    fingerprint : str
+        Fingerprint of the fit, as output by
+        condition_store.get_condition_fingerprint()
+        for all the data.
+
+    Returns
+    -------
+    True if checkpoints of the fit were kept,
+    False if the directory was made afresh.
+    """
+    fingerprint_path = os.path.join(checkpoint_dir, "fingerprint")
+    if os.path.exists(fingerprint_path):
+        with open(fingerprint_path) as file:
+            if file.read() == fingerprint:
+                return True
+    if os.path.exists(checkpoint_dir):
+        shutil.rmtree(checkpoint_dir)
+    os.makedirs(checkpoint_dir)
+    with open(fingerprint_path, "w") as file:
+        file.write(fingerprint)
+    return False
+
+
+def write_pickle_atomically(path: str, obj) -> None:
+    """
+    Pickle an object to a file by writing it to a
+    temporary file and then renaming that over the
+    path, so that the path holds either the old
+    object or the new one, never a partial write,
+    even if the process is killed.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+
+    obj :
+        Object to pickle.
+
+    Returns
+    -------
+    None
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        pickle.dump(obj, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(checkpoint_dir: str, n_draws: int = None) -> dict:
+    """
+    Load the last checkpoint in a directory, or the
+    last one with at most n_draws draws per chain.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        The checkpoint directory.
+
+    n_draws : int
+        Largest number of draws per chain to load.
+        If None, load all. Default None.
+
+    Returns
+    -------
+    A dictionary with entries warmup_state (the state
+    of each chain after warmup) and segments (for each
+    segment loaded, in order, a dictionary with entries
+    states, the draws and extra fields as in
+    MCMC._states, and last_state, the state of each
+    chain after it), or None if there is no checkpoint.
+    """
+    state_path = os.path.join(checkpoint_dir, "state.pickle")
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, "rb") as file:
+        checkpoint = pickle.load(file)
+    segments = []
+    n_loaded = 0
+    for i_segment in range(checkpoint["n_segments"]):
+        with open(
+            os.path.join(
+                checkpoint_dir, "segment-{:05d}.pickle".format(i_segment)
+            ),
+            "rb",
+        ) as file:
+            segment = pickle.load(file)
+        n_loaded += count_draws(segment["states"])
+        if n_draws is not None and n_loaded > n_draws:
+            break
+        segments.append(segment)
+    return dict(warmup_state=checkpoint["warmup_state"], segments=segments)
+
+
+def save_checkpoint(
+    checkpoint_dir: str,
+    warmup_state,
+    segments: list[dict],
+) -> None:
+    """
+    Save a checkpoint: the latest segment, then the
+    number of segments and the state of each chain
+    after warmup. The number of segments is written
+    last, so a checkpoint interrupted part-way leaves
+    the previous one intact.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        The checkpoint directory.
+
+    warmup_state :
+        State of each chain after warmup,
+        e.g. MCMC.post_warmup_state.
+
+    segments : list[dict]
+        Each segment so far, in order, as output by
+        load_checkpoint(). Only the last is written.
+
+    Returns
+    -------
+    None
+    """
+    if segments:
+        write_pickle_atomically(
+            os.path.join(
+                checkpoint_dir,
+                "segment-{:05d}.pickle".format(len(segments) - 1),
+            ),
+            segments[-1],
+        )
+    write_pickle_atomically(
+        os.path.join(checkpoint_dir, "state.pickle"),
+        dict(warmup_state=warmup_state, n_segments=len(segments)),
+    )
+
+
+def count_draws(states: dict) -> int:
+    """
+    Count the draws per chain in MCMC._states.
+
+    Parameters
+    ----------
+    states : dict
+        Draws and extra fields, with
+        leading axes (chain, draw).
+
+    Returns
+    -------
+    The number of draws per chain.
+    """
+    return int(np.shape(jax.tree_util.tree_leaves(states)[0])[1])
+
+
+def sample_with_checkpoints(
+    runner: MCMC,
+    rng_key,
+    checkpoint_dir: str,
+    checkpoint_every: int,
+) -> MCMC:
+    """
+    Run an MCMC runner that has not yet run: warm up,
+    then draw checkpoint_every draws per chain at a time
+    until it has drawn runner.num_samples, saving a
+    checkpoint with save_checkpoint() after warmup and
+    after each segment. Each segment starts from the
+    last state of the one before, continuing each
+    chain's stream of random numbers, so the draws do
+    not depend on checkpoint_every.
+
+    If checkpoint_dir already holds a checkpoint (e.g.
+    of an interrupted run, or of a run with fewer draws),
+    start from it instead, skipping warmup and the
+    segments already drawn, up to runner.num_samples
+    draws per chain. The draws are the same as if the
+    run had not been interrupted.
+
+    Parameters
+    ----------
+    runner : MCMC
+        Runner with its model arguments set, as by
+        sampling.build_runner(). Modified in place.
+
+    rng_key : jax.Array
+        Random key for warmup.
+
+    checkpoint_dir : str
+        Directory for the checkpoints, as prepared
+        by prepare_checkpoint_dir().
+
+    checkpoint_every : int
+        Number of draws per chain between checkpoints.
+
+    Returns
+    -------
+    The runner, holding all the draws as if from a
+    single MCMC.run() call.
+    """
+    n_draws = runner.num_samples
+    checkpoint = load_checkpoint(checkpoint_dir, n_draws=n_draws)
+    if checkpoint is None:
+        runner.warmup(rng_key, *runner._args, **runner._kwargs)
+        # keep the states on the host
+        warmup_state = jax.tree_util.tree_map(np.asarray, runner.last_state)
+        segments = []
+        save_checkpoint(checkpoint_dir, warmup_state, segments)
+    else:
+        warmup_state = checkpoint["warmup_state"]
+        segments = checkpoint["segments"]
+        print(
+            "Continuing from the checkpoint in {}, after {} draws "
+            "per chain".format(
+                checkpoint_dir,
+                sum(count_draws(segment["states"]) for segment in segments),
+            )
+        )
+        runner._last_state = (
+            segments[-1]["last_state"] if segments else warmup_state
+        )
+
+    n_drawn = sum(count_draws(segment["states"]) for segment in segments)
+    while n_drawn < n_draws:
+        runner.post_warmup_state = runner.last_state
+        runner.num_samples = min(checkpoint_every, n_draws - n_drawn)
+        runner.run(runner.last_state.rng_key, *runner._args, **runner._kwargs)
+        segments.append(
+            jax.tree_util.tree_map(
+                np.asarray,
+                dict(states=runner._states, last_state=runner.last_state),
+            )
+        )
+        save_checkpoint(checkpoint_dir, warmup_state, segments)
+        n_drawn += runner.num_samples
+
+    runner.num_samples = n_draws
+    runner.post_warmup_state = runner.last_state
+    runner._states = jax.tree_util.tree_map(
+        lambda *segment_states: np.concatenate(segment_states, axis=1),
+        *[segment["states"] for segment in segments],
+    )
+    runner._states_flat = jax.tree_util.tree_map(
+        lambda field_states: np.reshape(
+            field_states, (-1,) + field_states.shape[2:]
+        ),
+        runner._states,
+    )
+    return runner
@@ -5,10 +5,28 @@ Clean data and prepare it for inference
 """
 
 import argparse
-from typing import Iterable
-
+import hashlib
+import json
+import multiprocessing
+import os
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+import numpy as np
+import openpyxl
 import pandas as pd
 import polars as pl
+from openpyxl.utils import column_index_from_string
+
+from data_io import CLEANED_DATA_COLUMNS, write_cleaned_data
+
+# modules that shape parsed sheets; changes to
+# them invalidate all cached sheets
+PARSER_SOURCES = ["clean_data.py", "data_io.py"]
 
 
 def parse_plate(
@@ -64,6 +82,286 @@ def parse_plate(
     return (plate, metadata)
 
 
+def read_sheet_grid(
+    excel_file: str | pd.ExcelFile,
+    sheet_name: str,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    Read an entire sheet of an Excel file into
+    memory once, without treating any row
+    as a header, so that plates and their
+    metadata can be sliced out of it afterwards.
+
+    Parameters
+    ----------
+    excel_file : str | pd.ExcelFile
+        Path to an excel file to parse, or an
+        already opened pandas ExcelFile.
+
+    sheet_name : str
+        Name of the sheet within the excel file.
+
+    **kwargs
+        Other keyword arguments passed to pandas.read_excel
+
+    Returns
+    -------
+    The sheet as a Pandas DataFrame, with one row
+    per sheet row and integer column labels.
+    """
+    return pd.read_excel(
+        excel_file,
+        sheet_name=sheet_name,
+        header=None,
+        **kwargs
+    )
+
+
+def get_plate_header_rows(
+    sheet_grid: pd.DataFrame,
+) -> list[int]:
+    """
+    Return the row indices of an in-memory sheet
+    (as the output of read_sheet_grid()) that
+    correspond to the header row of each plate,
+    i.e. the row immediately above each row whose
+    first entry is "A".
+
+    These are the same indices that get_row_indices()
+    returns for the sheet.
+
+    Parameters
+    ----------
+    sheet_grid : pd.DataFrame
+        Sheet to search, as the output of
+        read_sheet_grid().
+
+    Returns
+    -------
+    A list of plate header row indices.
+    """
+    A_mask = sheet_grid.iloc[:, 0] == "A"
+    return [
+        index - 1 for index, bool_A in enumerate(A_mask) if bool_A
+    ]
+
+
+def slice_plate(
+    sheet_grid: pd.DataFrame,
+    plate_header_row: int,
+    plate_metadata_row: int = None,
+    plate_n_rows: int = 8,
+) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Slice a 96 well plate and any metadata
+    about it out of an in-memory sheet. In-memory
+    equivalent of parse_plate().
+
+    Parameters
+    ----------
+    sheet_grid : pd.DataFrame
+        Sheet to slice from, as the output of
+        read_sheet_grid().
+    plate_header_row : int
+        Row of the sheet containing the plate header
+    plate_metadata_row : int
+        Row of metadata about the plate
+    plate_n_rows : int
+        Number of non-header rows per plate. Default
+        8, for a 8x12 96-well plate.
+
+    Returns
+    -------
+    Tuple of Pandas DataFrames, the first representing the sliced plate,
+    the other holding sliced metadata, if any (otherwise None).
+    """
+    plate = (
+        sheet_grid.iloc[
+            plate_header_row + 1:
+            plate_header_row + 1 + plate_n_rows
+        ]
+        .reset_index(drop=True)
+        .infer_objects()
+    )
+
+    metadata = None
+    if plate_metadata_row is not None:
+        metadata = (
+            sheet_grid.iloc[
+                plate_metadata_row:plate_metadata_row + 1
+            ]
+            .reset_index(drop=True)
+            .dropna(axis="columns")
+        )
+
+    return (plate, metadata)
+
+
+def get_usecols_bounds(
+    usecols: str = None,
+) -> tuple[int, int]:
+    """
+    Convert a pandas.read_excel() usecols range
+    string such as "A:N" to 1-indexed first and
+    last column numbers, as used by openpyxl.
+
+    Parameters
+    ----------
+    usecols : str
+        Range of Excel column letters, e.g. "B:O",
+        or a single column letter. If None, use all
+        columns. Default None.
+
+    Returns
+    -------
+    A tuple of the first and last column numbers
+    (None, None if usecols is None).
+
+    Raises
+    ------
+    ValueError if usecols is not a single column
+    letter or a single range of column letters.
+    """
+    if usecols is None:
+        return (None, None)
+    bounds = usecols.split(":") if isinstance(usecols, str) else []
+    if len(bounds) not in [1, 2] or not all(
+        bound.strip().isalpha() for bound in bounds
+    ):
+        raise ValueError(
+            "Unsupported usecols {}; expected a range of "
+            "Excel column letters such as 'A:N'".format(usecols)
+        )
+    first, last = [
+        column_index_from_string(bound.strip().upper())
+        for bound in (bounds * 2)[-2:]
+    ]
+    return (first, last)
+
+
+def stream_sheet_plates(
+    excel_file: str | openpyxl.Workbook,
+    sheet_name: str,
+    metadata_row_offset: int,
+    plate_n_rows: int = 8,
+    usecols: str = None,
+) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Stream the rows of a sheet with openpyxl in
+    read-only mode, detecting plates on the fly
+    and yielding each plate and its metadata as
+    soon as its last row has been read. Only the
+    rows of each plate and its metadata row are
+    ever materialized as DataFrames, and only the
+    last few rows of the sheet are held in memory.
+    Streaming equivalent of slice_plate() applied
+    at each of get_plate_header_rows().
+
+    Parameters
+    ----------
+    excel_file : str | openpyxl.Workbook
+        Path to an excel file to parse, or a
+        workbook already opened in read-only mode
+        (see open_excel_file()).
+
+    sheet_name : str
+        Name of the sheet within the excel file.
+
+    metadata_row_offset : int
+        Where is the plate metadata row
+        relative to the header row? See
+        parse_titration_data(). Must be at most
+        plate_n_rows.
+
+    plate_n_rows : int
+        Number of non-header rows per plate. Default
+        8, for a 8x12 96-well plate.
+
+    usecols : str
+        Range of columns to read, as for
+        pandas.read_excel(), e.g. "A:N". If None,
+        read all columns. Default None.
+
+    Returns
+    -------
+    An iterator of (plate, metadata) tuples, as the
+    output of slice_plate().
+
+    Raises
+    ------
+    ValueError if the metadata row of a plate lies
+    outside the sheet or too far below the plate
+    header row to stream.
+    """
+    if metadata_row_offset > plate_n_rows:
+        raise ValueError(
+            "Cannot stream plates whose metadata row lies "
+            "below the plate; got metadata_row_offset "
+            "{}".format(metadata_row_offset)
+        )
+    min_col, max_col = get_usecols_bounds(usecols)
+
+    def make_plate(rows, metadata_row):
+        metadata = None
+        if metadata_row is not None:
+            metadata = pd.DataFrame(
+                [[x for x in metadata_row if x is not None and x != ""]]
+            )
+        return (pd.DataFrame(list(rows)), metadata)
+
+    workbook = excel_file
+    if not isinstance(excel_file, openpyxl.Workbook):
+        workbook = openpyxl.load_workbook(
+            excel_file, read_only=True, data_only=True
+        )
+    try:
+        # recent rows, enough to reach back from the
+        # last row of a plate to its metadata row
+        history = deque(
+            maxlen=max(plate_n_rows, plate_n_rows + 1 - metadata_row_offset)
+        )
+        n_rows_read = 0
+
+        def get_plate(A_row, last_row):
+            first_held = n_rows_read - len(history)
+            metadata_row = A_row - 1 + metadata_row_offset
+            if metadata_row < 0:
+                raise ValueError(
+                    "Plate with first row {} of sheet '{}' has no "
+                    "metadata row".format(A_row + 1, sheet_name)
+                )
+            rows = list(history)
+            return make_plate(
+                rows[A_row - first_held:last_row - first_held + 1],
+                rows[metadata_row - first_held]
+                if metadata_row <= last_row
+                else None,
+            )
+
+        for row in workbook[sheet_name].iter_rows(
+            min_col=min_col, max_col=max_col, values_only=True
+        ):
+            history.append(row)
+            n_rows_read += 1
+            A_row = n_rows_read - plate_n_rows
+            first_held = n_rows_read - len(history)
+            if A_row >= 0 and history[A_row - first_held][0] == "A":
+                yield get_plate(A_row, n_rows_read - 1)
+
+        # plates cut short by the end of the sheet,
+        # left for validation to reject
+        for A_row in range(
+            max(0, n_rows_read - plate_n_rows + 1), n_rows_read
+        ):
+            first_held = n_rows_read - len(history)
+            if history[A_row - first_held][0] == "A":
+                yield get_plate(A_row, n_rows_read - 1)
+    finally:
+        if workbook is not excel_file:
+            workbook.close()
+
+
 def validate_plate_shape(
     parsed_plate: pl.DataFrame, expected_shape=(8, 13)
 ) -> None:
@@ -97,19 +395,159 @@ def validate_plate_shape(
         )
 
 
+# rules for each row of long-form plate data:
+# (column, allowed values, explanation if violated)
+LONGFORM_ROW_RULES = {
+    "well_column": (
+        "well_column",
+        list(range(1, 13)),
+        "Unexpected well column indices; "
+        "expected only integers in the range "
+        "1 through 12",
+    ),
+    "log10_dilution": (
+        "log10_dilution",
+        list(range(-8, 1)),
+        "Unexpected log10 dilution factor; "
+        "expected only integers in the range "
+        "0 through -8",
+    ),
+    "replicate": (
+        "replicate",
+        list(range(1, 4)),
+        "Unexpected replicate number; "
+        "expected only integers in the range "
+        "1 through 3",
+    ),
+}
+
+
+def get_longform_validation_report(
+    data_long: pl.DataFrame,
+    plate_column: str = None,
+    n_wells_per_plate: int = 96,
+) -> pl.DataFrame:
+    """
+    Check long-form plate data against every
+    validation rule in a single vectorized pass,
+    and report all violations.
+
+    Row rules (LONGFORM_ROW_RULES) check the well column,
+    log10 dilution, and replicate of each row. The plate
+    shape rule checks that each plate has exactly
+    n_wells_per_plate rows, one per distinct (well column,
+    log10 dilution) position.
+
+    Parameters
+    ----------
+    data_long : pl.DataFrame
+        Long-form data to validate, as output
+        by clean_plate_batch() or parse_titration_data().
+
+    plate_column : str
+        Column identifying the plate of each row. If None,
+        rows are taken to come in consecutive blocks of
+        n_wells_per_plate per plate, as output by
+        clean_plate_batch(), and plates are numbered by
+        block. Default None.
+
+    n_wells_per_plate : int
+        Expected number of wells per plate. Default 96.
+
+    Returns
+    -------
+    A polars DataFrame with one row per violation, sorted
+    by plate and row, with columns plate, row (row index
+    in data_long, null for plate shape violations),
+    rule, value (the offending value, as a string), and
+    message. Empty if the data are valid.
+    """
+    if plate_column is None:
+        plate = pl.col("row") // n_wells_per_plate
+    else:
+        plate = pl.col(plate_column)
+
+    checked = (
+        data_long.lazy()
+        .with_row_index("row")
+        .with_columns(plate=plate)
+    )
+
+    row_violations = [
+        checked.filter(
+            ~pl.col(column).is_in(allowed).fill_null(False)
+        ).select(
+            "plate",
+            "row",
+            rule=pl.lit(rule),
+            value=pl.col(column).cast(pl.String),
+            message=pl.lit(message),
+        )
+        for rule, (column, allowed, message) in LONGFORM_ROW_RULES.items()
+    ]
+
+    plate_violations = (
+        checked.group_by("plate")
+        .agg(
+            n_wells=pl.len(),
+            # encode each (well column, dilution) pair
+            # as one integer, which is cheaper to count
+            # than a struct
+            n_positions=(
+                pl.col("well_column").cast(pl.Int64) * 2**16
+                + pl.col("log10_dilution").cast(pl.Int64)
+            ).n_unique(),
+        )
+        .filter(
+            (pl.col("n_wells") != n_wells_per_plate)
+            | (pl.col("n_positions") != n_wells_per_plate)
+        )
+        .select(
+            "plate",
+            row=pl.lit(None, dtype=pl.UInt32),
+            rule=pl.lit("plate_shape"),
+            value=pl.format(
+                "{} wells at {} distinct positions",
+                "n_wells",
+                "n_positions",
+            ),
+            message=pl.lit(
+                "Unexpected plate shape; expected "
+                "{} wells, one per well position"
+                "".format(n_wells_per_plate)
+            ),
+        )
+    )
+
+    return (
+        pl.concat(
+            row_violations + [plate_violations],
+            how="vertical_relaxed",
+        )
+        .sort("plate", "row", nulls_last=True)
+        .collect()
+    )
+
+
 def validate_longform_data(
     data_long: pl.DataFrame,
+    **kwargs
 ) -> None:
     """
     Validate that data pivoted to long
     has the expected format and entries
-    corresponding to a parsed 96-well plate.
+    corresponding to parsed 96-well plates,
+    via get_longform_validation_report().
 
     Parameter
     ---------
     data_long : pl.DataFrame
         Polars DataFrame to validate.
 
+    **kwargs :
+        Keyword arguments passed to
+        get_longform_validation_report().
+
     Returns
     -------
     None
@@ -117,34 +555,29 @@ def validate_longform_data(
     Raises
     ------
     ValueError if validation conditions are not met,
-    with an explanation of the unmet condition.
+    with an explanation of the first unmet condition
+    and a count of the violating plates and rows.
     """
-    if not all(
-        data_long["well_column"].is_in(range(1, 13))
-    ):
-        raise ValueError(
-            "Unexpected well column indices; "
-            "expected only integers in the range "
-            "1 through 12"
-        )
-    if not all(
-        data_long["log10_dilution"].is_in(range(-8, 1))
-    ):
-        raise ValueError(
-            "Unexpected log10 dilution factor; "
-            "expected only integers in the range "
-            "0 through -8"
-        )
-    if not all(data_long["replicate"].is_in(range(1, 4))):
+    report = get_longform_validation_report(data_long, **kwargs)
+    if report.height > 0:
+        first = report.row(0, named=True)
         raise ValueError(
-            "Unexpected replicate number; "
-            "expected only integers in the range "
-            "1 through 3"
+            "{} (found {!r} in plate {}). {} violation(s) "
+            "in {} plate(s); see "
+            "get_longform_validation_report() for "
+            "details.".format(
+                first["message"],
+                first["value"],
+                first["plate"],
+                report.height,
+                report["plate"].n_unique(),
+            )
         )
 
 
 def clean_single_plate(
     parsed_plate: pl.DataFrame | pd.DataFrame,
+    validate: bool = True,
 ) -> pl.DataFrame:
     """
     Clean a single 96-well plate, and pivot
@@ -157,6 +590,10 @@ def clean_single_plate(
         Data to clean representing a single 96-well plate, as the output of
         parse_plate()[0].
 
+    validate : bool
+        Validate the long-form data via
+        validate_longform_data()? Default True.
+
     Returns
     -------
     A long-form tidy polars DataFrame representing the plate.
@@ -210,7 +647,136 @@ def clean_single_plate(
     ))
     # print(plate_long)
 
-    validate_longform_data(plate_long)
+    if validate:
+        validate_longform_data(plate_long)
+
+    return plate_long
+
+
+def stack_plates(
+    parsed_plates: list[pl.DataFrame | pd.DataFrame],
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stack parsed 96-well plates into arrays of
+    well calls and plate row labels, with validation.
+
+    Parameters
+    ----------
+    parsed_plates : list[pl.DataFrame | pd.DataFrame]
+        Plates to stack, each as the output of
+        parse_plate()[0].
+
+    Returns
+    -------
+    A tuple of a boolean array of shape (n_plates, 8, 12)
+    that is True where a well was called positive ("+"),
+    and an array of shape (n_plates, 8) of plate row labels.
+
+    Raises
+    ------
+    ValueError if a plate has an unexpected shape.
+    """
+    for plate in parsed_plates:
+        validate_plate_shape(plate, (8, 14))
+    values = np.stack(
+        [np.asarray(plate, dtype=object) for plate in parsed_plates]
+    ).reshape(-1, 8, 14)
+
+    well_rows = values[:, :, 0]
+    well_calls = values[:, :, 1:13] == "+"
+    return (well_calls, well_rows)
+
+
+def clean_plate_batch(
+    well_calls: np.ndarray,
+    well_rows: np.ndarray = None,
+    validate: bool = True,
+) -> pl.DataFrame:
+    """
+    Pivot a batch of 96-well plates to longform
+    tidy data in a single vectorized step, with
+    validation. Batched equivalent of calling
+    clean_single_plate() on each plate and
+    concatenating the results.
+
+    Parameters
+    ----------
+    well_calls : np.ndarray
+        Boolean array of shape (n_plates, 8, 12) of well
+        calls, as the first output of stack_plates().
+
+    well_rows : np.ndarray
+        Array of shape (n_plates, 8) of plate row labels,
+        as the second output of stack_plates(). If None,
+        label rows "A" through "H". Default None.
+
+    validate : bool
+        Validate the long-form data via
+        validate_longform_data()? Default True.
+
+    Returns
+    -------
+    A long-form tidy polars DataFrame with one row
+    per well, ordered by plate, then well column,
+    then plate row.
+
+    Raises
+    ------
+    ValueError if validation of the cleaned longform data fails.
+    """
+    n_plates, n_rows, n_cols = well_calls.shape
+    if well_rows is None:
+        well_rows = np.broadcast_to(
+            np.array(list("ABCDEFGH"[:n_rows]), dtype=object),
+            (n_plates, n_rows),
+        )
+    well_rows = np.where(pd.isna(well_rows), None, well_rows)
+
+    plate_long = pl.DataFrame(
+        {
+            "minus_log10_dilution": pl.Series(
+                np.tile(
+                    np.arange(n_rows, dtype=np.uint32),
+                    n_plates * n_cols,
+                ),
+                dtype=pl.UInt32,
+            ),
+            "well_row": pl.Series(
+                np.broadcast_to(
+                    well_rows[:, np.newaxis, :],
+                    (n_plates, n_cols, n_rows),
+                ).ravel(),
+                dtype=pl.String,
+            ),
+            "well_column": pl.Series(
+                np.tile(
+                    np.repeat(
+                        np.arange(1, n_cols + 1, dtype=np.int32),
+                        n_rows,
+                    ),
+                    n_plates,
+                ),
+                dtype=pl.Int32,
+            ),
+            "well_status": pl.Series(
+                well_calls.transpose(0, 2, 1).ravel(),
+                dtype=pl.Boolean,
+            ),
+        }
+    ).with_columns(
+        replicate=((pl.col("well_column") - 1) / 4)
+        .floor()
+        .cast(pl.Int32)
+        + 1,
+        log10_dilution=-(
+            pl.col("minus_log10_dilution").cast(
+                pl.Int32
+            )
+        ),
+    )
+
+    if validate:
+        validate_longform_data(plate_long)
 
     return plate_long
 
@@ -338,239 +904,965 @@ def get_row_indices(
     A_mask = sheet_df.iloc[:,0]=="A"
     return [index for index, bool_A in enumerate(A_mask) if bool_A]
 
-def parse_titration_data(
-    excel_file_path: str,
+def iter_sheet_plates(
+    excel_file: str | pd.ExcelFile,
+    sheet_name: str,
     metadata_row_offset: int,
-    sample_id_prefix: str = "sample",
-    temperature: str = None,
-    medium: str = None,
-    virus_name: str = None,
-    verbose: bool = False,
+    backend: str = "pandas",
     **kwargs
-) -> pl.DataFrame:
+) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
     """
-    Parse an entire Excel sheet of titration data
-    to a single tidy polars DataFrame, with validation.
+    Iterate over the plates of a given sheet,
+    yielding each parsed plate along with its
+    parsed metadata.
 
     Parameters
     ----------
-    excel_file_path : str
-        Path to an excel file to parse.
+    excel_file : str | pd.ExcelFile
+        Path to an excel file to parse, or an
+        already opened pandas ExcelFile.
+
+    sheet_name : str
+        Name of the sheet within the excel file.
 
     metadata_row_offset : int
         Where is the plate metadata row
-        relative to the header row?
-        (This differs among datasheets,
-        but it is typically 0 (same row)
-        or 1 (one row above)
-        
-    sample_id_prefix : str
-        Prefix for the string sample unique ids. Default
-        "sample".
-
-    verbose : bool
-        Print which plate is currently being
-        parsed? Default False.
-
-    temperature : str
-        Temperature for all data in the file
-        as a string parseable by parse_temperature_to_celsius().
-        Otherwise, will attempt to parse temperature
-        metadata from plate header rows.
-        
-    medium : str
-        Medium for all data in the file   
-        
-    virus_name : str
-        Virus name for all data in the file     
+        relative to the header row? See
+        parse_titration_data().
+
+    backend : str
+        How to read the sheet. One of "pandas"
+        (read the sheet into memory once and slice
+        plates out of it) and "pandas_per_plate" (re-read
+        the sheet for each plate and its metadata, via
+        get_row_indices() and parse_plate()), and
+        "openpyxl" (stream the sheet's rows in openpyxl
+        read-only mode, via stream_sheet_plates()).
+        Default "pandas".
 
     **kwargs :
         Additional keyword arguments passed to
-        pandas.read_excel()
+        pandas.read_excel(). The "openpyxl" backend
+        accepts only usecols.
 
     Returns
     -------
-    The parsed data, as a long-form tidy
-    polars DataFrame.
+    An iterator of (plate, metadata) tuples, as the
+    output of parse_plate().
 
     Raises
     ------
-    A ValueError if validation fails.
+    ValueError if the backend is unknown.
     """
-    xlsx_file = pd.ExcelFile(excel_file_path)
-
-    medium_vec = ["DI", "wastewater", "steel", "polypropylen", "raw", "whole", "skim", "fat", "rubber"]
-    
-    sheet_results =  [None] * len(xlsx_file.sheet_names)
-    for i_sheet, sheet_name in enumerate(xlsx_file.sheet_names):
-        
-        plate_header_rows = get_row_indices(
-            excel_file_path,
-            sheet_name,
-            **kwargs
-        )
-
-        results = [None] * len(plate_header_rows)
-        for i_plate, header_row in enumerate(plate_header_rows):
-            if verbose:
-                print("Parsing plate {}".format(i_plate))
-            metadata_row = header_row + metadata_row_offset
-            plate, meta = parse_plate(
-                excel_file_path,
+    if backend == "pandas":
+        sheet_grid = read_sheet_grid(excel_file, sheet_name, **kwargs)
+        for header_row in get_plate_header_rows(sheet_grid):
+            yield slice_plate(
+                sheet_grid,
+                plate_header_row=header_row,
+                plate_metadata_row=header_row + metadata_row_offset,
+            )
+    elif backend == "pandas_per_plate":
+        for header_row in get_row_indices(
+            excel_file, sheet_name, **kwargs
+        ):
+            yield parse_plate(
+                excel_file,
                 sheet_name,
                 plate_header_row=header_row,
-                plate_metadata_row=metadata_row,
+                plate_metadata_row=header_row + metadata_row_offset,
                 **kwargs
             )
+    elif backend == "openpyxl":
+        yield from stream_sheet_plates(
+            excel_file,
+            sheet_name,
+            metadata_row_offset,
+            **kwargs
+        )
+    else:
+        raise ValueError(
+            "Unknown parser backend {}; expected one of "
+            "'pandas', 'pandas_per_plate', and "
+            "'openpyxl'".format(backend)
+        )
+
+
+def iter_labelled_sheet_plates(
+    excel_file: str | pd.ExcelFile,
+    sheet_name: str,
+    metadata_row_offset: int,
+    temperature: str = None,
+    medium: str = None,
+    verbose: bool = False,
+    backend: str = "pandas",
+    **kwargs
+) -> Iterator[tuple[pd.DataFrame, str, str, str]]:
+    """
+    Iterate over the plates of a given sheet,
+    yielding each parsed plate along with its
+    timepoint, temperature, and medium, as
+    strings.
+
+    Parameters
+    ----------
+    excel_file : str | pd.ExcelFile
+        Path to an excel file to parse, or an
+        already opened pandas ExcelFile.
+
+    sheet_name : str
+        Name of the sheet within the excel file.
+
+    metadata_row_offset : int
+        Where is the plate metadata row
+        relative to the header row?
+        See parse_titration_data().
+
+    temperature : str
+        Temperature for all data in the sheet
+        as a string parseable by parse_temperature_to_celsius().
+        Otherwise, will attempt to infer the temperature
+        from the sheet name.
 
-            if verbose:
-                print("Parsed plate:")
-                print(plate)
-                print("Parsed metadata:")
-                print(meta)
-                
-            timetemp = meta.iloc[0,0]
-            timepoint = timetemp.strip()
-            if not temperature:
-                if "22" in sheet_name:
-                    temp = "22C"
-                elif "4" in sheet_name:
-                    temp = "4C"
-                else:
-                    print("Temperature not found")
-            else:
-                temp = temperature
-
-            if not medium:
-                med = next(s for s in medium_vec if s in sheet_name)
+    medium : str
+        Medium for all data in the sheet. Otherwise,
+        will attempt to infer the medium from the sheet
+        name.
+
+    verbose : bool
+        Print which plate is currently being
+        parsed? Default False.
+
+    backend : str
+        How to read the sheet; passed to
+        iter_sheet_plates(). Default "pandas".
+
+    **kwargs :
+        Additional keyword arguments passed to
+        pandas.read_excel()
+
+    Returns
+    -------
+    An iterator of (plate, timepoint, temperature, medium)
+    tuples.
+    """
+    medium_vec = ["DI", "wastewater", "steel", "polypropylen", "raw", "whole", "skim", "fat", "rubber"]
+
+    plates = iter_sheet_plates(
+        excel_file,
+        sheet_name,
+        metadata_row_offset,
+        backend=backend,
+        **kwargs
+    )
+
+    for i_plate, (plate, meta) in enumerate(plates):
+        if verbose:
+            print("Parsing plate {}".format(i_plate))
+
+        if verbose:
+            print("Parsed plate:")
+            print(plate)
+            print("Parsed metadata:")
+            print(meta)
+
+        timetemp = meta.iloc[0,0]
+        timepoint = timetemp.strip()
+        if not temperature:
+            if "22" in sheet_name:
+                temp = "22C"
+            elif "4" in sheet_name:
+                temp = "4C"
             else:
-                med = medium
-            
-            plate = clean_single_plate(plate).with_columns(
-                timepoint_days = pl.lit(
-                    parse_duration_to_days(timepoint)
-                ),
-                temperature_celsius=pl.lit(
-                    parse_temperature_to_celsius(temp)
+                print("Temperature not found")
+        else:
+            temp = temperature
+
+        if not medium:
+            med = next(s for s in medium_vec if s in sheet_name)
+        else:
+            med = medium
+
+        yield (plate, timepoint, temp, med)
+
+
+def labelled_plates_to_longform(
+    labelled_plates: list[tuple[pd.DataFrame, str, str, str]],
+    sample_id_prefix: str = "sample",
+    virus_name: str = None,
+    batched: bool = True,
+    validate: bool = True,
+) -> pl.DataFrame:
+    """
+    Convert labelled plates to a single long-form
+    tidy polars DataFrame, with validation, adding
+    timepoint, temperature, medium, virus, and
+    sample id columns.
+
+    Parameters
+    ----------
+    labelled_plates : list[tuple[pd.DataFrame, str, str, str]]
+        List of (plate, timepoint, temperature, medium) tuples,
+        as output by iter_labelled_sheet_plates().
+
+    sample_id_prefix : str
+        Prefix for the string sample unique ids. Default
+        "sample".
+
+    virus_name : str
+        Virus name for all the plates.
+
+    batched : bool
+        Convert all plates to long form at once, via
+        stack_plates() and clean_plate_batch()?
+        If False, convert plates one at a time via
+        clean_single_plate(). Default True.
+
+    validate : bool
+        Validate all the plates, in a single pass,
+        via validate_longform_data()? Default True.
+
+    Returns
+    -------
+    The plates, as a long-form tidy polars DataFrame.
+
+    Raises
+    ------
+    A ValueError if there are no plates,
+    or if validation fails.
+    """
+    if len(labelled_plates) == 0:
+        raise ValueError("No plates to convert to long form")
+    parsed_plates, timepoints, temps, meds = zip(*labelled_plates)
+
+    sample_id_stems = [
+        "{}-{}-t{}-{}-{}-rep".format(
+            sample_id_prefix,
+            virus_name,
+            temp.replace(" ", "-"),
+            med.replace(" ", "-"),
+            timepoint.replace(" ", "-"),
+        )
+        for timepoint, temp, med in zip(timepoints, temps, meds)
+    ]
+
+    if batched:
+        n_wells = 96
+        longform = clean_plate_batch(
+            *stack_plates(parsed_plates), validate=False
+        ).with_columns(
+            timepoint_days=pl.Series(
+                np.repeat(
+                    [parse_duration_to_days(t) for t in timepoints],
+                    n_wells,
                 ),
-                medium_name=pl.lit(med),
-                virus_name = pl.lit(virus_name),
-                sample_id=(
-                    pl.lit(
-                        "{}-{}-t{}-{}-{}-rep".format(
-                            sample_id_prefix,
-                            virus_name,
-                            temp.replace(" ", "-"),
-                            med.replace(" ", "-"),
-                            timepoint.replace(" ", "-"),
-                        )
-                    )
-                    + pl.col("replicate").cast(pl.Utf8)
+                dtype=pl.Float64,
+            ),
+            temperature_celsius=pl.Series(
+                np.repeat(
+                    [parse_temperature_to_celsius(t) for t in temps],
+                    n_wells,
                 ),
+                dtype=pl.Float64,
+            ),
+            medium_name=pl.Series(
+                np.repeat(meds, n_wells), dtype=pl.String
+            ),
+            virus_name=pl.lit(virus_name),
+            sample_id=(
+                pl.Series(
+                    np.repeat(sample_id_stems, n_wells),
+                    dtype=pl.String,
+                )
+                + pl.col("replicate").cast(pl.Utf8)
+            ),
+        )
+    else:
+        longform = pl.concat(
+            [
+                clean_single_plate(plate, validate=False).with_columns(
+                    timepoint_days=pl.lit(
+                        parse_duration_to_days(timepoint)
+                    ),
+                    temperature_celsius=pl.lit(
+                        parse_temperature_to_celsius(temp)
+                    ),
+                    medium_name=pl.lit(med),
+                    virus_name=pl.lit(virus_name),
+                    sample_id=(
+                        pl.lit(sample_id_stem)
+                        + pl.col("replicate").cast(pl.Utf8)
+                    ),
+                )
+                for plate, timepoint, temp, med, sample_id_stem in zip(
+                    parsed_plates, timepoints, temps, meds, sample_id_stems
+                )
+            ]
+        )
+
+    if validate:
+        validate_longform_data(longform)
+    return longform
+
+
+def iter_titration_sheet_chunks(
+    excel_file: str | pd.ExcelFile,
+    sheet_name: str,
+    metadata_row_offset: int,
+    sample_id_prefix: str = "sample",
+    temperature: str = None,
+    medium: str = None,
+    virus_name: str = None,
+    verbose: bool = False,
+    backend: str = "pandas",
+    batched: bool = True,
+    validate: bool = True,
+    chunk_size: int = None,
+    **kwargs
+) -> Iterator[pl.DataFrame]:
+    """
+    Parse a single sheet of an Excel file of
+    titration data to a stream of tidy polars
+    DataFrames, each holding up to chunk_size
+    plates, so that no more than one chunk of
+    converted plates is held in memory at once.
+
+    Parameters
+    ----------
+    excel_file : str | pd.ExcelFile
+        Path to an excel file to parse, or an
+        already opened pandas ExcelFile.
+
+    sheet_name : str
+        Name of the sheet within the excel file.
+
+    chunk_size : int
+        Maximum number of plates per chunk. If None,
+        yield the entire sheet as a single chunk.
+        Default None.
+
+    **kwargs :
+        Other keyword arguments (metadata_row_offset,
+        sample_id_prefix, temperature, medium, virus_name,
+        verbose, backend, batched, validate, and any for
+        pandas.read_excel()), as for parse_titration_sheet().
+        If validating, each chunk is validated once.
+
+    Returns
+    -------
+    An iterator of long-form tidy polars DataFrames.
+
+    Raises
+    ------
+    A ValueError if the sheet has no plates,
+    or if validation fails.
+    """
+    labelled_plates = iter_labelled_sheet_plates(
+        excel_file,
+        sheet_name,
+        metadata_row_offset,
+        temperature=temperature,
+        medium=medium,
+        verbose=verbose,
+        backend=backend,
+        **kwargs
+    )
+
+    chunk = []
+    n_plates = 0
+    for labelled_plate in labelled_plates:
+        chunk.append(labelled_plate)
+        n_plates += 1
+        if chunk_size is not None and len(chunk) >= chunk_size:
+            yield labelled_plates_to_longform(
+                chunk,
+                sample_id_prefix=sample_id_prefix,
+                virus_name=virus_name,
+                batched=batched,
+                validate=validate,
             )
-                        
-            results[i_plate] = plate
+            chunk = []
+    if len(chunk) > 0:
+        yield labelled_plates_to_longform(
+            chunk,
+            sample_id_prefix=sample_id_prefix,
+            virus_name=virus_name,
+            batched=batched,
+            validate=validate,
+        )
+    if n_plates == 0:
+        raise ValueError("No plates found in sheet {}".format(sheet_name))
+
+
+def parse_titration_sheet(
+    excel_file: str | pd.ExcelFile,
+    sheet_name: str,
+    metadata_row_offset: int,
+    sample_id_prefix: str = "sample",
+    temperature: str = None,
+    medium: str = None,
+    virus_name: str = None,
+    verbose: bool = False,
+    backend: str = "pandas",
+    batched: bool = True,
+    validate: bool = True,
+    **kwargs
+) -> pl.DataFrame:
+    """
+    Parse a single sheet of an Excel file of
+    titration data to a tidy polars DataFrame,
+    with validation.
+
+    Parameters
+    ----------
+    excel_file : str | pd.ExcelFile
+        Path to an excel file to parse, or an
+        already opened pandas ExcelFile.
+
+    sheet_name : str
+        Name of the sheet within the excel file.
+
+    metadata_row_offset : int
+        Where is the plate metadata row
+        relative to the header row?
+        See parse_titration_data().
+
+    sample_id_prefix : str
+        Prefix for the string sample unique ids. Default
+        "sample".
+
+    temperature : str
+        Temperature for all data in the sheet
+        as a string parseable by parse_temperature_to_celsius().
+        Otherwise, will attempt to infer the temperature
+        from the sheet name.
+
+    medium : str
+        Medium for all data in the sheet. Otherwise,
+        will attempt to infer the medium from the sheet
+        name.
+
+    virus_name : str
+        Virus name for all data in the sheet
+
+    verbose : bool
+        Print which plate is currently being
+        parsed? Default False.
+
+    backend : str
+        How to read the sheet; passed to
+        iter_sheet_plates(). Default "pandas".
+
+    batched : bool
+        Convert all plates of the sheet to long form
+        at once, via stack_plates() and clean_plate_batch()?
+        If False, convert plates one at a time via
+        clean_single_plate(). Default True.
+
+    validate : bool
+        Validate the parsed sheet via
+        validate_longform_data()? Default True.
+
+    **kwargs :
+        Additional keyword arguments passed to
+        pandas.read_excel()
 
-        sheet_results[i_sheet] = pl.concat(results)
-        validate_longform_data(sheet_results[i_sheet])
+    Returns
+    -------
+    The parsed sheet, as a long-form tidy
+    polars DataFrame.
+
+    Raises
+    ------
+    A ValueError if the sheet has no plates,
+    or if validation fails.
+    """
+    labelled_plates = list(
+        iter_labelled_sheet_plates(
+            excel_file,
+            sheet_name,
+            metadata_row_offset,
+            temperature=temperature,
+            medium=medium,
+            verbose=verbose,
+            backend=backend,
+            **kwargs
+        )
+    )
+    if len(labelled_plates) == 0:
+        raise ValueError("No plates found in sheet {}".format(sheet_name))
+    return labelled_plates_to_longform(
+        labelled_plates,
+        sample_id_prefix=sample_id_prefix,
+        virus_name=virus_name,
+        batched=batched,
+        validate=validate,
+    )
+
+
+def open_excel_file(
+    excel_file_path: str,
+    backend: str = "pandas",
+) -> tuple[str | pd.ExcelFile | openpyxl.Workbook, list[str]]:
+    """
+    Open an Excel file once, for reading several of its
+    sheets with a given parser backend.
+
+    Parameters
+    ----------
+    excel_file_path : str
+        Path to the excel file.
+
+    backend : str
+        Parser backend that will read the sheets;
+        see iter_sheet_plates(). Default "pandas".
+
+    Returns
+    -------
+    A tuple of the opened file, to pass to
+    iter_sheet_plates() (a pandas ExcelFile for the
+    "pandas" backend, a read-only openpyxl Workbook
+    for the "openpyxl" backend, and otherwise the path
+    itself), and the file's sheet names.
+    """
+    if backend == "openpyxl":
+        workbook = openpyxl.load_workbook(
+            excel_file_path, read_only=True, data_only=True
+        )
+        return (workbook, workbook.sheetnames)
+    xlsx_file = pd.ExcelFile(excel_file_path)
+    return (
+        xlsx_file if backend == "pandas" else excel_file_path,
+        xlsx_file.sheet_names,
+    )
+
+
+def parse_titration_data(
+    excel_file_path: str,
+    metadata_row_offset: int,
+    sample_id_prefix: str = "sample",
+    temperature: str = None,
+    medium: str = None,
+    virus_name: str = None,
+    verbose: bool = False,
+    backend: str = "pandas",
+    **kwargs
+) -> pl.DataFrame:
+    """
+    Parse an entire Excel file of titration data
+    to a single tidy polars DataFrame, by calling
+    parse_titration_sheet() on each of its sheets in
+    turn, and validating the combined result once.
+
+    Parameters
+    ----------
+    excel_file_path : str
+        Path to an excel file to parse.
+
+    metadata_row_offset : int
+        Where is the plate metadata row
+        relative to the header row?
+        (This differs among datasheets,
+        but it is typically 0 (same row)
+        or 1 (one row above)
+        
+    sample_id_prefix : str
+        Prefix for the string sample unique ids. Default
+        "sample".
+
+    verbose : bool
+        Print which plate is currently being
+        parsed? Default False.
+
+    temperature : str
+        Temperature for all data in the file
+        as a string parseable by parse_temperature_to_celsius().
+        Otherwise, will attempt to parse temperature
+        metadata from plate header rows.
+        
+    medium : str
+        Medium for all data in the file   
+        
+    virus_name : str
+        Virus name for all data in the file     
+
+    backend : str
+        How to read each sheet; passed to
+        iter_sheet_plates(). Default "pandas",
+        which reads each sheet into memory once.
+
+    **kwargs :
+        Additional keyword arguments passed to
+        pandas.read_excel()
+
+    Returns
+    -------
+    The parsed data, as a long-form tidy
+    polars DataFrame.
+
+    Raises
+    ------
+    A ValueError if validation fails.
+    """
+    excel_file, sheet_names = open_excel_file(excel_file_path, backend)
+
+    sheet_results = [
+        parse_titration_sheet(
+            excel_file,
+            sheet_name,
+            metadata_row_offset,
+            sample_id_prefix=sample_id_prefix,
+            temperature=temperature,
+            medium=medium,
+            virus_name=virus_name,
+            verbose=verbose,
+            backend=backend,
+            validate=False,
+            **kwargs
+        )
+        for sheet_name in sheet_names
+    ]
     all_results = pl.concat(sheet_results)
+    validate_longform_data(all_results)
     return all_results
 
-def main(
+
+def get_sheet_content_hashes(
+    excel_file_path: str,
+) -> dict[str, str]:
+    """
+    Hash the content of each sheet of an .xlsx
+    file without parsing it, by hashing the raw
+    worksheet XML together with the workbook-level
+    parts that determine how its cells are read
+    (shared strings and styles).
+
+    A change to any sheet's strings changes the
+    shared string table, and so the hash of every
+    sheet in the workbook, but sheets of other
+    workbooks are unaffected.
+
+    Parameters
+    ----------
+    excel_file_path : str
+        Path to the .xlsx file to hash.
+
+    Returns
+    -------
+    A dictionary mapping sheet names, in workbook
+    order, to hex digest strings.
+    """
+    ns_main = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+    ns_rel = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+    ns_pkg = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+    def part_path(target):
+        if target.startswith("/"):
+            return target[1:]
+        return posixpath.normpath(posixpath.join("xl", target))
+
+    with zipfile.ZipFile(excel_file_path) as archive:
+        workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+        rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        targets = {
+            rel.get("Id"): (rel.get("Type"), part_path(rel.get("Target")))
+            for rel in rels.iter(ns_pkg + "Relationship")
+        }
+
+        shared = hashlib.sha256()
+        for rel_type, path in sorted(targets.values()):
+            if rel_type.endswith(("/sharedStrings", "/styles")):
+                shared.update(archive.read(path))
+
+        hashes = {}
+        for sheet in workbook.iter(ns_main + "sheet"):
+            sheet_hash = shared.copy()
+            sheet_hash.update(
+                archive.read(targets[sheet.get(ns_rel + "id")][1])
+            )
+            hashes[sheet.get("name")] = sheet_hash.hexdigest()
+
+    return hashes
+
+
+def get_sheet_cache_key(
+    sheet_hash: str,
+    sheet_name: str,
+    parse_kwargs: dict,
+) -> str:
+    """
+    Get the key under which the parsed form of a
+    sheet is cached. The key combines the sheet
+    content hash, the sheet name (from which medium
+    and temperature may be inferred), the arguments
+    that affect parsing, and the source of the modules
+    in PARSER_SOURCES, so that changes to any of these
+    invalidate the cache.
+
+    Parameters
+    ----------
+    sheet_hash : str
+        Hash of the sheet content, as an entry
+        of the output of get_sheet_content_hashes().
+
+    sheet_name : str
+        Name of the sheet.
+
+    parse_kwargs : dict
+        Keyword arguments for parse_titration_sheet().
+        Arguments that do not affect the output
+        (verbose, backend, batched) are ignored.
+
+    Returns
+    -------
+    The cache key, as a hex digest string.
+    """
+    parser_hashes = []
+    for source_name in PARSER_SOURCES:
+        with open(
+            os.path.join(os.path.dirname(__file__), source_name), "rb"
+        ) as source:
+            parser_hashes.append(hashlib.sha256(source.read()).hexdigest())
+
+    key_args = {
+        k: v
+        for k, v in parse_kwargs.items()
+        if k not in ("verbose", "backend", "batched")
+    }
+    key = json.dumps(
+        [parser_hashes, sheet_hash, sheet_name, key_args],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def parse_titration_workbooks(
+    workbooks: list[tuple[str, dict]],
+    n_jobs: int = 1,
+    cache_dir: str = None,
+) -> pl.DataFrame:
+    """
+    Parse several Excel files of titration data
+    to a single tidy polars DataFrame, optionally
+    spreading their sheets across a pool of worker
+    processes and caching the parsed form of each
+    sheet on disk.
+
+    Results are concatenated in workbook order and
+    then sheet order, regardless of the number of
+    jobs or of which sheets are cached, so the output
+    is identical to that of calling parse_titration_data()
+    on each workbook in turn. The combined result,
+    including any sheets loaded from the cache, is
+    validated once.
+
+    Parameters
+    ----------
+    workbooks : list[tuple[str, dict]]
+        List of (excel_file_path, parse_kwargs) tuples,
+        where parse_kwargs are keyword arguments for
+        parse_titration_sheet(), as the output of
+        get_workbook_parse_arguments().
+
+    n_jobs : int
+        Number of worker processes. If 1, parse
+        serially in the current process. Default 1.
+
+    cache_dir : str
+        Directory in which to cache parsed sheets as
+        Parquet files, keyed by get_sheet_cache_key().
+        Sheets found in the cache are loaded rather than
+        parsed. If None, do not cache. Default None.
+
+    Returns
+    -------
+    The parsed data, as a long-form tidy
+    polars DataFrame.
+
+    Raises
+    ------
+    A ValueError if validation fails.
+    """
+    tasks = []
+    excel_files = {}
+    for excel_file_path, parse_kwargs in workbooks:
+        if cache_dir is None:
+            # only .xlsx files can be hashed, so without a
+            # cache, list the sheets of any Excel file
+            excel_file, sheet_names = open_excel_file(
+                excel_file_path, parse_kwargs.get("backend", "pandas")
+            )
+            excel_files[excel_file_path] = excel_file
+            tasks.extend(
+                (excel_file_path, sheet_name, parse_kwargs, None)
+                for sheet_name in sheet_names
+            )
+            continue
+        for sheet_name, sheet_hash in get_sheet_content_hashes(
+            excel_file_path
+        ).items():
+            cache_path = os.path.join(
+                cache_dir,
+                get_sheet_cache_key(sheet_hash, sheet_name, parse_kwargs)
+                + ".parquet",
+            )
+            tasks.append(
+                (excel_file_path, sheet_name, parse_kwargs, cache_path)
+            )
+
+    sheet_results = [None] * len(tasks)
+    for i_task, (_, _, _, cache_path) in enumerate(tasks):
+        if cache_path is not None and os.path.exists(cache_path):
+            sheet_results[i_task] = pl.read_parquet(cache_path)
+    to_parse = [
+        i_task
+        for i_task, result in enumerate(sheet_results)
+        if result is None
+    ]
+
+    if n_jobs < 2:
+        for i_task in to_parse:
+            excel_file_path, sheet_name, parse_kwargs, _ = tasks[i_task]
+            if excel_file_path not in excel_files:
+                excel_files[excel_file_path] = open_excel_file(
+                    excel_file_path,
+                    parse_kwargs.get("backend", "pandas"),
+                )[0]
+            excel_file = excel_files[excel_file_path]
+            sheet_results[i_task] = parse_titration_sheet(
+                excel_file, sheet_name, validate=False, **parse_kwargs
+            )
+    else:
+        # polars is multithreaded, so start workers
+        # fresh rather than forking
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = {
+                i_task: executor.submit(
+                    parse_titration_sheet,
+                    tasks[i_task][0],
+                    tasks[i_task][1],
+                    validate=False,
+                    **tasks[i_task][2]
+                )
+                for i_task in to_parse
+            }
+            for i_task, future in futures.items():
+                sheet_results[i_task] = future.result()
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        for i_task in to_parse:
+            # write to a temporary file and rename it, so that
+            # an interrupted run never leaves a partial file
+            # in the cache
+            cache_path = tasks[i_task][3]
+            sheet_results[i_task].write_parquet(cache_path + ".tmp")
+            os.replace(cache_path + ".tmp", cache_path)
+        print(
+            "Parsed {} sheet(s), loaded {} from cache".format(
+                len(to_parse), len(tasks) - len(to_parse)
+            )
+        )
+
+    all_results = pl.concat(sheet_results)
+    validate_longform_data(all_results)
+    return all_results
+
+
+def get_workbook_parse_arguments(
     excel_file_path_milk: str,
     excel_file_path_surface: str,
     excel_file_path_wastewater: str,
     excel_file_path_rerun: str,
-    save_path: str,
-    separator="\t",
-) -> None:
+) -> list[tuple[str, dict]]:
     """
-    Read in four files worth of Excel formatted
-    titration data, clean them, and save them as a
-    single tidy delimited text file (default .tsv).
+    Pair each of the four Excel files of titration
+    data with the keyword arguments needed to parse
+    it with parse_titration_data(), in the order in
+    which the parsed results are concatenated.
 
     Parameters
     ----------
     excel_file_path_milk: str
-        Path to the excel file to read in with 
+        Path to the excel file with
         4C and 22C raw milk data
 
     excel_file_path_surface: str
-        Path to the excel file to read in with 
+        Path to the excel file with
         4C and 22C steel and polypropylene data
-        
+
     excel_file_path_wastewater: str
-        Path to the excel file to read in with 
+        Path to the excel file with
         wastewater and deionized water data
-    
+
     excel_file_path_rerun: str
-        Path to the excel file to read in with
+        Path to the excel file with
         new data of milk with different fat contents,
         and rubber surface data
 
-    save_path : str
-        path to save the output.
-
-    separator : str
-        Separator string for the delimited
-        text file. Default '\t'
-        (tab-delimited / .tsv).
-
     Returns
     -------
-    None
+    A list of (excel_file_path, parse_kwargs) tuples.
     """
     # constants not encoded in the raw data sheet
-    well_volume = 0.1
     usecols = "A:N"
-    virus_name_all = "H5N1_cow_isolate"
-    verbose_all = False
-    
-    parsed_rerun = parse_titration_data(
-        excel_file_path_rerun,
+    shared_kwargs = dict(
         metadata_row_offset=-1,
         sample_id_prefix="sample",
-        virus_name = virus_name_all,
-        verbose = verbose_all,
-        usecols="B:O",
+        virus_name="H5N1_cow_isolate",
+        verbose=False,
     )
 
-    parsed_milk = parse_titration_data(
+    return [
+        (
             excel_file_path_milk,
-            metadata_row_offset=-1,
-            sample_id_prefix="sample",
             # medium="milk",
-            virus_name = virus_name_all,
-            verbose = verbose_all,
-            usecols=usecols,
-    )
+            dict(**shared_kwargs, usecols=usecols),
+        ),
+        (
+            excel_file_path_surface,
+            dict(**shared_kwargs, usecols=usecols),
+        ),
+        (
+            excel_file_path_wastewater,
+            dict(**shared_kwargs, usecols=usecols, temperature="22C"),
+        ),
+        (
+            excel_file_path_rerun,
+            dict(**shared_kwargs, usecols="B:O"),
+        ),
+    ]
 
-    parsed_surface = parse_titration_data(
-        excel_file_path_surface,
-        metadata_row_offset=-1,
-        sample_id_prefix="sample",
-        virus_name = virus_name_all,
-        verbose = verbose_all,
-        usecols=usecols,
-    )
 
-    parsed_wastewater = parse_titration_data(
-        excel_file_path_wastewater,
-        metadata_row_offset=-1,
-        sample_id_prefix="sample",
-        virus_name = virus_name_all,
-        verbose = verbose_all,
-        usecols=usecols,
-        temperature="22C",
-    )
+def finalize_cleaned_data(
+    parsed: pl.DataFrame,
+    well_volume: float,
+) -> pl.DataFrame:
+    """
+    Turn parsed long-form titration data into
+    the final cleaned dataset: drop unused wells,
+    add the well volume and an experimental condition
+    id, and select the output columns.
 
-    parsed = pl.concat(
-        [parsed_milk, parsed_surface, parsed_wastewater, parsed_rerun]
-    )
-    
+    Parameters
+    ----------
+    parsed : pl.DataFrame
+        Parsed data, as output by parse_titration_data().
+
+    well_volume : float
+        Volume of each well, in mL.
+
+    Returns
+    -------
+    The cleaned data, as a tidy polars DataFrame.
+    """
     # filter out wells that weren't used
     # and add metadata
-    dat = (
+    return (
         parsed.drop_nulls(["well_status"])
         .with_columns(
             well_volume_ml=pl.lit(well_volume),
@@ -587,21 +1879,97 @@ def main(
                 + pl.lit("C")
             )
         )
-        .select(
-            "virus_name",
-            "medium_name",
-            "temperature_celsius",
-            "timepoint_days",
-            "replicate",
-            "log10_dilution",
-            "well_status",
-            "well_volume_ml",
-            "condition_id",
-            "sample_id",
-        )
+        .select(CLEANED_DATA_COLUMNS)
+    )
+
+
+def main(
+    excel_file_path_milk: str,
+    excel_file_path_surface: str,
+    excel_file_path_wastewater: str,
+    excel_file_path_rerun: str,
+    save_path: str,
+    separator="\t",
+    n_jobs: int = 1,
+    cache_dir: str = None,
+    columnar_save_path: str = None,
+) -> None:
+    """
+    Read in four files worth of Excel formatted
+    titration data, clean them, and save them as a
+    single tidy delimited text file (default .tsv),
+    and optionally also in a columnar format.
+
+    Parameters
+    ----------
+    excel_file_path_milk: str
+        Path to the excel file to read in with 
+        4C and 22C raw milk data
+
+    excel_file_path_surface: str
+        Path to the excel file to read in with 
+        4C and 22C steel and polypropylene data
+        
+    excel_file_path_wastewater: str
+        Path to the excel file to read in with 
+        wastewater and deionized water data
+    
+    excel_file_path_rerun: str
+        Path to the excel file to read in with
+        new data of milk with different fat contents,
+        and rubber surface data
+
+    save_path : str
+        path to save the output.
+
+    separator : str
+        Separator string for the delimited
+        text file. Default '\t'
+        (tab-delimited / .tsv).
+
+    n_jobs : int
+        Number of worker processes across which to
+        spread the parsing of workbook sheets. The
+        output does not depend on it. Default 1
+        (parse serially).
+
+    cache_dir : str
+        Directory in which to cache the parsed
+        form of each sheet, so that only new or
+        changed sheets are parsed on subsequent runs.
+        If None, do not cache. Default None.
+
+    columnar_save_path : str
+        Path to also save the output in a compact
+        columnar format (.parquet, or .arrow for an
+        Arrow IPC file), as a narrow well table and
+        a separate sample table; see
+        data_io.write_cleaned_data(). If None, only save
+        the delimited text file. Default None.
+
+    Returns
+    -------
+    None
+    """
+    # constants not encoded in the raw data sheet
+    well_volume = 0.1
+
+    parsed = parse_titration_workbooks(
+        get_workbook_parse_arguments(
+            excel_file_path_milk,
+            excel_file_path_surface,
+            excel_file_path_wastewater,
+            excel_file_path_rerun,
+        ),
+        n_jobs=n_jobs,
+        cache_dir=cache_dir,
     )
+    
+    dat = finalize_cleaned_data(parsed, well_volume)
 
-    dat.write_csv(save_path, separator=separator)
+    write_cleaned_data(dat, save_path, separator=separator)
+    if columnar_save_path is not None:
+        write_cleaned_data(dat, columnar_save_path)
     print("Data cleaned")
 
 
@@ -659,6 +2027,34 @@ if __name__ == "__main__":
         help="Separator for the delimited text file",
         default="\t",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help=(
+            "Number of worker processes to use to parse "
+            "workbook sheets in parallel"
+        ),
+        default=1,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help=(
+            "Directory in which to cache parsed sheets, "
+            "so that unchanged sheets are not parsed again"
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--columnar-path",
+        type=str,
+        help=(
+            "Path to also save the cleaned data in a "
+            "columnar format (.parquet or .arrow)"
+        ),
+        default=None,
+    )
     parsed = vars(parser.parse_args())
     main(
         parsed["excel_file_path_milk"],
@@ -667,4 +2063,7 @@ if __name__ == "__main__":
         parsed["excel_file_path_rerun"],
         parsed["save_path"],
         separator=parsed["separator"],
+        n_jobs=parsed["jobs"],
+        cache_dir=parsed["cache_dir"],
+        columnar_save_path=parsed["columnar_path"],
     )
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+"""
+Clean a directory (or glob) of Excel
+formatted titration data, streaming the
+cleaned data to disk in chunks
+"""
+
+import argparse
+import glob
+import os
+from typing import Iterator
+
+import polars as pl
+import toml
+
+import clean_data as cd
+from config import get_model_parameter
+from data_io import write_cleaned_data_chunks
+
+
+def find_workbooks(input_path: str) -> list[str]:
+    """
+    Find the Excel files of titration data
+    to clean.
+
+    Parameters
+    ----------
+    input_path : str
+        Either a directory, in which case all .xlsx
+        files directly within it are used, or a glob
+        pattern.
+
+    Returns
+    -------
+    A sorted list of paths to Excel files, excluding
+    Excel lock files (whose names start with '~$').
+
+    Raises
+    ------
+    ValueError if no files are found.
+    """
+    if os.path.isdir(input_path):
+        pattern = os.path.join(input_path, "*.xlsx")
+    else:
+        pattern = input_path
+
+    paths = sorted(
+        path
+        for path in glob.glob(pattern)
+        if not os.path.basename(path).startswith("~$")
+    )
+    if len(paths) < 1:
+        raise ValueError(
+            "No Excel files found matching {}".format(pattern)
+        )
+    return paths
+
+
+def get_manifest_parse_arguments(
+    excel_file_path: str,
+    manifest: dict,
+) -> tuple[dict, float]:
+    """
+    Look up how to parse a given Excel file in a
+    manifest, preferring an entry for the file
+    (keyed by its file name) and otherwise falling
+    back on the [default] entry.
+
+    Parameters
+    ----------
+    excel_file_path : str
+        Path to the Excel file.
+
+    manifest : dict
+        Manifest, as a dictionary loaded from
+        a TOML-formatted file.
+
+    Returns
+    -------
+    A tuple of keyword arguments for
+    clean_data.iter_titration_sheet_chunks()
+    and the well volume in mL.
+
+    Raises
+    ------
+    ValueError if a required entry (metadata_row_offset,
+    usecols, virus_name, well_volume_ml) is missing.
+    """
+    file_name = os.path.basename(excel_file_path)
+
+    def lookup(parameter_name, strict=True):
+        return get_model_parameter(
+            manifest, file_name, parameter_name, strict=strict
+        )
+
+    parse_kwargs = dict(
+        metadata_row_offset=lookup("metadata_row_offset"),
+        usecols=lookup("usecols"),
+        virus_name=lookup("virus_name"),
+        sample_id_prefix=lookup("sample_id_prefix", strict=False)
+        or "sample",
+        temperature=lookup("temperature", strict=False),
+        medium=lookup("medium", strict=False),
+        backend=lookup("backend", strict=False) or "pandas",
+    )
+    return parse_kwargs, lookup("well_volume_ml")
+
+
+def iter_cleaned_chunks(
+    excel_file_paths: list[str],
+    manifest: dict,
+    chunk_size: int,
+    verbose: bool = False,
+) -> Iterator[pl.DataFrame]:
+    """
+    Parse and clean Excel files of titration data,
+    one file and sheet at a time, yielding cleaned
+    data in chunks of at most chunk_size plates.
+
+    Parameters
+    ----------
+    excel_file_paths : list[str]
+        Paths to the Excel files to clean.
+
+    manifest : dict
+        Manifest of per-file parse arguments; see
+        get_manifest_parse_arguments().
+
+    chunk_size : int
+        Maximum number of plates per chunk.
+
+    verbose : bool
+        Print each file and sheet as it is parsed?
+        Default False.
+
+    Returns
+    -------
+    An iterator of cleaned data chunks, as tidy
+    polars DataFrames.
+    """
+    for excel_file_path in excel_file_paths:
+        parse_kwargs, well_volume = get_manifest_parse_arguments(
+            excel_file_path, manifest
+        )
+        excel_file, sheet_names = cd.open_excel_file(
+            excel_file_path, parse_kwargs["backend"]
+        )
+        for sheet_name in sheet_names:
+            if verbose:
+                print(
+                    "Parsing sheet '{}' of {}".format(
+                        sheet_name, excel_file_path
+                    )
+                )
+            for chunk in cd.iter_titration_sheet_chunks(
+                excel_file,
+                sheet_name,
+                chunk_size=chunk_size,
+                **parse_kwargs
+            ):
+                yield cd.finalize_cleaned_data(chunk, well_volume)
+
+
+def main(
+    input_path: str,
+    manifest_path: str,
+    save_path: str,
+    separator: str = "\t",
+    chunk_size: int = 256,
+    verbose: bool = False,
+) -> None:
+    """
+    Read in a directory (or glob) of Excel formatted
+    titration data, clean it, and save it as a single
+    tidy delimited text file (default .tsv) or Parquet
+    file, streaming chunks of cleaned plates to disk
+    so that memory use does not grow with the number
+    of plates.
+
+    Parameters
+    ----------
+    input_path : str
+        Directory of .xlsx files, or glob pattern
+        matching the files to clean.
+
+    manifest_path : str
+        Path to a TOML-formatted manifest giving
+        parse arguments. A [default] table gives
+        metadata_row_offset, usecols, virus_name,
+        and well_volume_ml, and optionally
+        sample_id_prefix, temperature, medium, and
+        backend. Tables named after individual files
+        (e.g. ["wastewater-data.xlsx"]) override these
+        for that file.
+
+    save_path : str
+        Path to save the output. Saved as Parquet if
+        it ends in .parquet, and otherwise as a delimited
+        text file.
+
+    separator : str
+        Separator string for the delimited
+        text file. Default '\t'
+        (tab-delimited / .tsv).
+
+    chunk_size : int
+        Maximum number of plates to clean and hold
+        in memory at once. Default 256.
+
+    verbose : bool
+        Print each file and sheet as it is parsed?
+        Default False.
+
+    Returns
+    -------
+    None
+    """
+    manifest = toml.load(manifest_path)
+    excel_file_paths = find_workbooks(input_path)
+
+    n_rows = write_cleaned_data_chunks(
+        iter_cleaned_chunks(
+            excel_file_paths,
+            manifest,
+            chunk_size,
+            verbose=verbose,
+        ),
+        save_path,
+        separator=separator,
+    )
+    print(
+        "Data cleaned: {} wells from {} file(s)".format(
+            n_rows, len(excel_file_paths)
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Read in a directory of Excel formatted "
+            "titration data, clean it, and stream it "
+            "to a tidy delimited text file (default .tsv) "
+            "or Parquet file."
+        )
+    )
+    parser.add_argument(
+        "input_path",
+        type=str,
+        help=(
+            "Directory of .xlsx files to clean, or a "
+            "(quoted) glob pattern matching them"
+        ),
+    )
+    parser.add_argument(
+        "manifest_path",
+        type=str,
+        help=(
+            "Path to a TOML-formatted manifest of "
+            "per-file parse arguments"
+        ),
+    )
+    parser.add_argument(
+        "save_path",
+        type=str,
+        help="Path to save the cleaned data",
+    )
+    parser.add_argument(
+        "--separator",
+        type=str,
+        help="Separator for the delimited text file",
+        default="\t",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help=(
+            "Maximum number of plates to hold in "
+            "memory at once"
+        ),
+        default=256,
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Print each file and sheet as it is parsed",
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        parsed["input_path"],
+        parsed["manifest_path"],
+        parsed["save_path"],
+        separator=parsed["separator"],
+        chunk_size=parsed["chunk_size"],
+        verbose=parsed["verbose"],
+    )
@@ -0,0 +1,195 @@
+"""
+Helper functions for JAX compilation:
+a persistent compilation cache, the
+floating point precision of compiled
+programs, and timing of compilation
+during a fit
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+import jax
+
+PRECISIONS = ["float32", "float64"]
+
+
+def enable_compilation_cache(cache_dir: str) -> None:
+    """
+    Turn on JAX's persistent compilation cache, so
+    that compiled XLA programs (e.g. the NUTS kernel
+    and predictive functions for a model) are saved to
+    disk and reused by later runs with the same model,
+    priors, and data shapes, instead of being compiled
+    again.
+
+    Must be called before JAX compiles anything in
+    the current process.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory in which to store compiled programs.
+        Created if it does not exist.
+
+    Returns
+    -------
+    None
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    jax.config.update("jax_compilation_cache_dir", cache_dir)
+    # cache every program, not just slow-to-compile ones
+    jax.config.update("jax_persistent_cache_min_compile_time_secs", 0)
+    jax.config.update("jax_persistent_cache_min_entry_size_bytes", 0)
+
+
+def set_precision(precision: str = None) -> None:
+    """
+    Set the floating point precision of JAX arrays
+    created and programs compiled from now on in the
+    current process, by turning 64-bit mode on or off.
+    Models must be built after this is called for
+    their data to have the new precision.
+
+    Parameters
+    ----------
+    precision : str
+        One of PRECISIONS. If None, JAX's
+        default, "float32". Default None.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError if the precision is unknown.
+    """
+    if precision is None:
+        precision = "float32"
+    if precision not in PRECISIONS:
+        raise ValueError(
+            "Unknown precision '{}'; expected one of "
+            "{}".format(precision, PRECISIONS)
+        )
+    jax.config.update("jax_enable_x64", precision == "float64")
+
+
+class FitTimer:
+    """
+    Time the phases of a fit, recording for each the
+    wall-clock time, the time spent compiling XLA
+    programs (or loading them from the persistent
+    compilation cache), and the number of persistent
+    cache hits and misses, via jax.monitoring listeners.
+    """
+
+    compile_event = "/jax/core/compile/backend_compile_duration"
+    cache_hit_event = "/jax/compilation_cache/cache_hits"
+    cache_miss_event = "/jax/compilation_cache/cache_misses"
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.phases = []
+        self.counts = None
+        jax.monitoring.register_event_listener(self.on_event)
+        jax.monitoring.register_event_duration_secs_listener(
+            self.on_duration
+        )
+
+    def on_event(self, event: str, **kwargs) -> None:
+        """
+        Count persistent cache hits and misses.
+        """
+        if self.counts is None:
+            return
+        if event == self.cache_hit_event:
+            self.counts["cache_hits"] += 1
+        elif event == self.cache_miss_event:
+            self.counts["cache_misses"] += 1
+
+    def on_duration(self, event: str, duration: float, **kwargs) -> None:
+        """
+        Add up time spent compiling.
+        """
+        if self.counts is not None and event == self.compile_event:
+            self.counts["compile_seconds"] += duration
+            self.counts["n_compiled"] += 1
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time a phase of the fit.
+
+        Parameters
+        ----------
+        name : str
+            Name of the phase, e.g. "mcmc".
+
+        Returns
+        -------
+        A context manager; the phase is timed
+        while the context is active.
+        """
+        self.counts = dict(
+            compile_seconds=0.0,
+            n_compiled=0,
+            cache_hits=0,
+            cache_misses=0,
+        )
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append(
+                dict(
+                    phase=name,
+                    start=phase_start - self.start_time,
+                    seconds=time.perf_counter() - phase_start,
+                    **self.counts,
+                )
+            )
+            self.counts = None
+
+    def print_report(self, first_draw_phase: str = "mcmc") -> None:
+        """
+        Print a table of phase timings, and the time
+        from startup to the first MCMC draw, estimated
+        as the time until the start of first_draw_phase
+        plus the time spent compiling in it.
+
+        Parameters
+        ----------
+        first_draw_phase : str
+            Name of the sampling phase. Default "mcmc".
+
+        Returns
+        -------
+        None
+        """
+        print("Timing report")
+        print(
+            "{:<22}{:>10}{:>12}{:>10}{:>8}{:>8}".format(
+                "phase", "wall (s)", "compile (s)",
+                "compiled", "hits", "misses",
+            )
+        )
+        first_draw = None
+        for phase in self.phases:
+            print(
+                "{phase:<22}{seconds:>10.2f}{compile_seconds:>12.2f}"
+                "{n_compiled:>10}{cache_hits:>8}{cache_misses:>8}"
+                "".format(**phase)
+            )
+            if phase["phase"] == first_draw_phase and first_draw is None:
+                first_draw = phase["start"] + phase["compile_seconds"]
+        if first_draw is not None:
+            print(
+                "Startup to first draw: {:.2f} s".format(first_draw)
+            )
+        print(
+            "Total: {:.2f} s".format(
+                time.perf_counter() - self.start_time
+            )
+        )
@@ -0,0 +1,194 @@
+"""
+Helper functions for storing per-condition
+fits alongside a decomposed fit, so that a refit
+only repeats conditions whose data, priors, or
+MCMC settings have changed
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+import polars as pl
+
+# modules that define the models; changes to
+# them invalidate all stored fits
+MODEL_SOURCES = ["model_factory.py", "well_counts.py"]
+
+# MCMC settings that affect the draws of a fit; all
+# others (how the fit is run, checkpointed, stored,
+# or extended) leave the draws unchanged
+FINGERPRINTED_MCMC_SETTINGS = [
+    "seed",
+    "n_chains",
+    "target_accept_prob",
+    "max_tree_depth",
+    "precision",
+    "compress_wells",
+]
+
+# MCMC settings that shape the stored predictive
+# checks and pruned draws of a per-condition fit
+STORAGE_MCMC_SETTINGS = [
+    "n_prior_predictive",
+    "thin",
+    "stored_sites",
+    "storage_dtype",
+]
+
+
+def get_model_settings(
+    mcmc_config: dict,
+    model_name: str,
+    setting_names: list[str],
+) -> dict:
+    """
+    Get some of a model's MCMC settings, with model
+    settings taking precedence over default ones.
+
+    Parameters
+    ----------
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    model_name : str
+        Name of the model.
+
+    setting_names : list[str]
+        Names of the settings to get.
+
+    Returns
+    -------
+    A dictionary of the settings that are set.
+    """
+    return {
+        k: v
+        for k, v in dict(
+            mcmc_config.get("default", {}),
+            **mcmc_config.get(model_name, {}),
+        ).items()
+        if k in setting_names
+    }
+
+
+def get_condition_fingerprint(
+    data: pl.DataFrame,
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+) -> str:
+    """
+    Get a fingerprint of everything that determines
+    the draws of a fit of a model to a single condition's
+    data: the data, the prior parameters, the model's
+    FINGERPRINTED_MCMC_SETTINGS, and the source of the
+    modules that define the models. Other settings, such
+    as the number of draws or checkpoint_every, do not
+    change the fingerprint, so that checkpoints of a fit
+    (see checkpoint.prepare_checkpoint_dir()) survive
+    changes to them.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data for the condition.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model.
+
+    Returns
+    -------
+    The fingerprint, as a hex digest string.
+    """
+    source_hashes = []
+    for source_name in MODEL_SOURCES:
+        with open(
+            os.path.join(os.path.dirname(__file__), source_name), "rb"
+        ) as source:
+            source_hashes.append(hashlib.sha256(source.read()).hexdigest())
+
+    mcmc_settings = get_model_settings(
+        mcmc_config, model_name, FINGERPRINTED_MCMC_SETTINGS
+    )
+    data_hash = hashlib.sha256(data.write_csv().encode()).hexdigest()
+    key = json.dumps(
+        [source_hashes, model_name, mcmc_settings, prior_params, data_hash],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_condition_store_path(output_path: str) -> str:
+    """
+    Get the path at which to store the per-condition
+    fits of a decomposed fit saved to output_path,
+    as <stem>_conditions<ext>, e.g. halflife.pickle ->
+    halflife_conditions.pickle.
+
+    Parameters
+    ----------
+    output_path : str
+        Path of the saved fit.
+
+    Returns
+    -------
+    The path of the per-condition store.
+    """
+    stem, ext = os.path.splitext(output_path)
+    return "{}_conditions{}".format(stem, ext)
+
+
+def load_condition_fits(store_path: str) -> dict:
+    """
+    Load stored per-condition fits.
+
+    Parameters
+    ----------
+    store_path : str
+        Path to the store, as output by
+        get_condition_store_path().
+
+    Returns
+    -------
+    A dictionary of stored fits keyed by condition_id,
+    each a dictionary with entries fingerprint,
+    storage_settings (the STORAGE_MCMC_SETTINGS of the
+    fit), infer, prior_preds, and posterior_preds. Empty
+    if there is no store at store_path.
+    """
+    if not os.path.exists(store_path):
+        return {}
+    with open(store_path, "rb") as file:
+        return pickle.load(file)
+
+
+def save_condition_fits(store_path: str, condition_fits: dict) -> None:
+    """
+    Save per-condition fits to a store.
+
+    Parameters
+    ----------
+    store_path : str
+        Path to the store, as output by
+        get_condition_store_path().
+
+    condition_fits : dict
+        Fits keyed by condition_id, as described
+        in load_condition_fits().
+
+    Returns
+    -------
+    None
+    """
+    with open(store_path, "wb") as file:
+        pickle.dump(condition_fits, file)
@@ -0,0 +1,155 @@
+"""
+Helper functions for convergence diagnostics of
+MCMC draws: rank-normalized bulk and tail effective
+sample sizes and split R-hat (Vehtari et al. 2021,
+Bayesian Analysis 16(2)), as computed by arviz, for
+deciding when a fit has drawn enough
+"""
+
+import arviz as az
+import numpy as np
+import polars as pl
+
+
+def get_worst_value(values, worst: str) -> float:
+    """
+    Get the worst of the values of a diagnostic over
+    the elements of a site, counting an element with
+    a non-finite or negative effective sample size as
+    having no effective draws (0), and one with a
+    non-finite R-hat as having an infinite R-hat, so
+    that a site with any such element meets no targets.
+
+    Parameters
+    ----------
+    values : array-like
+        Values of the diagnostic, one per element.
+
+    worst : str
+        Which value is worst: "min" for effective
+        sample sizes, "max" for R-hats.
+
+    Returns
+    -------
+    The worst value.
+    """
+    values = np.asarray(values, dtype=float)
+    if worst == "min":
+        return float(
+            np.min(np.where(np.isfinite(values) & (values >= 0), values, 0))
+        )
+    return float(np.max(np.where(np.isfinite(values), values, np.inf)))
+
+
+def get_varying_elements(draws: np.ndarray) -> np.ndarray:
+    """
+    Find the elements of a site whose draws are not
+    all the same, over all chains. Diagnostics of
+    constant elements, e.g. fixed entries of a
+    deterministic site, are undefined, but say
+    nothing about convergence.
+
+    Parameters
+    ----------
+    draws : np.ndarray
+        Draws with leading axes (chain, draw).
+
+    Returns
+    -------
+    A boolean array, True for each element
+    whose draws vary. Elements with NaN draws
+    count as varying.
+    """
+    return ~np.all(draws == draws[:1, :1], axis=(0, 1))
+
+
+def get_convergence_diagnostics(samples: dict) -> pl.DataFrame:
+    """
+    Get the worst convergence diagnostics of each
+    site of a fit, over its elements: its smallest
+    bulk and tail effective sample sizes (arviz.ess()
+    with method "bulk" and "tail") and largest rank
+    R-hat (arviz.rhat() with method "rank"). Elements
+    whose draws are constant over all chains are
+    skipped (see get_varying_elements()), as are sites
+    with no other elements. Other elements whose
+    diagnostics are undefined or invalid count as not
+    converged; see get_worst_value().
+
+    Parameters
+    ----------
+    samples : dict
+        Posterior samples grouped by chain, as
+        output by MCMC.get_samples(group_by_chain=True),
+        with at least 4 draws per chain.
+
+    Returns
+    -------
+    A polars DataFrame with columns site,
+    bulk_ess, tail_ess, and r_hat.
+    """
+    samples = {site: np.asarray(draws) for site, draws in samples.items()}
+    varying = {
+        site: get_varying_elements(draws) for site, draws in samples.items()
+    }
+    dataset = az.convert_to_dataset(samples)
+    bulk_ess = az.ess(dataset, method="bulk")
+    tail_ess = az.ess(dataset, method="tail")
+    r_hat = az.rhat(dataset, method="rank")
+    return pl.DataFrame(
+        [
+            {
+                "site": site,
+                "bulk_ess": get_worst_value(
+                    bulk_ess[site].values[varying[site]], "min"
+                ),
+                "tail_ess": get_worst_value(
+                    tail_ess[site].values[varying[site]], "min"
+                ),
+                "r_hat": get_worst_value(
+                    r_hat[site].values[varying[site]], "max"
+                ),
+            }
+            for site in samples
+            if np.any(varying[site])
+        ],
+        schema=["site", "bulk_ess", "tail_ess", "r_hat"],
+    )
+
+
+def meets_convergence_targets(
+    diagnostics: pl.DataFrame,
+    target_ess: float,
+    target_r_hat: float,
+) -> bool:
+    """
+    Check whether every site of a fit has reached
+    the target effective sample sizes and R-hat.
+
+    Parameters
+    ----------
+    diagnostics : pl.DataFrame
+        Diagnostics of each site, as output by
+        get_convergence_diagnostics().
+
+    target_ess : float
+        Smallest acceptable bulk and tail
+        effective sample size.
+
+    target_r_hat : float
+        R-hat must be below this.
+
+    Returns
+    -------
+    True if every site meets the targets. A site
+    with a non-finite diagnostic does not.
+    """
+    bulk_ess, tail_ess, r_hat = [
+        diagnostics[column].to_numpy()
+        for column in ["bulk_ess", "tail_ess", "r_hat"]
+    ]
+    return bool(
+        np.all(np.isfinite(bulk_ess) & (bulk_ess >= target_ess))
+        and np.all(np.isfinite(tail_ess) & (tail_ess >= target_ess))
+        and np.all(np.isfinite(r_hat) & (r_hat < target_r_hat))
+    )
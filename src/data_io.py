@@ -0,0 +1,420 @@
+"""
+Helper functions for reading and writing
+cleaned data, either as a delimited text file
+or in a compact columnar format (Parquet or
+Arrow IPC), with sample-level attributes in
+a separate sample table
+"""
+
+import os
+from typing import Iterable
+
+import polars as pl
+import pyarrow.parquet as pq
+
+# columns of the cleaned data, in order
+CLEANED_DATA_COLUMNS = [
+    "virus_name",
+    "medium_name",
+    "temperature_celsius",
+    "timepoint_days",
+    "replicate",
+    "log10_dilution",
+    "well_status",
+    "well_volume_ml",
+    "condition_id",
+    "sample_id",
+]
+
+# columns that vary among the wells of a sample;
+# all other columns are attributes of the sample
+WELL_COLUMNS = ["log10_dilution", "well_status"]
+
+
+def get_data_format(path: str) -> str:
+    """
+    Infer the storage format of a cleaned
+    data file from its extension.
+
+    Parameters
+    ----------
+    path : str
+        Path to the data file.
+
+    Returns
+    -------
+    One of "parquet" (.parquet), "ipc" (.arrow,
+    .ipc, or .feather), and "delimited" (anything
+    else).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        return "parquet"
+    elif extension in [".arrow", ".ipc", ".feather"]:
+        return "ipc"
+    return "delimited"
+
+
+def validate_int8_range(data: pl.DataFrame) -> None:
+    """
+    Check that every integer column of a
+    DataFrame fits in an Int8.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        The DataFrame to check.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError if an integer column does not fit in
+    an Int8.
+    """
+    for name, dtype in data.schema.items():
+        if dtype.is_integer() and (
+            data[name].min() < -(2**7) or data[name].max() >= 2**7
+        ):
+            raise ValueError(
+                "Column {} has values outside the Int8 "
+                "range".format(name)
+            )
+
+
+def encode_cleaned_data(data: pl.DataFrame) -> pl.DataFrame:
+    """
+    Convert cleaned data to a compact in-memory
+    representation, storing string columns as
+    Enums (so each distinct string is stored once)
+    and integer columns as Int8.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data, as a tidy polars DataFrame.
+
+    Returns
+    -------
+    The encoded DataFrame.
+
+    Raises
+    ------
+    ValueError if an integer column does not fit in
+    an Int8.
+    """
+    casts = []
+    for name, dtype in data.schema.items():
+        if dtype == pl.String:
+            categories = data[name].unique(maintain_order=True)
+            casts.append(
+                pl.col(name).cast(pl.Enum(categories.to_list()))
+            )
+        elif dtype.is_integer():
+            casts.append(pl.col(name).cast(pl.Int8))
+    validate_int8_range(data)
+    # one contiguous chunk, so that columnar files
+    # are written as a single row group / record batch
+    return data.with_columns(casts).rechunk()
+
+
+def get_sample_table_path(path: str) -> str:
+    """
+    Get the path of the sample table that
+    accompanies a columnar well table.
+
+    Parameters
+    ----------
+    path : str
+        Path to the well table, e.g.
+        "data.parquet".
+
+    Returns
+    -------
+    The path to the sample table, e.g.
+    "data_samples.parquet".
+    """
+    stem, extension = os.path.splitext(path)
+    return "{}_samples{}".format(stem, extension)
+
+
+def normalize_cleaned_data(
+    data: pl.DataFrame,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Split cleaned data into a narrow well table and
+    a sample table, joined by an integer sample_key,
+    so that sample-level attributes (every column not
+    in WELL_COLUMNS) are stored once per sample rather
+    than once per well. Both tables are encoded with
+    encode_cleaned_data().
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data, as a tidy polars DataFrame.
+
+    Returns
+    -------
+    A tuple of the well table (sample_key and
+    WELL_COLUMNS, one row per well, in the original
+    order) and the sample table (sample_key and the
+    sample-level columns, one row per sample, in
+    order of first appearance).
+    """
+    sample_columns = [
+        name for name in data.columns if name not in WELL_COLUMNS
+    ]
+    samples = data.select(sample_columns).unique(maintain_order=True)
+    key_dtype = pl.UInt16 if samples.height <= 2**16 else pl.UInt32
+    samples = samples.with_row_index("sample_key").with_columns(
+        pl.col("sample_key").cast(key_dtype)
+    )
+    # a left join keeps the wells in their original order
+    sample_keys = data.select(sample_columns).join(
+        samples, on=sample_columns, how="left", join_nulls=True
+    )["sample_key"]
+
+    wells = encode_cleaned_data(
+        data.select(WELL_COLUMNS)
+    ).insert_column(0, sample_keys)
+    samples = encode_cleaned_data(
+        samples.drop("sample_key")
+    ).insert_column(0, samples["sample_key"])
+    return (wells, samples)
+
+
+def denormalize_cleaned_data(
+    wells: pl.DataFrame,
+    samples: pl.DataFrame,
+) -> pl.DataFrame:
+    """
+    Invert normalize_cleaned_data(), joining
+    sample attributes back onto each well.
+
+    Parameters
+    ----------
+    wells : pl.DataFrame
+        Well table, as output by normalize_cleaned_data().
+
+    samples : pl.DataFrame
+        Sample table, as output by normalize_cleaned_data().
+
+    Returns
+    -------
+    The cleaned data, one row per well, in the
+    well table's order, with columns in the order
+    of CLEANED_DATA_COLUMNS.
+    """
+    data = wells.join(samples, on="sample_key", how="left")
+    columns = [
+        name for name in CLEANED_DATA_COLUMNS if name in data.columns
+    ]
+    columns += [
+        name
+        for name in data.columns
+        if name not in columns and name != "sample_key"
+    ]
+    return data.select(columns)
+
+
+def decode_cleaned_data(data: pl.DataFrame) -> pl.DataFrame:
+    """
+    Invert encode_cleaned_data(), casting Enum and
+    Categorical columns back to strings and integer
+    columns back to Int64, so that the result matches
+    cleaned data read from a delimited text file.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Encoded data, as a polars DataFrame.
+
+    Returns
+    -------
+    The decoded DataFrame.
+    """
+    casts = []
+    for name, dtype in data.schema.items():
+        if dtype in [pl.Enum, pl.Categorical]:
+            casts.append(pl.col(name).cast(pl.String))
+        elif dtype.is_integer():
+            casts.append(pl.col(name).cast(pl.Int64))
+    return data.with_columns(casts)
+
+
+def write_cleaned_data(
+    data: pl.DataFrame,
+    path: str,
+    separator: str = "\t",
+) -> None:
+    """
+    Save cleaned data to disk, in a format chosen
+    by the file extension (see get_data_format()).
+    Columnar formats are written normalized via
+    normalize_cleaned_data(): a well table at path
+    and a sample table alongside it (see
+    get_sample_table_path()). Arrow IPC files are
+    left uncompressed so that they can be
+    memory-mapped when read.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data to save.
+
+    path : str
+        Path to save the data.
+
+    separator : str
+        Separator string if saving as a delimited
+        text file. Default '\t' (tab-delimited / .tsv).
+
+    Returns
+    -------
+    None
+    """
+    data_format = get_data_format(path)
+    if data_format == "delimited":
+        data.write_csv(path, separator=separator)
+        return
+
+    tables = zip(
+        [path, get_sample_table_path(path)],
+        normalize_cleaned_data(data),
+    )
+    for table_path, table in tables:
+        if data_format == "parquet":
+            table.write_parquet(table_path, compression="zstd")
+        else:
+            table.write_ipc(table_path, compression="uncompressed")
+
+
+def write_cleaned_data_chunks(
+    chunks: Iterable[pl.DataFrame],
+    path: str,
+    separator: str = "\t",
+) -> int:
+    """
+    Save a stream of cleaned data chunks to a single
+    file, appending each chunk as it arrives so that
+    only one chunk need be held in memory at a time.
+
+    Delimited text files get a single header row.
+    Parquet files get one row group per chunk, with
+    integer columns stored as Int8; string columns are
+    dictionary-encoded by Parquet itself. Streaming to
+    Arrow IPC is not supported, because IPC files need
+    a single string dictionary for the whole file.
+
+    Parameters
+    ----------
+    chunks : Iterable[pl.DataFrame]
+        Chunks of cleaned data, all with the
+        same columns.
+
+    path : str
+        Path to save the data.
+
+    separator : str
+        Separator string if saving as a delimited
+        text file. Default '\t' (tab-delimited / .tsv).
+
+    Returns
+    -------
+    The total number of rows written.
+
+    Raises
+    ------
+    ValueError if asked to stream to an Arrow IPC file,
+    or if an integer column of a chunk streamed to a
+    Parquet file does not fit in an Int8.
+    """
+    data_format = get_data_format(path)
+    n_rows = 0
+
+    if data_format == "ipc":
+        raise ValueError(
+            "Cannot stream chunks to an Arrow IPC file; "
+            "use a .parquet or delimited text file instead"
+        )
+    elif data_format == "parquet":
+        writer = None
+        try:
+            for chunk in chunks:
+                validate_int8_range(chunk)
+                table = chunk.with_columns(
+                    pl.col(pl.INTEGER_DTYPES).cast(pl.Int8)
+                ).to_arrow()
+                if writer is None:
+                    writer = pq.ParquetWriter(
+                        path, table.schema, compression="zstd"
+                    )
+                writer.write_table(table)
+                n_rows += chunk.height
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(path, "w") as file:
+            for i_chunk, chunk in enumerate(chunks):
+                chunk.write_csv(
+                    file,
+                    separator=separator,
+                    include_header=(i_chunk == 0),
+                )
+                n_rows += chunk.height
+
+    return n_rows
+
+
+def read_cleaned_data(
+    path: str,
+    separator: str = "\t",
+    decode: bool = True,
+) -> pl.DataFrame:
+    """
+    Read cleaned data from disk, in a format chosen
+    by the file extension (see get_data_format()).
+    Columnar formats are memory-mapped. A normalized
+    well table (one with a sample_key column) is
+    joined back to its sample table via
+    denormalize_cleaned_data().
+
+    Parameters
+    ----------
+    path : str
+        Path to the data.
+
+    separator : str
+        Separator string if reading a delimited
+        text file. Default '\t' (tab-delimited / .tsv).
+
+    decode : bool
+        Decode columnar data via decode_cleaned_data(),
+        so that the result does not depend on the file
+        format? Default True.
+
+    Returns
+    -------
+    The data, as a tidy polars DataFrame.
+    """
+    data_format = get_data_format(path)
+    if data_format == "delimited":
+        return pl.read_csv(path, separator=separator)
+    elif data_format == "parquet":
+        read = pl.read_parquet
+    else:
+        read = pl.read_ipc
+
+    data = read(path, memory_map=True)
+    if "sample_key" in data.columns:
+        data = denormalize_cleaned_data(
+            data, read(get_sample_table_path(path), memory_map=True)
+        )
+
+    if decode:
+        data = decode_cleaned_data(data)
+    return data
@@ -7,18 +7,145 @@ well data.
 """
 
 import argparse
+import copy
+import os
 import pickle
+import shutil
 
 import jax
 import numpy as np
 import numpyro
 import polars as pl
 import toml
-from numpyro.infer import Predictive
-from pyter.infer import Inference
 
+from chain_storage import prune_inference
+from checkpoint import (
+    get_checkpoint_dir,
+    prepare_checkpoint_dir,
+    write_pickle_atomically,
+)
+from compilation import FitTimer, enable_compilation_cache, set_precision
+from condition_store import (
+    STORAGE_MCMC_SETTINGS,
+    get_condition_fingerprint,
+    get_condition_store_path,
+    get_model_settings,
+    load_condition_fits,
+    save_condition_fits,
+)
 from config import get_model_parameter
-from model_factory import model_factory
+from data_io import read_cleaned_data
+from grid_posterior import GRID_MODELS, fit_grid
+from predictive import (
+    append_predictive_draws,
+    get_predictive_store_dir,
+    relativize_predictive_stores,
+    resolve_predictive_stores,
+    run_predictive_in_chunks,
+    stitch_predictive_stores,
+)
+from preview import PREVIEW_METHODS, fit_preview, get_model_arguments
+from resume import (
+    append_draws,
+    check_storage_settings,
+    extend_runner,
+    get_extension_key,
+    get_n_draws_per_chain,
+    get_sampler_state_path,
+    load_sampler_state,
+    save_sampler_state,
+)
+from sampling import (
+    SHARDABLE_MODELS,
+    align_titer_fit,
+    build_model,
+    fit_by_condition,
+    fit_by_sample,
+    get_chain_method,
+    get_condition_seed,
+    run_inference,
+    run_until_converged,
+    split_by_condition,
+    stitch_condition_fits,
+)
+from well_counts import CompressedWellModel
+
+
+def check_divergences(runner) -> None:
+    """
+    Check an MCMC runner's draws for divergent
+    transitions after warmup.
+
+    Parameters
+    ----------
+    runner : MCMC
+        The runner.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError if there is at least one
+    divergent transition.
+    """
+    print("Checking for MCMC convergence problems...")
+    if np.any(runner.get_extra_fields()["diverging"]):
+        raise ValueError(
+            "At least one divergent transition after "
+            "warmup. Exiting without saving results "
+            "because `strict` was set to `True`. "
+            "If you want to save results anyway for "
+            "diagnosis, set `strict = False`"
+        )
+    else:
+        print("No divergent transitions.\n")
+
+
+def get_well_predictive_model(
+    fit,
+    model,
+    mcmc_config: dict,
+    model_name: str,
+) -> tuple:
+    """
+    Get the numpyro model and data with which to draw
+    predictive checks of a fit, one value per well. A fit
+    to counts of positive wells has the same parameters
+    as the model it wraps, so it is checked with that
+    model on the data with one row per well.
+
+    Parameters
+    ----------
+    fit : Inference
+        The fit.
+
+    model :
+        The Pyter model that was fit, possibly a
+        well_counts.CompressedWellModel.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    model_name : str
+        Name of the model.
+
+    Returns
+    -------
+    A tuple (model, data) of the numpyro model
+    and the data to pass to it.
+    """
+    if not isinstance(model, CompressedWellModel):
+        return (model.model, fit.run_data)
+    args, kwargs = get_model_arguments(
+        model.well_data, model.base_model, mcmc_config, model_name
+    )
+    return (
+        model.base_model.model,
+        kwargs["data"] if "data" in kwargs else args[0],
+    )
 
 
 def main(
@@ -29,13 +156,23 @@ def main(
     output_path: str = None,
     separator="\t",
     strict: bool = True,
+    refit_all: bool = False,
+    method: str = "nuts",
+    resume: bool = False,
+    n_extra_draws: int = None,
 ):
     """
     Perform inference from a dataset,
     using Pyter models and a No-U-Turn sampler,
     saving the result to disk as a Python .pickle
     file. Also performs prior and posterior
-    predictive checks.
+    predictive checks, and prints a timing report.
+
+    Settings in the MCMC configuration choose how the
+    fit is run and stored (by condition, in sample
+    shards, with checkpoints, until convergence, in
+    pruned form, and so on); see the README and the
+    help of this script.
 
     Parameters
     ----------
@@ -43,7 +180,8 @@ def main(
         Path to the data file to fit to. Data
         should be in tidy tabular format in a
         delimited text file (default .tsv, see
-        separator)
+        separator), or in a columnar file (.parquet
+        or .arrow) written by clean_data.py
 
     mcmc_config_path : str
         Path to a TOML-formatted configuration
@@ -73,6 +211,24 @@ def main(
         Raise an error if there are divergent transitions
         after warmup? Default True.
 
+    refit_all : bool
+        When fitting conditions separately, refit every
+        condition, ignoring stored fits? Default False.
+
+    method : str
+        How to fit: "nuts" (MCMC), "grid" (for
+        grid_posterior.GRID_MODELS), or a preview
+        method in preview.PREVIEW_METHODS. Default "nuts".
+
+    resume : bool
+        Extend the saved fit at output_path rather than
+        fitting from scratch? Default False.
+
+    n_extra_draws : int
+        Number of draws per chain by which to extend the
+        fit. If None, as many as the fit has drawn,
+        before thinning. Default None.
+
     Return
     ------
     None, saving the result to disk as a side effect
@@ -80,11 +236,28 @@ def main(
     Raises
     ------
     An error there are divergent transitions after
-    warmup and strict is set to true.
+    warmup and strict is set to true, or if method is
+    "grid" and the model is not one of GRID_MODELS.
     """
-    data = pl.read_csv(data_path, separator=separator)
+    if method == "grid" and model_name not in GRID_MODELS:
+        raise ValueError(
+            "Grid fits are only available for models "
+            "{}; got '{}'".format(GRID_MODELS, model_name)
+        )
+    timer = FitTimer()
     mcmc_config = toml.load(mcmc_config_path)
-    prior_params = toml.load(prior_param_path)
+    compilation_cache_dir = get_model_parameter(
+        mcmc_config, model_name, "compilation_cache_dir", strict=False
+    )
+    if compilation_cache_dir is not None:
+        enable_compilation_cache(compilation_cache_dir)
+    set_precision(
+        get_model_parameter(mcmc_config, model_name, "precision", strict=False)
+    )
+
+    with timer.phase("read_data"):
+        data = read_cleaned_data(data_path, separator=separator)
+        prior_params = toml.load(prior_param_path)
     seed = get_model_parameter(
         mcmc_config, model_name, "seed"
     )
@@ -101,83 +274,464 @@ def main(
         n_cores = 1
     numpyro.set_host_device_count(n_cores)
 
-    m_data, model = model_factory(
-        model_name, data, prior_params
+    if output_path is None:
+        output_path = f"{model_name}.pickle"
+    output_dir = os.path.dirname(output_path)
+    predictive_dir = get_predictive_store_dir(output_path)
+    chunk_size = get_model_parameter(
+        mcmc_config, model_name, "predictive_chunk_size", strict=False
+    )
+    stored_sites = get_model_parameter(
+        mcmc_config, model_name, "stored_sites", strict=False
     )
+    thin = (
+        get_model_parameter(mcmc_config, model_name, "thin", strict=False)
+        or 1
+    )
+    storage_dtype = get_model_parameter(
+        mcmc_config, model_name, "storage_dtype", strict=False
+    )
+    storage_settings = dict(
+        stored_sites=stored_sites, thin=thin, storage_dtype=storage_dtype
+    )
+    posterior_check_sites = [
+        "log_titer",
+        "log_titer_intercept",
+        "well_status",
+        "log_halflife",
+    ]
+    if stored_sites is not None:
+        posterior_check_sites = [
+            site for site in posterior_check_sites if site in stored_sites
+        ]
 
-    infer = Inference(
-        target_accept_prob=get_model_parameter(
-            mcmc_config, model_name, "target_accept_prob"
-        ),
-        max_tree_depth=get_model_parameter(
-            mcmc_config, model_name, "max_tree_depth"
-        ),
+    state_path = get_sampler_state_path(output_path)
+    if resume:
+        print(f"Resuming sampling from {state_path}...")
+        sampler_state = load_sampler_state(state_path)
+        check_storage_settings(sampler_state, storage_settings)
+        # keep the draws of the extension that continue the
+        # fit's every thin-th draw
+        thin_offset = -sampler_state["n_draws"] % thin
+        with open(output_path, "rb") as file:
+            infer, prior_preds, posterior_preds = resolve_predictive_stores(
+                pickle.load(file), output_dir
+            )
+        n_draws = get_n_draws_per_chain(infer)
+        if n_extra_draws is None:
+            # as many again as the fit has drawn
+            n_extra_draws = sampler_state["n_draws"]
+        with timer.phase("mcmc"):
+            runner = extend_runner(
+                sampler_state["runner"],
+                sampler_state["extra_fields"],
+                n_extra_draws,
+            )
+        extension = copy.copy(infer)
+        extension.mcmc_runner = runner
+        if strict:
+            check_divergences(runner)
+
+        print("Performing posterior predictive checks of new draws...")
+        with timer.phase("posterior_predictive"):
+            posterior_samples = prune_inference(
+                extension, thin=thin, offset=thin_offset
+            ).mcmc_runner.get_samples()
+            extension_dir = os.path.join(predictive_dir, "extension")
+            predictive_model, predictive_data = get_well_predictive_model(
+                infer, infer.run_model, mcmc_config, model_name
+            )
+            new_posterior_preds = run_predictive_in_chunks(
+                predictive_model,
+                extension_dir,
+                get_extension_key(seed + 2, n_draws),
+                chunk_size,
+                posterior_samples=posterior_samples,
+                return_sites=posterior_check_sites,
+                dtype=storage_dtype,
+                data=predictive_data,
+            )
+            # write the combined draws to a new store, named by
+            # the stored draws per chain, so that the saved fit
+            # stays valid until it is replaced
+            old_posterior_preds = posterior_preds
+            posterior_preds = append_predictive_draws(
+                old_posterior_preds,
+                new_posterior_preds,
+                runner.num_chains,
+                chunk_size or n_extra_draws,
+                os.path.join(
+                    predictive_dir,
+                    "posterior-{}".format(
+                        n_draws
+                        + next(iter(posterior_samples.values())).shape[0]
+                        // runner.num_chains
+                    ),
+                ),
+            )
+            shutil.rmtree(extension_dir)
+        infer = append_draws(
+            infer,
+            prune_inference(
+                extension,
+                sites=stored_sites,
+                thin=thin,
+                dtype=storage_dtype,
+                offset=thin_offset,
+            ),
+        )
+        infer.mcmc_runner.print_summary()
+        timer.print_report()
+
+        print(f"Saving output to {output_path}...")
+        write_pickle_atomically(
+            output_path,
+            relativize_predictive_stores(
+                (infer, prior_preds, posterior_preds), output_dir
+            ),
+        )
+        shutil.rmtree(old_posterior_preds.store_dir)
+        save_sampler_state(
+            state_path,
+            runner,
+            sampler_state["n_draws"] + n_extra_draws,
+            storage_settings,
+        )
+        return
+
+    decompose_by_condition = get_model_parameter(
+        mcmc_config, model_name, "decompose_by_condition", strict=False
     )
-    if n_cores < n_chains:
-        chain_method = "sequential"
+    n_sample_shards = get_model_parameter(
+        mcmc_config, model_name, "n_sample_shards", strict=False
+    )
+    shard_by_sample = n_sample_shards is not None and n_sample_shards > 1
+    if shard_by_sample and model_name not in SHARDABLE_MODELS:
+        raise ValueError(
+            "Only models {} can be fit in shards of samples; "
+            "got '{}'".format(SHARDABLE_MODELS, model_name)
+        )
+    if method != "nuts":
+        # previews and grid fits are quick to fit jointly
+        decompose_by_condition = False
+        shard_by_sample = False
+    if decompose_by_condition:
+        fit_data = split_by_condition(data)
+        condition_ids = [subset["condition_id"][0] for subset in fit_data]
+        store_path = get_condition_store_path(output_path)
+        stored_fits = (
+            {}
+            if refit_all
+            else resolve_predictive_stores(
+                load_condition_fits(store_path), output_dir
+            )
+        )
+        fingerprints = [
+            get_condition_fingerprint(
+                subset, mcmc_config, prior_params, model_name
+            )
+            for subset in fit_data
+        ]
+        storage_settings = get_model_settings(
+            mcmc_config, model_name, STORAGE_MCMC_SETTINGS
+        )
+        condition_dirs = [
+            os.path.join(predictive_dir, "conditions", fingerprint)
+            for fingerprint in fingerprints
+        ]
+        # a stored fit is reusable only if its predictive
+        # checks are still on disk, and were stored the
+        # same way
+        to_fit = [
+            i_condition
+            for i_condition, condition_id in enumerate(condition_ids)
+            if stored_fits.get(condition_id, {}).get("fingerprint")
+            != fingerprints[i_condition]
+            or stored_fits[condition_id].get("storage_settings")
+            != storage_settings
+            or not all(
+                os.path.isdir(os.path.join(condition_dirs[i_condition], kind))
+                for kind in ["prior", "posterior"]
+            )
+        ]
+        print(
+            "Fitting {} of {} conditions; reusing stored "
+            "fits for the rest".format(len(to_fit), len(fit_data))
+        )
     else:
-        chain_method = "parallel"
-
-    infer.infer(
-        data=m_data,
-        model=model,
-        random_seed=seed,
-        num_chains=n_chains,
-        chain_method=chain_method,
+        fit_data = [data]
+        to_fit = [0]
+
+    joint_nuts = method == "nuts" and not (
+        decompose_by_condition or shard_by_sample
     )
-    infer.mcmc_runner.print_summary()
+    until_converged = joint_nuts and bool(
+        get_model_parameter(
+            mcmc_config, model_name, "convergence_check_every", strict=False
+        )
+    )
+    checkpoint_dir = None
+    if joint_nuts and (
+        until_converged
+        or get_model_parameter(
+            mcmc_config, model_name, "checkpoint_every", strict=False
+        )
+    ):
+        checkpoint_dir = get_checkpoint_dir(output_path)
+        if prepare_checkpoint_dir(
+            checkpoint_dir,
+            get_condition_fingerprint(
+                data, mcmc_config, prior_params, model_name
+            ),
+        ):
+            print(f"Found checkpoints of this fit in {checkpoint_dir}")
 
-    if strict:
-        print("Checking for MCMC convergence problems...")
-        if np.any(
-            infer.mcmc_runner.get_extra_fields()[
-                "diverging"
+    with timer.phase("build_model"):
+        models = {
+            i_fit: build_model(
+                fit_data[i_fit], mcmc_config, prior_params, model_name
+            )
+            for i_fit in to_fit
+        }
+
+    chain_method = get_chain_method(
+        n_chains,
+        n_cores,
+        get_model_parameter(
+            mcmc_config, model_name, "chain_method", strict=False
+        ),
+    )
+
+    with timer.phase("mcmc"):
+        if not to_fit:
+            new_fits = []
+        elif method == "grid":
+            new_fits = [
+                fit_grid(
+                    data,
+                    models[0][0],
+                    models[0][1],
+                    mcmc_config,
+                    model_name,
+                    n_chains,
+                    seed,
+                )
             ]
-        ):
-            raise ValueError(
-                "At least one divergent transition after "
-                "warmup. Exiting without saving results "
-                "because `strict` was set to `True`. "
-                "If you want to save results anyway for "
-                "diagnosis, set `strict = False`"
+        elif method != "nuts":
+            new_fits = [
+                fit_preview(
+                    models[0][0],
+                    models[0][1],
+                    mcmc_config,
+                    model_name,
+                    n_chains,
+                    seed,
+                    method=method,
+                )
+            ]
+        elif shard_by_sample:
+            args, kwargs = get_model_arguments(
+                models[0][0], models[0][1], mcmc_config, model_name
+            )
+            new_fits = [
+                align_titer_fit(
+                    stitch_condition_fits(
+                        fit_by_sample(
+                            data,
+                            mcmc_config,
+                            prior_params,
+                            model_name,
+                            n_chains,
+                            seed,
+                            n_sample_shards,
+                            chain_method,
+                        )
+                    ),
+                    args,
+                    kwargs,
+                    models[0][1],
+                )
+            ]
+        elif decompose_by_condition:
+            new_fits = fit_by_condition(
+                pl.concat([fit_data[i_fit] for i_fit in to_fit]),
+                mcmc_config,
+                prior_params,
+                model_name,
+                n_chains,
+                seed,
+                chain_method,
             )
+        elif until_converged:
+            new_fits = [
+                run_until_converged(
+                    data,
+                    mcmc_config,
+                    prior_params,
+                    model_name,
+                    n_chains,
+                    seed,
+                    chain_method,
+                    checkpoint_dir,
+                    m_data=models[0][0],
+                    model=models[0][1],
+                )
+            ]
         else:
-            print("No divergent transitions.\n")
+            new_fits = [
+                run_inference(
+                    data,
+                    mcmc_config,
+                    prior_params,
+                    model_name,
+                    n_chains,
+                    seed,
+                    chain_method,
+                    m_data=models[0][0],
+                    model=models[0][1],
+                    checkpoint_dir=checkpoint_dir,
+                )
+            ]
+    new_fits = dict(zip(to_fit, new_fits))
+    if decompose_by_condition:
+        fits = [
+            new_fits[i_fit]
+            if i_fit in new_fits
+            else stored_fits[condition_id]["infer"]
+            for i_fit, condition_id in enumerate(condition_ids)
+        ]
+    else:
+        fits = [new_fits[0]]
+    infer = stitch_condition_fits(fits)
+    infer.mcmc_runner.print_summary()
 
-    print("Performing predictive checks...")
-    prior_predictive = Predictive(
-        model.model, num_samples=n_prior_pred_samples
-    )
+    if strict:
+        check_divergences(infer.mcmc_runner)
 
-    prior_preds = prior_predictive(
-        rng_key=jax.random.PRNGKey(seed + 1),
-        data=infer.run_data,
-    )
+    print("Performing predictive checks...")
+    prior_preds = []
+    posterior_preds = []
+    for i_fit, fit in enumerate(fits):
+        if i_fit not in new_fits:
+            stored_fit = stored_fits[condition_ids[i_fit]]
+            prior_preds.append(stored_fit["prior_preds"])
+            posterior_preds.append(stored_fit["posterior_preds"])
+            continue
+        if decompose_by_condition:
+            prior_seed = get_condition_seed(seed + 1, condition_ids[i_fit])
+            posterior_seed = get_condition_seed(
+                seed + 2, condition_ids[i_fit]
+            )
+            fit_dir = condition_dirs[i_fit]
+        else:
+            prior_seed = seed + 1
+            posterior_seed = seed + 2
+            fit_dir = predictive_dir
 
-    posterior_predictive = Predictive(
-        model.model,
-        posterior_samples=infer.mcmc_runner.get_samples(),
-        return_sites=[
-            "log_titer",
-            "log_titer_intercept",
-            "well_status",
-            "log_halflife",
-        ],
-    )
+        predictive_model, predictive_data = get_well_predictive_model(
+            fit, models[i_fit][1], mcmc_config, model_name
+        )
+        # check only the draws that will be stored
+        posterior_samples = prune_inference(
+            fit, thin=thin
+        ).mcmc_runner.get_samples()
 
-    posterior_preds = posterior_predictive(
-        rng_key=jax.random.PRNGKey(seed + 2),
-        data=infer.run_data,
-    )
+        with timer.phase("prior_predictive"):
+            prior_preds.append(
+                run_predictive_in_chunks(
+                    predictive_model,
+                    os.path.join(fit_dir, "prior"),
+                    jax.random.PRNGKey(prior_seed),
+                    chunk_size,
+                    num_samples=n_prior_pred_samples,
+                    return_sites=stored_sites,
+                    dtype=storage_dtype,
+                    data=predictive_data,
+                )
+            )
 
-    output = (infer, prior_preds, posterior_preds)
+        with timer.phase("posterior_predictive"):
+            posterior_preds.append(
+                run_predictive_in_chunks(
+                    predictive_model,
+                    os.path.join(fit_dir, "posterior"),
+                    jax.random.PRNGKey(posterior_seed),
+                    chunk_size,
+                    posterior_samples=posterior_samples,
+                    return_sites=posterior_check_sites,
+                    dtype=storage_dtype,
+                    data=predictive_data,
+                )
+            )
 
-    if output_path is None:
-        output_path = f"{model_name}.pickle"
+    if decompose_by_condition:
+        with timer.phase("stitch_predictive"):
+            output = (
+                infer,
+                stitch_predictive_stores(
+                    prior_preds,
+                    os.path.join(predictive_dir, "prior"),
+                    chunk_size or n_prior_pred_samples,
+                ),
+                stitch_predictive_stores(
+                    posterior_preds,
+                    os.path.join(predictive_dir, "posterior"),
+                    chunk_size
+                    or next(iter(posterior_preds[0].values())).shape[0],
+                ),
+            )
+        # drop the checks of conditions that are no longer stored
+        for fit_dir in os.listdir(os.path.join(predictive_dir, "conditions")):
+            if fit_dir not in fingerprints:
+                shutil.rmtree(
+                    os.path.join(predictive_dir, "conditions", fit_dir)
+                )
+    else:
+        output = (infer, prior_preds[0], posterior_preds[0])
+    timer.print_report()
+    output = (
+        prune_inference(
+            output[0], sites=stored_sites, thin=thin, dtype=storage_dtype
+        ),
+    ) + output[1:]
 
     print(f"Saving output to {output_path}...")
-    with open(output_path, "wb") as file:
-        pickle.dump(output, file)
+    write_pickle_atomically(
+        output_path, relativize_predictive_stores(output, output_dir)
+    )
+
+    if joint_nuts:
+        print(f"Saving sampler state to {state_path}...")
+        save_sampler_state(
+            state_path,
+            fits[0].mcmc_runner,
+            get_n_draws_per_chain(fits[0]),
+            storage_settings,
+        )
+    elif os.path.exists(state_path):
+        # the saved state is of an earlier fit
+        os.remove(state_path)
+    if checkpoint_dir is not None:
+        shutil.rmtree(checkpoint_dir)
+
+    if decompose_by_condition:
+        print(f"Saving per-condition fits to {store_path}...")
+        save_condition_fits(
+            store_path,
+            relativize_predictive_stores(
+                {
+                    condition_id: dict(
+                        fingerprint=fingerprints[i_fit],
+                        storage_settings=storage_settings,
+                        infer=fits[i_fit],
+                        prior_preds=prior_preds[i_fit],
+                        posterior_preds=posterior_preds[i_fit],
+                    )
+                    for i_fit, condition_id in enumerate(condition_ids)
+                },
+                output_dir,
+            ),
+        )
 
 
 if __name__ == "__main__":
@@ -186,7 +740,23 @@ if __name__ == "__main__":
             "Read in cleaned data as a tsv or other delimited, "
             "file, fit to it, and save the result as a .pickle "
             "archive."
-        )
+        ),
+        epilog=(
+            "MCMC configuration settings: decompose_by_condition "
+            "fits each condition in its own worker process and "
+            "reuses stored fits of unchanged conditions; "
+            "n_sample_shards fits shards of samples in worker "
+            "processes (individual titers only); checkpoint_every "
+            "saves the draws every N draws per chain, so an "
+            "interrupted fit restarts from the last checkpoint; "
+            "convergence_check_every, target_ess, target_r_hat, and "
+            "max_samples sample until every site converges; "
+            "predictive_chunk_size bounds the memory used by the "
+            "predictive checks; stored_sites, thin, and "
+            "storage_dtype shrink the saved fit; and precision sets "
+            "the floating point precision. Joint MCMC fits also "
+            "save their sampler state, for --resume and --extend."
+        ),
     )
     parser.add_argument(
         "data_path",
@@ -244,6 +814,47 @@ if __name__ == "__main__":
         ),
         default="\t",
     )
+    parser.add_argument(
+        "--refit-all",
+        action="store_true",
+        help=(
+            "When fitting conditions separately, refit "
+            "every condition rather than reusing stored "
+            "fits of unchanged conditions"
+        ),
+    )
+    parser.add_argument(
+        "-m",
+        "--method",
+        type=str,
+        choices=["nuts", "grid"] + PREVIEW_METHODS,
+        help=(
+            "How to fit: MCMC with the No-U-Turn sampler, "
+            "exact draws from a gridded posterior (grid; "
+            "individual titers only), or a quick variational "
+            "(svi) or Laplace approximation preview"
+        ),
+        default="nuts",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Extend the saved fit with as many draws per "
+            "chain again, resuming sampling from its saved "
+            "sampler state without warmup"
+        ),
+    )
+    parser.add_argument(
+        "--extend",
+        type=int,
+        help=(
+            "Extend the saved fit with this many draws per "
+            "chain, resuming sampling from its saved sampler "
+            "state without warmup"
+        ),
+        default=None,
+    )
     parsed = vars(parser.parse_args())
     main(
         parsed["data_path"],
@@ -253,4 +864,8 @@ if __name__ == "__main__":
         output_path=parsed["output_path"],
         separator=parsed["separator"],
         strict=True,
+        refit_all=parsed["refit_all"],
+        method=parsed["method"],
+        resume=parsed["resume"] or parsed["extend"] is not None,
+        n_extra_draws=parsed["extend"],
     )
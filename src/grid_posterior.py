@@ -0,0 +1,352 @@
+"""
+Exact posterior draws for models whose posterior
+factorizes into independent one-dimensional posteriors,
+one per titer, by evaluating each titer's posterior
+density on a grid and sampling from the gridded CDF
+"""
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+import polars as pl
+from numpyro.handlers import seed as seed_handler
+from numpyro.handlers import substitute, trace
+from numpyro.infer import Predictive
+
+from config import get_model_parameter
+from preview import PreviewInference, get_model_arguments, make_sample_runner
+from well_counts import compress_well_data
+
+# models with one independent latent
+# titer per sample and nothing else
+GRID_MODELS = ["individual_titer"]
+
+# in the first, coarse pass, grid over this many
+# prior standard deviations either side of the
+# prior mean
+COARSE_GRID_PRIOR_SDS = 10.0
+
+# in the second, fine pass, grid over the points of
+# the coarse grid with log density within this much
+# of the maximum, padded by one coarse grid spacing
+FINE_GRID_LOG_DENSITY_DROP = 30.0
+
+
+def get_well_titer_index(
+    data: pl.DataFrame,
+    unique_titer_ids,
+) -> np.ndarray:
+    """
+    Get the index of each well's titer among the
+    model's titers.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Data the model was built from, with one
+        row per well (or group of wells), in the
+        model's order.
+
+    unique_titer_ids : array-like
+        The model's titer ids (sample_id values),
+        in the model's order.
+
+    Returns
+    -------
+    An integer array of the titer index of each well.
+    """
+    titer_index = {
+        titer_id: i_titer for i_titer, titer_id in enumerate(unique_titer_ids)
+    }
+    return np.array(
+        [titer_index[titer_id] for titer_id in data["sample_id"].to_list()]
+    )
+
+
+def make_titer_log_density(
+    model_fn,
+    args: tuple,
+    kwargs: dict,
+    well_titer_index: np.ndarray,
+    n_titers: int,
+    site_name: str = "log_titer",
+    well_site_name: str = "well_status",
+):
+    """
+    Make a function that evaluates the unnormalized
+    log posterior density of each titer separately:
+    its log prior density plus the log likelihood of
+    its wells.
+
+    Parameters
+    ----------
+    model_fn : callable
+        The numpyro model.
+
+    args : tuple
+        Positional arguments to the model.
+
+    kwargs : dict
+        Keyword arguments to the model.
+
+    well_titer_index : np.ndarray
+        Titer index of each well, as output by
+        get_well_titer_index().
+
+    n_titers : int
+        Number of titers.
+
+    site_name : str
+        Name of the titer sample site.
+        Default "log_titer".
+
+    well_site_name : str
+        Name of the well status sample site.
+        Default "well_status".
+
+    Returns
+    -------
+    A function taking an array of one value per
+    titer and returning the log density of each
+    titer at its value, with NaNs as -inf.
+    """
+
+    def log_density(values):
+        model_trace = trace(
+            substitute(
+                seed_handler(model_fn, jax.random.PRNGKey(0)),
+                data={site_name: values},
+            )
+        ).get_trace(*args, **kwargs)
+        titer_site = model_trace[site_name]
+        well_site = model_trace[well_site_name]
+        result = titer_site["fn"].log_prob(values) + jax.ops.segment_sum(
+            well_site["fn"].log_prob(well_site["value"]),
+            well_titer_index,
+            num_segments=n_titers,
+        )
+        return jnp.where(jnp.isnan(result), -jnp.inf, result)
+
+    return log_density
+
+
+def evaluate_on_grid(log_density, grid: jax.Array) -> jax.Array:
+    """
+    Evaluate a per-titer log density at each
+    point of a per-titer grid, one grid point at a
+    time, so that memory use does not grow with the
+    number of grid points.
+
+    Parameters
+    ----------
+    log_density : callable
+        Per-titer log density, as output by
+        make_titer_log_density().
+
+    grid : jax.Array
+        Grid of shape (n_grid_points, n_titers).
+
+    Returns
+    -------
+    The log densities, of the same shape as grid.
+    """
+    return jax.lax.map(log_density, grid)
+
+
+def sample_from_grid(
+    rng_key,
+    grid: jax.Array,
+    log_densities: jax.Array,
+    n_draws: int,
+) -> jax.Array:
+    """
+    Draw from the distribution of each titer given by
+    its log density on a grid, by inverse-CDF sampling:
+    the CDF is accumulated with the trapezoidal rule,
+    and uniform draws are mapped through its inverse
+    by linear interpolation.
+
+    Parameters
+    ----------
+    rng_key : jax.Array
+        Random key.
+
+    grid : jax.Array
+        Increasing grid of shape (n_grid_points, n_titers).
+
+    log_densities : jax.Array
+        Unnormalized log densities at the
+        grid points, of the same shape.
+
+    n_draws : int
+        Number of draws of each titer.
+
+    Returns
+    -------
+    Draws of shape (n_draws, n_titers).
+    """
+    densities = jnp.exp(log_densities - jnp.max(log_densities, axis=0))
+    cdf = jnp.concatenate(
+        [
+            jnp.zeros((1, grid.shape[1])),
+            jnp.cumsum(
+                0.5
+                * (densities[1:] + densities[:-1])
+                * jnp.diff(grid, axis=0),
+                axis=0,
+            ),
+        ]
+    )
+    cdf = cdf / cdf[-1]
+    uniforms = jax.random.uniform(rng_key, (n_draws, grid.shape[1]))
+    return jax.vmap(jnp.interp, in_axes=1, out_axes=1)(uniforms, cdf, grid)
+
+
+def fit_grid(
+    data: pl.DataFrame,
+    m_data,
+    model,
+    mcmc_config: dict,
+    model_name: str,
+    n_chains: int,
+    seed: int,
+) -> PreviewInference:
+    """
+    Fit a model whose only latent site is log_titer,
+    with independent titers (one of GRID_MODELS),
+    exactly: evaluate each titer's posterior density on
+    a grid, vectorized across titers, and draw from it
+    with sample_from_grid().
+
+    The grid is found in two passes of n_grid_points
+    points each: a coarse pass over the prior mean plus
+    or minus COARSE_GRID_PRIOR_SDS prior standard
+    deviations, and a fine pass over the part of the
+    coarse grid that holds the posterior mass. The
+    number of grid points and of draws per chain are
+    set in the MCMC configuration by n_grid_points and
+    n_grid_samples.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data the model was built from.
+
+    m_data :
+        Pyter Data object, as output by model_factory().
+
+    model :
+        Pyter Model object, as output by model_factory().
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    model_name : str
+        Name of the model.
+
+    n_chains : int
+        Number of "chains" into which to group the
+        draws, to match the layout of an MCMC fit.
+
+    seed : int
+        Random seed.
+
+    Returns
+    -------
+    The fit, as a PreviewInference with
+    method "grid".
+
+    Raises
+    ------
+    ValueError if the model has latent sites
+    other than log_titer.
+    """
+    args, kwargs = get_model_arguments(
+        m_data, model, mcmc_config, model_name
+    )
+    run_data = kwargs["data"] if "data" in kwargs else args[0]
+    model_trace = trace(
+        seed_handler(model.model, jax.random.PRNGKey(0))
+    ).get_trace(*args, **kwargs)
+    latent_sites = [
+        name
+        for name, site in model_trace.items()
+        if site["type"] == "sample" and not site["is_observed"]
+    ]
+    if latent_sites != ["log_titer"]:
+        raise ValueError(
+            "Grid fits need a model whose only latent site is "
+            "log_titer; got latent sites {}".format(latent_sites)
+        )
+
+    unique_titer_ids = run_data["unique_external_ids"]["titer"]
+    # match the wells of a model fit to counts
+    # of positive wells (see sampling.build_model())
+    if get_model_parameter(
+        mcmc_config, model_name, "compress_wells", strict=False
+    ):
+        data = compress_well_data(data)
+    log_density = make_titer_log_density(
+        model.model,
+        args,
+        kwargs,
+        get_well_titer_index(data, unique_titer_ids),
+        len(unique_titer_ids),
+    )
+    n_grid_points = get_model_parameter(
+        mcmc_config, model_name, "n_grid_points"
+    )
+    prior = model_trace["log_titer"]["fn"]
+    prior_mean = jnp.broadcast_to(prior.mean, prior.shape())
+    prior_sd = jnp.broadcast_to(jnp.sqrt(prior.variance), prior.shape())
+    steps = jnp.linspace(-1.0, 1.0, n_grid_points)[:, None]
+    coarse_grid = prior_mean + COARSE_GRID_PRIOR_SDS * prior_sd * steps
+    coarse_log_densities = evaluate_on_grid(log_density, coarse_grid)
+
+    in_mass = coarse_log_densities > (
+        jnp.max(coarse_log_densities, axis=0) - FINE_GRID_LOG_DENSITY_DROP
+    )
+    spacing = coarse_grid[1] - coarse_grid[0]
+    lower = jnp.min(jnp.where(in_mass, coarse_grid, jnp.inf), axis=0)
+    upper = jnp.max(jnp.where(in_mass, coarse_grid, -jnp.inf), axis=0)
+    fine_grid = (
+        lower - spacing + (upper - lower + 2 * spacing) * (steps + 1.0) / 2.0
+    )
+    fine_log_densities = evaluate_on_grid(log_density, fine_grid)
+
+    sample_key, deterministic_key = jax.random.split(
+        jax.random.PRNGKey(seed)
+    )
+    n_samples = get_model_parameter(mcmc_config, model_name, "n_grid_samples")
+    samples = {
+        "log_titer": sample_from_grid(
+            sample_key, fine_grid, fine_log_densities, n_chains * n_samples
+        )
+    }
+    deterministic_sites = [
+        name
+        for name, site in model_trace.items()
+        if site["type"] == "deterministic"
+    ]
+    if deterministic_sites:
+        samples.update(
+            Predictive(
+                model.model,
+                posterior_samples=samples,
+                return_sites=deterministic_sites,
+            )(deterministic_key, *args, **kwargs)
+        )
+    samples = {
+        name: jnp.reshape(value, (n_chains, n_samples) + value.shape[1:])
+        for name, value in samples.items()
+    }
+    return PreviewInference(
+        make_sample_runner(
+            model.model, samples, latent_sites, args, kwargs
+        ),
+        run_data,
+        model,
+        "grid",
+        None,
+    )
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+"""
+Write synthetic Excel formatted titration
+data, laid out like the raw data workbooks,
+for testing and benchmarking data cleaning
+at scale
+"""
+
+import argparse
+
+import numpy as np
+import openpyxl
+
+from clean_data import parse_duration_to_days
+
+
+def make_plate_rows(
+    timepoint: str,
+    well_calls: np.ndarray,
+    plate_number: int = None,
+    column_span: str = "A:N",
+    rng: np.random.Generator = None,
+) -> list[list]:
+    """
+    Lay out a single 96-well plate as sheet rows,
+    in the format of the raw data: a metadata row
+    giving the timepoint and replicate numbers, a
+    header row of well column numbers, and one row
+    per plate row "A" through "H" of well calls
+    ("+" for positive, "-" or empty otherwise).
+
+    Parameters
+    ----------
+    timepoint : str
+        Timepoint string for the metadata row,
+        e.g. '24h'.
+
+    well_calls : np.ndarray
+        Boolean array of shape (8, 12) that is
+        True for positive wells.
+
+    plate_number : int
+        Plate number to write in column A of the
+        metadata row, for the "B:O" column span. If
+        None, leave column A of the metadata row
+        empty. Default None.
+
+    column_span : str
+        Columns the plate occupies: "A:N" (plate
+        row labels in column A, as in most raw data
+        workbooks) or "B:O" (plate row labels in
+        column B, with plate numbers in column A,
+        as in the rerun workbook). Default "A:N".
+
+    rng : np.random.Generator
+        Random number generator used to choose
+        between "-" and empty cells for negative
+        wells. If None, negative wells are left
+        empty. Default None.
+
+    Returns
+    -------
+    A list of sheet rows, each a list of cell values.
+
+    Raises
+    ------
+    ValueError if the column span is not supported.
+    """
+    if column_span not in ["A:N", "B:O"]:
+        raise ValueError(
+            "Unsupported column span {}; expected "
+            "'A:N' or 'B:O'".format(column_span)
+        )
+    metadata_row = [
+        timepoint, None, 1, None, None, 2, None, None, None, 3
+    ]
+    header_row = [None] + list(range(1, 13)) + ["positive wells"]
+    well_rows = []
+    for row_label, row_calls in zip("ABCDEFGH", well_calls):
+        if rng is not None:
+            negative = np.where(
+                rng.random(row_calls.size) < 0.5, "-", None
+            )
+        else:
+            negative = np.full(row_calls.size, None)
+        well_rows.append(
+            [row_label]
+            + np.where(row_calls, "+", negative).tolist()
+            + [None]
+        )
+
+    rows = [metadata_row, header_row] + well_rows
+    if column_span == "B:O":
+        rows = [[plate_number] + rows[0]] + [
+            [None] + row for row in rows[1:]
+        ]
+    return rows
+
+
+def write_synthetic_workbook(
+    save_path: str,
+    media: list[str],
+    temperatures: list[str],
+    timepoints: list[str],
+    n_plates_per_timepoint: int = 1,
+    column_span: str = "A:N",
+    seed: int = 0,
+) -> int:
+    """
+    Write a synthetic workbook of titration data in
+    the layout parse_titration_data() expects, with
+    one sheet per combination of medium and temperature.
+    Sheets are named '<temperature> <medium>', e.g.
+    '4C raw milk', so that the temperature and medium
+    can be inferred from the sheet name.
+
+    Each well column of each plate is positive down to
+    an endpoint dilution drawn around a titer that
+    decays with time, faster at higher temperatures.
+
+    Parameters
+    ----------
+    save_path : str
+        Path to save the workbook (.xlsx).
+
+    media : list[str]
+        Media, one per sheet per temperature. Must be
+        recognized by clean_data.iter_labelled_sheet_plates(),
+        e.g. "raw milk", "steel", or "wastewater".
+
+    temperatures : list[str]
+        Temperatures, e.g. ["4C", "22C"].
+
+    timepoints : list[str]
+        Timepoint strings parseable by
+        clean_data.parse_duration_to_days(),
+        e.g. ["0h", "24h", "3d"].
+
+    n_plates_per_timepoint : int
+        Number of plates per timepoint per sheet.
+        Default 1.
+
+    column_span : str
+        Column span of each plate; see make_plate_rows().
+        Default "A:N".
+
+    seed : int
+        Seed for the random number generator.
+        Default 0.
+
+    Returns
+    -------
+    The number of plates written.
+    """
+    rng = np.random.default_rng(seed)
+    days = [parse_duration_to_days(t) for t in timepoints]
+
+    # write-only mode streams rows to disk,
+    # so memory use does not grow with workbook size
+    workbook = openpyxl.Workbook(write_only=True)
+    n_plates = 0
+    for medium in media:
+        for temperature in temperatures:
+            sheet = workbook.create_sheet(
+                "{} {}".format(temperature, medium)
+            )
+            sheet.append([None, "synthetic stability data"])
+            sheet.append([None, "{} at {}".format(medium, temperature)])
+            sheet.append([])
+            decay_rate = 0.1 if temperature.startswith("4") else 1.0
+            for timepoint, day in zip(timepoints, days):
+                for _ in range(n_plates_per_timepoint):
+                    log_titer = 6.0 - decay_rate * day
+                    endpoints = np.clip(
+                        np.round(log_titer + rng.normal(0, 0.5, 12)),
+                        0,
+                        8,
+                    )
+                    well_calls = (
+                        np.arange(8)[:, np.newaxis]
+                        < endpoints[np.newaxis, :]
+                    )
+                    n_plates += 1
+                    for row in make_plate_rows(
+                        timepoint,
+                        well_calls,
+                        plate_number=n_plates,
+                        column_span=column_span,
+                        rng=rng,
+                    ):
+                        sheet.append(row)
+                    sheet.append([])
+    workbook.save(save_path)
+    return n_plates
+
+
+def main(
+    save_path: str,
+    media: list[str],
+    temperatures: list[str],
+    timepoints: list[str],
+    n_plates_per_timepoint: int = 1,
+    column_span: str = "A:N",
+    seed: int = 0,
+) -> None:
+    """
+    Write a synthetic workbook of titration
+    data with write_synthetic_workbook().
+
+    Parameters
+    ----------
+    See write_synthetic_workbook().
+
+    Returns
+    -------
+    None
+    """
+    n_plates = write_synthetic_workbook(
+        save_path,
+        media,
+        temperatures,
+        timepoints,
+        n_plates_per_timepoint=n_plates_per_timepoint,
+        column_span=column_span,
+        seed=seed,
+    )
+    print(
+        "Wrote {} plates in {} sheets to {}".format(
+            n_plates, len(media) * len(temperatures), save_path
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Write a synthetic Excel workbook of "
+            "titration data, in the layout of the "
+            "raw data"
+        )
+    )
+    parser.add_argument(
+        "save_path",
+        type=str,
+        help="Path to save the workbook (.xlsx)",
+    )
+    parser.add_argument(
+        "--media",
+        type=str,
+        nargs="+",
+        help="Media, one sheet each per temperature",
+        default=["raw milk", "steel"],
+    )
+    parser.add_argument(
+        "--temperatures",
+        type=str,
+        nargs="+",
+        help="Temperatures, one sheet each per medium",
+        default=["4C", "22C"],
+    )
+    parser.add_argument(
+        "--timepoints",
+        type=str,
+        nargs="+",
+        help="Timepoints, e.g. 0h 24h 3d",
+        default=["0h", "24h", "48h", "72h"],
+    )
+    parser.add_argument(
+        "--plates-per-timepoint",
+        type=int,
+        help="Number of plates per timepoint per sheet",
+        default=1,
+    )
+    parser.add_argument(
+        "--column-span",
+        type=str,
+        choices=["A:N", "B:O"],
+        help="Column span of each plate",
+        default="A:N",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed for the random number generator",
+        default=0,
+    )
+    parsed = vars(parser.parse_args())
+    main(
+        parsed["save_path"],
+        parsed["media"],
+        parsed["temperatures"],
+        parsed["timepoints"],
+        n_plates_per_timepoint=parsed["plates_per_timepoint"],
+        column_span=parsed["column_span"],
+        seed=parsed["seed"],
+    )
@@ -12,11 +12,14 @@ from pyter.models import (
     TiterModel,
 )
 
+from well_counts import CompressedWellModel, compress_well_data
+
 
 def model_factory(
     model_name: str,
     data: pl.DataFrame,
     prior_params: dict,
+    compress_wells: bool = False,
 ) -> tuple[AbstractData, AbstractModel]:
     """
     Instantiate an appropriate pyter Model and Data pair
@@ -37,11 +40,33 @@ def model_factory(
         dictionary of hyperparameter values for
         model prior distributions.
 
+    compress_wells : bool
+        Collapse exchangeable wells (same sample,
+        dilution, and well volume) into counts of
+        positive wells with compress_well_data(), and
+        fit to the counts with a binomial likelihood,
+        which gives the same posterior with fewer terms
+        to evaluate? If so, the model is wrapped in a
+        CompressedWellModel, which also holds Data with
+        one row per well for predictive checks. Default
+        False.
+
     Returns
     -------
     A tuple (data, model) of the instantiated pyter Data object
     and the instantiated pyter Model object.
     """
+    if compress_wells:
+        # the same model set up with one row per well,
+        # for predictive checks of the individual wells
+        well_data, _ = model_factory(model_name, data, prior_params)
+        data = compress_well_data(data)
+        # each group of wells is passed to pyter as a
+        # single well; its status is replaced by the
+        # count of positive wells in the likelihood
+        data = data.with_columns(
+            well_status=pl.col("n_positive") > 0
+        )
 
     if model_name == "individual_titer":
         m_data = TiterData(
@@ -127,4 +152,12 @@ def model_factory(
     else:
         raise ValueError("Unknown model to fit")
 
+    if compress_wells:
+        model = CompressedWellModel(
+            model,
+            n_positive=data["n_positive"].to_numpy(),
+            n_wells=data["n_wells"].to_numpy(),
+            well_data=well_data,
+        )
+
     return m_data, model
@@ -0,0 +1,420 @@
+"""
+Prior and posterior predictive checks evaluated
+in fixed-size chunks of draws and written to disk
+as they go, so that memory use does not grow with
+the number of draws
+"""
+
+import os
+from collections.abc import Mapping
+
+import jax
+import numpy as np
+from numpyro.infer import Predictive
+
+from chain_storage import cast_floating, get_storage_dtype
+from sampling import stitch_samples
+
+
+class PredictiveStore(Mapping):
+    """
+    Read-only dictionary of predictive draws, indexed
+    by site name, stored as one .npy file per site in a
+    directory and loaded memory-mapped, so that only the
+    draws in use are read into memory. Pickles as the
+    path to the directory; saved fits store it relative
+    to the fit (see relativize_predictive_stores()).
+
+    Parameters
+    ----------
+    store_dir : str
+        Directory holding the .npy files.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        path = os.path.join(self.store_dir, name + ".npy")
+        if not os.path.exists(path):
+            raise KeyError(name)
+        return np.load(path, mmap_mode="r")
+
+    def __iter__(self):
+        return iter(
+            sorted(
+                os.path.splitext(file_name)[0]
+                for file_name in os.listdir(self.store_dir)
+                if file_name.endswith(".npy")
+            )
+        )
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def get_predictive_store_dir(output_path: str) -> str:
+    """
+    Get the directory in which to store the predictive
+    draws of a fit saved to output_path, as <stem>_predictive,
+    e.g. halflife.pickle -> halflife_predictive.
+
+    Parameters
+    ----------
+    output_path : str
+        Path of the saved fit.
+
+    Returns
+    -------
+    The path of the directory.
+    """
+    return "{}_predictive".format(os.path.splitext(output_path)[0])
+
+
+def map_predictive_stores(output, fn):
+    """
+    Apply a function to each PredictiveStore in the
+    output of a fit, e.g. (infer, prior_preds,
+    posterior_preds), looking inside tuples, lists,
+    and dictionaries.
+
+    Parameters
+    ----------
+    output :
+        The output.
+
+    fn : callable
+        Function of a PredictiveStore
+        returning a PredictiveStore.
+
+    Returns
+    -------
+    A copy of the output, with each
+    store replaced by its image under fn.
+    """
+    if isinstance(output, PredictiveStore):
+        return fn(output)
+    elif isinstance(output, (tuple, list)):
+        return type(output)(
+            map_predictive_stores(item, fn) for item in output
+        )
+    elif isinstance(output, dict):
+        return {
+            key: map_predictive_stores(item, fn)
+            for key, item in output.items()
+        }
+    return output
+
+
+def relativize_predictive_stores(output, base_dir: str):
+    """
+    Make the directory of each PredictiveStore in the
+    output of a fit relative to base_dir, e.g. the
+    directory of the .pickle it is saved to, so that
+    the saved fit and its stores can be moved together.
+
+    Parameters
+    ----------
+    output :
+        The output; see map_predictive_stores().
+
+    base_dir : str
+        Directory to which to make the
+        store directories relative.
+
+    Returns
+    -------
+    A copy of the output with relative stores.
+    """
+    return map_predictive_stores(
+        output,
+        lambda store: PredictiveStore(
+            os.path.relpath(store.store_dir, base_dir or os.curdir)
+        ),
+    )
+
+
+def resolve_predictive_stores(output, base_dir: str):
+    """
+    Resolve the directory of each PredictiveStore in
+    the output of a fit, as saved relative to base_dir
+    by relativize_predictive_stores().
+
+    Parameters
+    ----------
+    output :
+        The output, as loaded.
+
+    base_dir : str
+        Directory to which the store
+        directories are relative.
+
+    Returns
+    -------
+    A copy of the output with resolved stores.
+    """
+    return map_predictive_stores(
+        output,
+        lambda store: PredictiveStore(
+            os.path.join(base_dir, store.store_dir)
+        ),
+    )
+
+
+def write_chunked_store(
+    store_dir: str,
+    chunks,
+    n_draws: int,
+    dtype: str = None,
+) -> PredictiveStore:
+    """
+    Write chunks of draws to a PredictiveStore,
+    replacing any draws already in it.
+
+    Parameters
+    ----------
+    store_dir : str
+        Directory of the store. Created if
+        it does not exist.
+
+    chunks : iterable
+        Iterable of (start, chunk) tuples, where
+        chunk is a dictionary of arrays of draws
+        indexed by site name, holding draws start
+        onwards along the first axis.
+
+    n_draws : int
+        Total number of draws.
+
+    dtype : str
+        Name of a floating point dtype in which
+        to store floating point draws; see
+        chain_storage.get_storage_dtype(). If None,
+        keep the dtype. Default None.
+
+    Returns
+    -------
+    The PredictiveStore.
+    """
+    dtype = get_storage_dtype(dtype)
+    os.makedirs(store_dir, exist_ok=True)
+    for file_name in os.listdir(store_dir):
+        if file_name.endswith(".npy"):
+            os.remove(os.path.join(store_dir, file_name))
+
+    arrays = {}
+    for start, chunk in chunks:
+        for name, values in chunk.items():
+            values = cast_floating(np.asarray(values), dtype)
+            if name not in arrays:
+                arrays[name] = np.lib.format.open_memmap(
+                    os.path.join(store_dir, name + ".npy"),
+                    mode="w+",
+                    dtype=values.dtype,
+                    shape=(n_draws,) + values.shape[1:],
+                )
+            arrays[name][start:start + values.shape[0]] = values
+    for array in arrays.values():
+        array.flush()
+    return PredictiveStore(store_dir)
+
+
+def run_predictive_in_chunks(
+    model_fn,
+    store_dir: str,
+    rng_key,
+    chunk_size: int = None,
+    num_samples: int = None,
+    posterior_samples: dict = None,
+    return_sites: list[str] = None,
+    dtype: str = None,
+    **model_kwargs
+) -> PredictiveStore:
+    """
+    Draw from a numpyro Predictive a chunk of draws at
+    a time, writing each chunk to a PredictiveStore
+    before drawing the next. Chunk i is drawn with
+    the key jax.random.fold_in(rng_key, i). Without a
+    chunk size, all draws are drawn at once with rng_key
+    itself, as by a single call to the Predictive.
+
+    Parameters
+    ----------
+    model_fn : callable
+        The numpyro model.
+
+    store_dir : str
+        Directory in which to store the draws.
+
+    rng_key : jax.Array
+        Random key.
+
+    chunk_size : int
+        Number of draws per chunk. If None,
+        all at once. Default None.
+
+    num_samples : int
+        Number of prior predictive draws. Ignored
+        if posterior_samples is given. Default None.
+
+    posterior_samples : dict
+        Posterior draws on which to condition, as output
+        by MCMC.get_samples(). If None, draw from the
+        prior predictive. Default None.
+
+    return_sites : list[str]
+        Sites to return; see numpyro.infer.Predictive.
+        Default None.
+
+    dtype : str
+        Name of a floating point dtype in which to
+        store floating point draws; see
+        write_chunked_store(). Default None.
+
+    **model_kwargs :
+        Keyword arguments to the model.
+
+    Returns
+    -------
+    The PredictiveStore.
+    """
+    if posterior_samples is not None:
+        num_samples = next(iter(posterior_samples.values())).shape[0]
+
+    def chunks():
+        for i_chunk, start in enumerate(
+            range(0, num_samples, chunk_size or num_samples)
+        ):
+            stop = min(start + (chunk_size or num_samples), num_samples)
+            if posterior_samples is None:
+                predictive = Predictive(
+                    model_fn,
+                    num_samples=stop - start,
+                    return_sites=return_sites,
+                )
+            else:
+                predictive = Predictive(
+                    model_fn,
+                    posterior_samples={
+                        name: values[start:stop]
+                        for name, values in posterior_samples.items()
+                    },
+                    return_sites=return_sites,
+                )
+            yield start, predictive(
+                rng_key
+                if chunk_size is None
+                else jax.random.fold_in(rng_key, i_chunk),
+                **model_kwargs
+            )
+
+    return write_chunked_store(store_dir, chunks(), num_samples, dtype=dtype)
+
+
+def stitch_predictive_stores(
+    stores: list[PredictiveStore],
+    store_dir: str,
+    chunk_size: int,
+) -> PredictiveStore:
+    """
+    Stitch the predictive draws of per-condition fits
+    into a single store with sampling.stitch_samples(),
+    a chunk of draws at a time.
+
+    Parameters
+    ----------
+    stores : list[PredictiveStore]
+        Stores of the per-condition fits, each
+        with the same number of draws.
+
+    store_dir : str
+        Directory of the stitched store.
+
+    chunk_size : int
+        Number of draws per chunk.
+
+    Returns
+    -------
+    The stitched PredictiveStore.
+    """
+    n_draws = next(iter(stores[0].values())).shape[0]
+
+    def chunks():
+        for start in range(0, n_draws, chunk_size):
+            yield start, stitch_samples(
+                [
+                    {
+                        name: values[start:start + chunk_size]
+                        for name, values in store.items()
+                    }
+                    for store in stores
+                ]
+            )
+
+    return write_chunked_store(store_dir, chunks(), n_draws)
+
+
+def append_predictive_draws(
+    store: PredictiveStore,
+    new_store: PredictiveStore,
+    n_chains: int,
+    chunk_size: int,
+    store_dir: str,
+) -> PredictiveStore:
+    """
+    Append the posterior predictive draws of an
+    extension of a fit (see resume.extend_runner()) to
+    those of the fit, chain by chain, to match the order
+    of the extended fit's draws, a chunk of draws at a
+    time. The combined draws are written to a new store,
+    leaving the old one intact, so that a saved fit that
+    refers to it stays valid until it is replaced by one
+    that refers to the new store.
+
+    Parameters
+    ----------
+    store : PredictiveStore
+        Draws of the fit, with chains in turn.
+
+    new_store : PredictiveStore
+        Draws of the extension, with the same
+        sites and chains.
+
+    n_chains : int
+        Number of chains.
+
+    chunk_size : int
+        Number of draws per chunk.
+
+    store_dir : str
+        Directory of the combined store; not
+        that of store.
+
+    Returns
+    -------
+    The PredictiveStore of the combined draws.
+    """
+    n_draws = next(iter(store.values())).shape[0] // n_chains
+    n_new_draws = next(iter(new_store.values())).shape[0] // n_chains
+
+    def chunks():
+        start = 0
+        for i_chain in range(n_chains):
+            for source, n_source_draws in [
+                (store, n_draws),
+                (new_store, n_new_draws),
+            ]:
+                for offset in range(0, n_source_draws, chunk_size):
+                    source_start = i_chain * n_source_draws + offset
+                    source_stop = i_chain * n_source_draws + min(
+                        offset + chunk_size, n_source_draws
+                    )
+                    yield start, {
+                        name: values[source_start:source_stop]
+                        for name, values in source.items()
+                    }
+                    start += source_stop - source_start
+
+    return write_chunked_store(
+        store_dir, chunks(), n_chains * (n_draws + n_new_draws)
+    )
@@ -0,0 +1,318 @@
+"""
+Fast approximate fits of the Pyter models, with
+stochastic variational inference (SVI) or a Laplace
+approximation, for previewing results before a full
+MCMC run
+"""
+
+import jax
+import jax.numpy as jnp
+import numpyro
+from numpyro.handlers import seed as seed_handler
+from numpyro.handlers import trace
+from numpyro.infer import MCMC, NUTS, SVI, Predictive, Trace_ELBO
+from numpyro.infer.autoguide import AutoLaplaceApproximation, AutoNormal
+from numpyro.infer.hmc import HMCState
+
+from config import get_model_parameter
+from sampling import ModelCallRecorded, ModelCallRecorder, build_inference
+
+PREVIEW_METHODS = ["svi", "laplace"]
+
+
+class PreviewInference:
+    """
+    Result of a fit made without MCMC (an approximate
+    fit with fit_preview(), or an exact grid fit with
+    grid_posterior.fit_grid()), laid out like a Pyter
+    Inference object: draws are in mcmc_runner, a numpyro
+    MCMC (see make_sample_runner()), and the data and model
+    are in run_data and run_model.
+
+    Parameters
+    ----------
+    mcmc_runner : MCMC
+        Runner holding the approximate posterior draws.
+
+    run_data : dict
+        Data the model was fit to, as passed to the
+        numpyro model.
+
+    run_model :
+        The Pyter model.
+
+    method : str
+        Fitting method; one of PREVIEW_METHODS, or "grid".
+
+    losses : jax.Array
+        ELBO loss at each optimization step, or
+        None if not fit by optimization.
+    """
+
+    def __init__(self, mcmc_runner, run_data, run_model, method, losses):
+        self.mcmc_runner = mcmc_runner
+        self.run_data = run_data
+        self.run_model = run_model
+        self.method = method
+        self.losses = losses
+
+
+def get_model_arguments(
+    m_data,
+    model,
+    mcmc_config: dict,
+    model_name: str,
+) -> tuple[tuple, dict]:
+    """
+    Get the arguments with which Pyter calls a model's
+    numpyro model, by starting a Pyter fit with a
+    ModelCallRecorder and stopping it at the first call.
+
+    Parameters
+    ----------
+    m_data :
+        Pyter Data object, as output by model_factory().
+
+    model :
+        Pyter Model object, as output by model_factory().
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    model_name : str
+        Name of the model.
+
+    Returns
+    -------
+    A tuple (args, kwargs) of the positional
+    and keyword arguments.
+
+    Raises
+    ------
+    RuntimeError if Pyter does not call the model.
+    """
+    recorder = ModelCallRecorder(model)
+    try:
+        build_inference(mcmc_config, model_name).infer(
+            data=m_data,
+            model=recorder,
+            random_seed=0,
+            num_chains=1,
+            chain_method="sequential",
+        )
+    except ModelCallRecorded:
+        return recorder.args, recorder.kwargs
+    raise RuntimeError("Pyter did not call the model")
+
+
+def make_sample_runner(
+    model_fn,
+    samples: dict,
+    latent_sites: list[str],
+    args: tuple,
+    kwargs: dict,
+) -> MCMC:
+    """
+    Put posterior draws made some other way than by
+    MCMC into a numpyro MCMC runner, as if it had
+    drawn them, so that get_samples(), get_extra_fields(),
+    print_summary(), and arviz.from_numpyro() work as for
+    an MCMC fit. No transitions are divergent. The runner
+    cannot be resumed with MCMC.run().
+
+    Parameters
+    ----------
+    model_fn : callable
+        The numpyro model.
+
+    samples : dict
+        Draws of each latent and deterministic site,
+        indexed by site name, with leading axes
+        (chain, draw).
+
+    latent_sites : list[str]
+        Names of the latent sample sites.
+
+    args : tuple
+        Positional arguments to the model.
+
+    kwargs : dict
+        Keyword arguments to the model.
+
+    Returns
+    -------
+    The MCMC runner.
+    """
+    n_chains, n_draws = next(iter(samples.values())).shape[:2]
+    runner = MCMC(
+        NUTS(model_fn),
+        num_warmup=0,
+        num_samples=n_draws,
+        num_chains=n_chains,
+        chain_method="sequential",
+        progress_bar=False,
+    )
+    # numpyro keeps draws with a leading chain axis
+    # in _states, and with chains and draws flattened
+    # in _states_flat
+    runner._states = {
+        runner._sample_field: samples,
+        "diverging": jnp.zeros((n_chains, n_draws), dtype=bool),
+    }
+    runner._states_flat = jax.tree_util.tree_map(
+        lambda states: jnp.reshape(states, (-1,) + states.shape[2:]),
+        runner._states,
+    )
+    runner._last_state = HMCState(
+        *[None] * len(HMCState._fields)
+    )._replace(
+        **{
+            runner._sample_field: {
+                name: samples[name][:, -1] for name in latent_sites
+            }
+        }
+    )
+    runner._args = args
+    runner._kwargs = kwargs
+    return runner
+
+
+def fit_preview(
+    m_data,
+    model,
+    mcmc_config: dict,
+    model_name: str,
+    n_chains: int,
+    seed: int,
+    method: str = "svi",
+) -> PreviewInference:
+    """
+    Fit a model approximately, with SVI using a
+    mean-field normal guide ("svi") or with a Laplace
+    approximation at the posterior mode ("laplace"), and
+    draw from the approximate posterior.
+
+    The number of optimization steps, the learning rate,
+    and the number of draws per chain are set in the MCMC
+    configuration by n_preview_steps, preview_learning_rate,
+    and n_preview_samples.
+
+    Parameters
+    ----------
+    m_data :
+        Pyter Data object, as output by model_factory().
+
+    model :
+        Pyter Model object, as output by model_factory().
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    model_name : str
+        Name of the model.
+
+    n_chains : int
+        Number of "chains" into which to group the
+        draws, to match the layout of an MCMC fit.
+
+    seed : int
+        Random seed.
+
+    method : str
+        One of PREVIEW_METHODS. Default "svi".
+
+    Returns
+    -------
+    The fit, as a PreviewInference.
+
+    Raises
+    ------
+    ValueError if the method is unknown.
+    """
+    if method == "svi":
+        guide = AutoNormal(model.model)
+    elif method == "laplace":
+        guide = AutoLaplaceApproximation(model.model)
+    else:
+        raise ValueError(
+            "Unknown preview method '{}'; expected one of "
+            "{}".format(method, PREVIEW_METHODS)
+        )
+    args, kwargs = get_model_arguments(
+        m_data, model, mcmc_config, model_name
+    )
+    fit_key, sample_key, deterministic_key, trace_key = jax.random.split(
+        jax.random.PRNGKey(seed), 4
+    )
+
+    svi = SVI(
+        model.model,
+        guide,
+        numpyro.optim.Adam(
+            get_model_parameter(
+                mcmc_config, model_name, "preview_learning_rate"
+            )
+        ),
+        Trace_ELBO(),
+    )
+    result = svi.run(
+        fit_key,
+        get_model_parameter(mcmc_config, model_name, "n_preview_steps"),
+        *args,
+        progress_bar=False,
+        stable_update=True,
+        **kwargs
+    )
+    print(
+        "Final {} loss: {:.2f}".format(method, float(result.losses[-1]))
+    )
+
+    model_trace = trace(seed_handler(model.model, trace_key)).get_trace(
+        *args, **kwargs
+    )
+    latent_sites = [
+        name
+        for name, site in model_trace.items()
+        if site["type"] == "sample" and not site["is_observed"]
+    ]
+    deterministic_sites = [
+        name
+        for name, site in model_trace.items()
+        if site["type"] == "deterministic"
+    ]
+    n_samples = get_model_parameter(
+        mcmc_config, model_name, "n_preview_samples"
+    )
+    # the Laplace guide is a point mass at the mode when
+    # run as a guide, so draw from the approximate posterior
+    # with sample_posterior(), and then get deterministic
+    # sites by running the model on the draws
+    samples = guide.sample_posterior(
+        sample_key, result.params, sample_shape=(n_chains * n_samples,)
+    )
+    samples = {name: samples[name] for name in latent_sites}
+    if deterministic_sites:
+        samples.update(
+            Predictive(
+                model.model,
+                posterior_samples=samples,
+                return_sites=deterministic_sites,
+            )(deterministic_key, *args, **kwargs)
+        )
+    samples = {
+        name: jnp.reshape(value, (n_chains, n_samples) + value.shape[1:])
+        for name, value in samples.items()
+    }
+
+    run_data = kwargs["data"] if "data" in kwargs else args[0]
+    return PreviewInference(
+        make_sample_runner(
+            model.model, samples, latent_sites, args, kwargs
+        ),
+        run_data,
+        model,
+        method,
+        result.losses,
+    )
@@ -0,0 +1,310 @@
+"""
+Helper functions for saving the state of an MCMC
+sampler after a fit, and for resuming sampling from
+it to extend the fit with more draws, without
+another warmup
+"""
+
+import copy
+import os
+import pickle
+
+import jax
+import numpy as np
+from numpyro.infer import MCMC
+from pyter.infer import Inference
+
+
+def get_sampler_state_path(output_path: str) -> str:
+    """
+    Get the path at which to store the sampler state
+    of a fit saved to output_path, as <stem>_state<ext>,
+    e.g. halflife.pickle -> halflife_state.pickle.
+
+    Parameters
+    ----------
+    output_path : str
+        Path of the saved fit.
+
+    Returns
+    -------
+    The path of the sampler state.
+    """
+    stem, ext = os.path.splitext(output_path)
+    return "{}_state{}".format(stem, ext)
+
+
+def save_sampler_state(
+    state_path: str,
+    runner: MCMC,
+    n_draws: int,
+    storage_settings: dict,
+) -> None:
+    """
+    Save the state of an MCMC runner after sampling,
+    without its draws: the sampler and model, the model
+    arguments, and the last state of each chain, which
+    holds the chain's position and its adapted step size
+    and inverse mass matrix. Also save how the fit's
+    draws were stored, so that an extension can be
+    stored the same way.
+
+    Parameters
+    ----------
+    state_path : str
+        Path at which to save the state, as
+        output by get_sampler_state_path().
+
+    runner : MCMC
+        The runner, after MCMC.run().
+
+    n_draws : int
+        Number of draws per chain the sampler has
+        drawn in all, before any thinning.
+
+    storage_settings : dict
+        Settings with which the fit's draws were
+        stored: stored_sites, thin, and storage_dtype
+        (see chain_storage.prune_inference()).
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError if the runner's last state has no
+    adaptation state, e.g. a fit stitched from
+    per-condition fits.
+    """
+    if runner.last_state is None or runner.last_state.adapt_state is None:
+        raise ValueError(
+            "The fit has no sampler state to save; only "
+            "joint NUTS fits can be resumed"
+        )
+    extra_fields = [
+        field for field in runner._states if field != runner._sample_field
+    ]
+    state_runner = copy.copy(runner)
+    state_runner._states = None
+    state_runner._states_flat = None
+    state_runner._init_state_cache = {}
+    with open(state_path, "wb") as file:
+        pickle.dump(
+            dict(
+                runner=state_runner,
+                extra_fields=extra_fields,
+                n_draws=n_draws,
+                storage_settings=storage_settings,
+            ),
+            file,
+        )
+
+
+def load_sampler_state(state_path: str) -> dict:
+    """
+    Load a saved sampler state.
+
+    Parameters
+    ----------
+    state_path : str
+        Path to the state, as output by
+        get_sampler_state_path().
+
+    Returns
+    -------
+    A dictionary with entries runner (the MCMC runner,
+    without draws), extra_fields (the names of the
+    extra fields it collected), n_draws, and
+    storage_settings, as passed to save_sampler_state().
+
+    Raises
+    ------
+    ValueError if there is no state at state_path.
+    """
+    if not os.path.exists(state_path):
+        raise ValueError(
+            "No sampler state at {}; only joint NUTS fits "
+            "can be resumed".format(state_path)
+        )
+    with open(state_path, "rb") as file:
+        return pickle.load(file)
+
+
+def check_storage_settings(
+    sampler_state: dict,
+    storage_settings: dict,
+) -> None:
+    """
+    Check that an extension of a fit will be stored
+    with the same settings as the fit, so that their
+    draws can be appended to one another.
+
+    Parameters
+    ----------
+    sampler_state : dict
+        Sampler state of the fit, as output by
+        load_sampler_state().
+
+    storage_settings : dict
+        Settings with which to store the
+        extension; see save_sampler_state().
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError if any setting differs from that
+    of the fit.
+    """
+    saved_settings = sampler_state.get("storage_settings", {})
+    changed = [
+        name
+        for name, value in storage_settings.items()
+        if saved_settings.get(name) != value
+    ]
+    if changed:
+        raise ValueError(
+            "Cannot extend the fit: its draws were stored with "
+            "{}, but the MCMC configuration now sets {}. Restore "
+            "the original settings, or refit from scratch".format(
+                ", ".join(
+                    "{} = {}".format(name, saved_settings.get(name))
+                    for name in changed
+                ),
+                ", ".join(
+                    "{} = {}".format(name, storage_settings[name])
+                    for name in changed
+                ),
+            )
+        )
+
+
+def extend_runner(
+    runner: MCMC,
+    extra_fields: list[str],
+    n_draws: int,
+) -> MCMC:
+    """
+    Draw more samples from each chain of an MCMC
+    runner, starting from the last state of each chain
+    with its adapted step size and inverse mass matrix,
+    and skipping warmup. Each chain continues its
+    own stream of random numbers. All chains run in
+    the current process, sequentially unless the runner
+    runs them in parallel or vectorized.
+
+    Parameters
+    ----------
+    runner : MCMC
+        Runner after sampling, e.g. as loaded
+        by load_sampler_state(). Not modified.
+
+    extra_fields : list[str]
+        Extra fields to collect.
+
+    n_draws : int
+        Number of draws per chain.
+
+    Returns
+    -------
+    A new runner holding only the new draws.
+    """
+    runner = copy.copy(runner)
+    runner.post_warmup_state = runner.last_state
+    runner.num_samples = n_draws
+    runner.run(
+        runner.last_state.rng_key,
+        *runner._args,
+        extra_fields=tuple(extra_fields),
+        **runner._kwargs
+    )
+    return runner
+
+
+def append_draws(infer: Inference, new_infer: Inference) -> Inference:
+    """
+    Append the draws of each chain of one fit to those
+    of the same chain of another, e.g. draws from
+    extend_runner() to those of a saved fit.
+
+    Parameters
+    ----------
+    infer : Inference
+        Fit to append to.
+
+    new_infer : Inference
+        Fit with the draws to append, with the same
+        chains, sites, and extra fields.
+
+    Returns
+    -------
+    A copy of infer with both fits' draws, and the
+    last state of new_infer. Its runner's num_samples
+    counts the draws per chain of both, before the
+    runner's thinning, so that arviz.from_numpyro()
+    sees them all.
+    """
+    runner = copy.copy(infer.mcmc_runner)
+    combined = copy.copy(infer)
+    combined.mcmc_runner = runner
+    new_runner = new_infer.mcmc_runner
+    # keep the draws on the host
+    runner._states = jax.tree_util.tree_map(
+        lambda states, new_states: np.concatenate(
+            [np.asarray(states), np.asarray(new_states)], axis=1
+        ),
+        runner._states,
+        new_runner._states,
+    )
+    runner._states_flat = jax.tree_util.tree_map(
+        lambda states: np.reshape(states, (-1,) + states.shape[2:]),
+        runner._states,
+    )
+    runner._last_state = new_runner._last_state
+    runner.num_samples = (
+        get_n_draws_per_chain(infer) + get_n_draws_per_chain(new_infer)
+    )
+    return combined
+
+
+def get_extension_key(seed: int, n_draws: int):
+    """
+    Get a random key for the predictive checks of an
+    extension of a fit, distinct for each extension.
+
+    Parameters
+    ----------
+    seed : int
+        Seed of the fit's posterior predictive check.
+
+    n_draws : int
+        Number of draws per chain in
+        the fit before the extension.
+
+    Returns
+    -------
+    The key.
+    """
+    return jax.random.fold_in(jax.random.PRNGKey(seed), n_draws)
+
+
+def get_n_draws_per_chain(infer: Inference) -> int:
+    """
+    Get the number of draws per chain of a fit, as
+    its runner's num_samples: before the runner's
+    thinning, if any, which fits pruned by
+    chain_storage.prune_inference() do not have.
+
+    Parameters
+    ----------
+    infer : Inference
+        The fit.
+
+    Returns
+    -------
+    The number of draws per chain.
+    """
+    return infer.mcmc_runner.num_samples
@@ -0,0 +1,1299 @@
+"""
+Helper functions for running the MCMC:
+choosing how to run multiple chains,
+setting up Pyter Inference objects,
+running chains in separate processes, and
+fitting experimental conditions separately
+"""
+
+import copy
+import hashlib
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+import polars as pl
+from numpyro.infer import MCMC
+from pyter.infer import Inference
+
+from checkpoint import sample_with_checkpoints
+from compilation import enable_compilation_cache, set_precision
+from config import get_model_parameter
+from convergence import (
+    get_convergence_diagnostics,
+    meets_convergence_targets,
+)
+from model_factory import model_factory
+
+CHAIN_METHODS = ["sequential", "parallel", "vectorized", "processes"]
+
+# models whose every site is indexed by titer, with no
+# parameters shared between samples, and so can be fit
+# in shards of samples with fit_by_sample()
+SHARDABLE_MODELS = ["individual_titer"]
+
+# extra fields of per-condition fits whose joint value is
+# their sum: the joint log density is the sum of the
+# per-condition ones, and the joint cost that of all
+ADDITIVE_EXTRA_FIELDS = ["potential_energy", "energy", "num_steps"]
+
+
+def get_chain_method(
+    n_chains: int,
+    n_cores: int,
+    chain_method: str = None,
+) -> str:
+    """
+    Choose how to run multiple chains.
+
+    Parameters
+    ----------
+    n_chains : int
+        Number of chains to run.
+
+    n_cores : int
+        Number of CPU cores (host devices) available.
+
+    chain_method : str
+        Requested chain method, one of "sequential"
+        (one chain after another), "parallel" (one chain
+        per device), "vectorized" (all chains batched
+        into one compiled kernel on a single device), and
+        "processes" (one single-chain fit per operating
+        system process; see run_chains_in_processes()). If
+        None, run in parallel if there is a core for every
+        chain, and otherwise sequentially. Default None.
+
+    Returns
+    -------
+    The chain method.
+
+    Raises
+    ------
+    ValueError if the requested chain method is unknown.
+    """
+    if chain_method is None:
+        if n_cores < n_chains:
+            return "sequential"
+        return "parallel"
+    if chain_method not in CHAIN_METHODS:
+        raise ValueError(
+            "Unknown chain_method '{}'; expected one of "
+            "{}".format(chain_method, CHAIN_METHODS)
+        )
+    return chain_method
+
+
+class ModelCallRecorded(Exception):
+    """
+    Raised by ModelCallRecorder once it has
+    recorded the arguments of a model call.
+    """
+
+
+class ModelCallRecorder:
+    """
+    Wrap a Pyter model so that the first call to
+    its numpyro model records the arguments and
+    raises ModelCallRecorded, rather than running
+    the model. Other attributes are those of the
+    wrapped model.
+
+    Parameters
+    ----------
+    base_model :
+        Pyter model to wrap.
+    """
+
+    def __init__(self, base_model):
+        self.base_model = base_model
+        self.args = None
+        self.kwargs = None
+
+    def __getattr__(self, name):
+        if name == "base_model":
+            raise AttributeError(name)
+        return getattr(self.base_model, name)
+
+    def model(self, *args, **kwargs):
+        """
+        Record the arguments and stop.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        raise ModelCallRecorded()
+
+
+def build_inference(
+    mcmc_config: dict,
+    model_name: str,
+) -> Inference:
+    """
+    Set up a Pyter Inference object with the sampler
+    settings given in an MCMC configuration.
+
+    Parameters
+    ----------
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    model_name : str
+        Name of the model to fit.
+
+    Returns
+    -------
+    The Inference object.
+    """
+    return Inference(
+        target_accept_prob=get_model_parameter(
+            mcmc_config, model_name, "target_accept_prob"
+        ),
+        max_tree_depth=get_model_parameter(
+            mcmc_config, model_name, "max_tree_depth"
+        ),
+    )
+
+
+def build_model(
+    data: pl.DataFrame,
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+) -> tuple:
+    """
+    Set up a Pyter Data and Model pair with
+    model_factory(), fitting to counts of positive
+    wells if the MCMC configuration sets compress_wells.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data to fit to.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model to fit.
+
+    Returns
+    -------
+    A tuple (data, model) of the Pyter
+    Data object and Model object.
+    """
+    compress_wells = get_model_parameter(
+        mcmc_config, model_name, "compress_wells", strict=False
+    )
+    return model_factory(
+        model_name,
+        data,
+        prior_params,
+        compress_wells=bool(compress_wells),
+    )
+
+
+def build_runner(
+    m_data,
+    model,
+    mcmc_config: dict,
+    model_name: str,
+    n_chains: int,
+    chain_method: str,
+) -> Inference:
+    """
+    Set up a Pyter fit without running it, so that its
+    sampler can be run in segments: start the fit with a
+    ModelCallRecorder, stop it at the first call to the
+    model, and point the numpyro MCMC runner that Pyter
+    built at the model itself, with the recorded
+    arguments.
+
+    Parameters
+    ----------
+    m_data :
+        Pyter Data object, as output by build_model().
+
+    model :
+        Pyter Model object, as output by build_model().
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    model_name : str
+        Name of the model to fit.
+
+    n_chains : int
+        Number of chains.
+
+    chain_method : str
+        How to run the chains; one of "sequential",
+        "parallel", and "vectorized".
+
+    Returns
+    -------
+    The Inference object, with run_data and run_model
+    set, and an mcmc_runner that has not yet run.
+
+    Raises
+    ------
+    RuntimeError if Pyter does not call the model,
+    or does not set up its MCMC runner first.
+    """
+    recorder = ModelCallRecorder(model)
+    infer = build_inference(mcmc_config, model_name)
+    try:
+        infer.infer(
+            data=m_data,
+            model=recorder,
+            random_seed=0,
+            num_chains=n_chains,
+            chain_method=chain_method,
+        )
+    except ModelCallRecorded:
+        pass
+    else:
+        raise RuntimeError("Pyter did not call the model")
+    runner = getattr(infer, "mcmc_runner", None)
+    if runner is None:
+        raise RuntimeError(
+            "Pyter did not set up an MCMC runner before calling the model"
+        )
+    runner.sampler._model = model.model
+    runner._args = recorder.args
+    runner._kwargs = recorder.kwargs
+    infer.run_data = (
+        recorder.kwargs["data"]
+        if "data" in recorder.kwargs
+        else recorder.args[0]
+    )
+    infer.run_model = model
+    return infer
+
+
+def spawn_seeds(seed: int, n_seeds: int) -> list[int]:
+    """
+    Derive distinct, reproducible random seeds
+    (e.g. one per chain) from a single seed.
+
+    Parameters
+    ----------
+    seed : int
+        The seed for the fit, e.g. the seed
+        set in the MCMC configuration.
+
+    n_seeds : int
+        Number of seeds to derive.
+
+    Returns
+    -------
+    A list of n_seeds integer seeds.
+    """
+    return [
+        int(child.generate_state(1)[0])
+        for child in np.random.SeedSequence(seed).spawn(n_seeds)
+    ]
+
+
+def get_condition_seed(seed: int, condition_id: str) -> int:
+    """
+    Derive a reproducible random seed for fitting
+    a single experimental condition from the seed
+    for the fit and the condition's id, so that a
+    condition gets the same seed whatever other
+    conditions are in the data.
+
+    Parameters
+    ----------
+    seed : int
+        The seed for the fit.
+
+    condition_id : str
+        Id of the condition.
+
+    Returns
+    -------
+    An integer seed.
+    """
+    condition_hash = hashlib.sha256(str(condition_id).encode()).digest()
+    return int(
+        np.random.SeedSequence(
+            [seed, int.from_bytes(condition_hash[:8], "little")]
+        ).generate_state(1)[0]
+    )
+
+
+def run_fit_in_worker(
+    data: pl.DataFrame,
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+    seed: int,
+    n_chains: int = 1,
+    chain_method: str = "sequential",
+    checkpoint_dir: str = None,
+    n_draws: int = None,
+) -> Inference:
+    """
+    Build a model and fit it, at the precision set by
+    the MCMC configuration, using the persistent
+    compilation cache if the MCMC configuration sets
+    compilation_cache_dir. Run by each worker process
+    of run_chains_in_processes() and fit_by_condition().
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data to fit to.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model to fit.
+
+    seed : int
+        Random seed for the fit.
+
+    n_chains : int
+        Number of chains. Default 1.
+
+    chain_method : str
+        How to run the chains; one of "sequential"
+        and "vectorized". Default "sequential".
+
+    checkpoint_dir : str
+        Directory in which to checkpoint the
+        fit; see run_inference(). Default None.
+
+    n_draws : int
+        Number of draws per chain, when checkpointing;
+        see run_inference(). Default None.
+
+    Returns
+    -------
+    The fit Inference object.
+    """
+    compilation_cache_dir = get_model_parameter(
+        mcmc_config, model_name, "compilation_cache_dir", strict=False
+    )
+    if compilation_cache_dir is not None:
+        enable_compilation_cache(compilation_cache_dir)
+    set_precision(
+        get_model_parameter(mcmc_config, model_name, "precision", strict=False)
+    )
+    return run_inference(
+        data,
+        mcmc_config,
+        prior_params,
+        model_name,
+        n_chains,
+        seed,
+        chain_method,
+        checkpoint_dir=checkpoint_dir,
+        n_draws=n_draws,
+    )
+
+
+def merge_chain_runners(runners: list[MCMC]) -> MCMC:
+    """
+    Merge single-chain numpyro MCMC runners into
+    one multi-chain runner, as if all the chains
+    had been run by a single MCMC.run() call, so that
+    get_samples(group_by_chain=True), get_extra_fields(),
+    print_summary(), and arviz.from_numpyro() see every
+    chain, in the order given.
+
+    Parameters
+    ----------
+    runners : list[MCMC]
+        Runners that have each run a single chain
+        of the same model on the same data.
+
+    Returns
+    -------
+    The merged runner, a copy of the first.
+    """
+    merged = copy.copy(runners[0])
+    # numpyro keeps the states of all chains with
+    # a leading chain axis in _states, and with
+    # chains and draws flattened in _states_flat
+    merged._states = jax.tree_util.tree_map(
+        lambda *states: jnp.concatenate(states, axis=0),
+        *[runner._states for runner in runners],
+    )
+    merged._states_flat = jax.tree_util.tree_map(
+        lambda states: jnp.reshape(states, (-1,) + states.shape[2:]),
+        merged._states,
+    )
+    merged._last_state = jax.tree_util.tree_map(
+        lambda *states: jnp.stack(states),
+        *[runner._last_state for runner in runners],
+    )
+    if merged._warmup_state is not None:
+        merged._warmup_state = jax.tree_util.tree_map(
+            lambda *states: jnp.stack(states),
+            *[runner._warmup_state for runner in runners],
+        )
+    merged.num_chains = len(runners)
+    return merged
+
+
+def run_chains_in_processes(
+    data: pl.DataFrame,
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+    n_chains: int,
+    seed: int,
+    checkpoint_dir: str = None,
+    n_draws: int = None,
+) -> Inference:
+    """
+    Fit a model with each chain in its own operating
+    system process, so that chains run at the same time
+    without numpyro's parallel chain method, then merge
+    the chains into a single Inference object.
+
+    Each process fits a single chain with run_fit_in_worker(),
+    seeded with a seed derived from the given seed by
+    spawn_seeds().
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data to fit to.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model to fit.
+
+    n_chains : int
+        Number of chains, and of processes.
+
+    seed : int
+        Random seed for the fit.
+
+    checkpoint_dir : str
+        Directory in which to checkpoint the fit; see
+        run_inference(). Each chain is checkpointed in
+        its own subdirectory, chain-<i_chain>. Default
+        None.
+
+    n_draws : int
+        Number of draws per chain, when checkpointing;
+        see run_inference(). Default None.
+
+    Returns
+    -------
+    A copy of the Inference object of the first chain,
+    with the samples and extra fields of all chains
+    merged into its mcmc_runner by merge_chain_runners().
+    """
+    # JAX is multithreaded, so start workers
+    # fresh rather than forking
+    with ProcessPoolExecutor(
+        max_workers=n_chains,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        futures = [
+            executor.submit(
+                run_fit_in_worker,
+                data,
+                mcmc_config,
+                prior_params,
+                model_name,
+                chain_seed,
+                checkpoint_dir=(
+                    None
+                    if checkpoint_dir is None
+                    else os.path.join(
+                        checkpoint_dir, "chain-{}".format(i_chain)
+                    )
+                ),
+                n_draws=n_draws,
+            )
+            for i_chain, chain_seed in enumerate(
+                spawn_seeds(seed, n_chains)
+            )
+        ]
+        infers = [future.result() for future in futures]
+    merged = copy.copy(infers[0])
+    merged.mcmc_runner = merge_chain_runners(
+        [infer.mcmc_runner for infer in infers]
+    )
+    return merged
+
+
+def run_inference(
+    data: pl.DataFrame,
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+    n_chains: int,
+    seed: int,
+    chain_method: str,
+    m_data=None,
+    model=None,
+    checkpoint_dir: str = None,
+    n_draws: int = None,
+) -> Inference:
+    """
+    Fit a model with the given chain method.
+
+    If checkpoint_dir is given, sample checkpoint_every
+    draws per chain at a time (as set in the MCMC
+    configuration; if unset, all at once), checkpointing
+    the draws and the sampler state in checkpoint_dir
+    after each segment, and continue from the last
+    checkpoint there if there is one; see
+    checkpoint.sample_with_checkpoints().
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data to fit to.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model to fit.
+
+    n_chains : int
+        Number of chains.
+
+    seed : int
+        Random seed for the fit.
+
+    chain_method : str
+        How to run the chains; see get_chain_method().
+
+    m_data :
+        Model data, as output by build_model(). If None,
+        built from data. Ignored for the "processes" chain
+        method, whose workers each build their own.
+        Default None.
+
+    model :
+        Model, as output by build_model(). If None,
+        built from data. Ignored for the "processes" chain
+        method. Default None.
+
+    checkpoint_dir : str
+        Directory in which to checkpoint the fit,
+        prepared by checkpoint.prepare_checkpoint_dir().
+        If None, do not checkpoint. Default None.
+
+    n_draws : int
+        Number of draws per chain, when checkpointing.
+        If None, as many as Pyter draws. Default None.
+
+    Returns
+    -------
+    The fit Inference object.
+    """
+    if chain_method == "processes":
+        return run_chains_in_processes(
+            data,
+            mcmc_config,
+            prior_params,
+            model_name,
+            n_chains,
+            seed,
+            checkpoint_dir=checkpoint_dir,
+            n_draws=n_draws,
+        )
+    if m_data is None or model is None:
+        m_data, model = build_model(
+            data, mcmc_config, prior_params, model_name
+        )
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        infer = build_runner(
+            m_data, model, mcmc_config, model_name, n_chains, chain_method
+        )
+        if n_draws is not None:
+            infer.mcmc_runner.num_samples = n_draws
+        sample_with_checkpoints(
+            infer.mcmc_runner,
+            jax.random.PRNGKey(seed),
+            checkpoint_dir,
+            get_model_parameter(
+                mcmc_config, model_name, "checkpoint_every", strict=False
+            )
+            or infer.mcmc_runner.num_samples,
+        )
+        return infer
+    infer = build_inference(mcmc_config, model_name)
+    infer.infer(
+        data=m_data,
+        model=model,
+        random_seed=seed,
+        num_chains=n_chains,
+        chain_method=chain_method,
+    )
+    return infer
+
+
+def run_until_converged(
+    data: pl.DataFrame,
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+    n_chains: int,
+    seed: int,
+    chain_method: str,
+    checkpoint_dir: str,
+    m_data=None,
+    model=None,
+) -> Inference:
+    """
+    Fit a model in blocks of convergence_check_every draws
+    per chain, as set in the MCMC configuration, until
+    every site's bulk and tail effective sample sizes
+    reach target_ess and its R-hat is below target_r_hat
+    (see convergence.get_convergence_diagnostics()), or
+    until max_samples draws per chain.
+
+    Each block continues each chain from the checkpoint
+    that the block before left in checkpoint_dir (see
+    run_inference()), so the draws are those of a single
+    run, whatever the chain method. With the "processes"
+    chain method, each block starts its worker processes
+    afresh, and each worker imports jax and compiles the
+    model again before it draws, which costs several
+    seconds per block; set convergence_check_every large
+    enough that this is small next to the time the block
+    takes to sample, and set compilation_cache_dir so that
+    workers reuse the compiled model. Prints the worst
+    diagnostics after each block.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data to fit to.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model to fit.
+
+    n_chains : int
+        Number of chains.
+
+    seed : int
+        Random seed for the fit.
+
+    chain_method : str
+        How to run the chains; see get_chain_method().
+
+    checkpoint_dir : str
+        Directory in which to checkpoint the fit,
+        prepared by checkpoint.prepare_checkpoint_dir().
+
+    m_data :
+        Model data; see run_inference(). Default None.
+
+    model :
+        Model; see run_inference(). Default None.
+
+    Returns
+    -------
+    The fit Inference object.
+    """
+    block_size = get_model_parameter(
+        mcmc_config, model_name, "convergence_check_every"
+    )
+    target_ess = get_model_parameter(mcmc_config, model_name, "target_ess")
+    target_r_hat = get_model_parameter(
+        mcmc_config, model_name, "target_r_hat"
+    )
+    max_samples = get_model_parameter(mcmc_config, model_name, "max_samples")
+    n_draws = 0
+    while True:
+        n_draws = min(n_draws + block_size, max_samples)
+        infer = run_inference(
+            data,
+            mcmc_config,
+            prior_params,
+            model_name,
+            n_chains,
+            seed,
+            chain_method,
+            m_data=m_data,
+            model=model,
+            checkpoint_dir=checkpoint_dir,
+            n_draws=n_draws,
+        )
+        diagnostics = get_convergence_diagnostics(
+            infer.mcmc_runner.get_samples(group_by_chain=True)
+        )
+        worst = {
+            column: diagnostics.sort(
+                column, descending=column == "r_hat"
+            ).row(0, named=True)
+            for column in ["bulk_ess", "tail_ess", "r_hat"]
+        }
+        print(
+            "After {} draws per chain: smallest bulk ESS {:.0f} ({}), "
+            "smallest tail ESS {:.0f} ({}), largest R-hat {:.3f} "
+            "({})".format(
+                n_draws,
+                worst["bulk_ess"]["bulk_ess"],
+                worst["bulk_ess"]["site"],
+                worst["tail_ess"]["tail_ess"],
+                worst["tail_ess"]["site"],
+                worst["r_hat"]["r_hat"],
+                worst["r_hat"]["site"],
+            )
+        )
+        if meets_convergence_targets(diagnostics, target_ess, target_r_hat):
+            print(
+                "Met the convergence targets (ESS >= {}, "
+                "R-hat < {})\n".format(target_ess, target_r_hat)
+            )
+            return infer
+        if n_draws >= max_samples:
+            print(
+                "Drew max_samples ({}) draws per chain without meeting "
+                "the convergence targets (ESS >= {}, R-hat < {})\n".format(
+                    max_samples, target_ess, target_r_hat
+                )
+            )
+            return infer
+
+
+def split_by_condition(data: pl.DataFrame) -> list[pl.DataFrame]:
+    """
+    Split cleaned data into one DataFrame per
+    experimental condition, in order of first
+    appearance in the data.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data.
+
+    Returns
+    -------
+    A list of polars DataFrames, one per condition_id.
+    """
+    return data.partition_by("condition_id", maintain_order=True)
+
+
+def fit_by_condition(
+    data: pl.DataFrame,
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+    n_chains: int,
+    seed: int,
+    chain_method: str = "sequential",
+    n_jobs: int = None,
+) -> list[Inference]:
+    """
+    Fit a model separately to the data for each
+    experimental condition, in a pool of worker
+    processes. This gives the same posterior as a fit
+    to all the data if the model shares no parameters
+    between conditions, as for the halflife model with
+    halflives_hier=False, whose halflives, intercept
+    hyperparameters, and titer error scales are all
+    per condition. Stitch the fits together with
+    stitch_condition_fits().
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data to fit to.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model to fit.
+
+    n_chains : int
+        Number of chains per condition.
+
+    seed : int
+        Random seed for the fit. Each condition is
+        fit with a seed derived from it and the condition
+        id by get_condition_seed().
+
+    chain_method : str
+        How to run the chains of each condition. Workers
+        have a single device and do not start processes of
+        their own, so chain methods other than "vectorized"
+        run sequentially. Default "sequential".
+
+    n_jobs : int
+        Number of worker processes. If None, one per
+        condition, up to the number of CPUs. Default None.
+
+    Returns
+    -------
+    A list of fit Inference objects, one per
+    condition, in the order of split_by_condition().
+    """
+    condition_data = split_by_condition(data)
+    return fit_in_pool(
+        condition_data,
+        mcmc_config,
+        prior_params,
+        model_name,
+        n_chains,
+        [
+            get_condition_seed(seed, data_subset["condition_id"][0])
+            for data_subset in condition_data
+        ],
+        chain_method=chain_method,
+        n_jobs=n_jobs,
+    )
+
+
+def split_by_sample(
+    data: pl.DataFrame,
+    n_shards: int,
+) -> list[pl.DataFrame]:
+    """
+    Split cleaned data into shards of whole samples,
+    as nearly equal in number of samples as possible,
+    each holding a contiguous block of the sample_ids
+    in order of first appearance in the data.
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data.
+
+    n_shards : int
+        Number of shards. If there are fewer
+        samples, one shard per sample.
+
+    Returns
+    -------
+    A list of polars DataFrames, one per shard.
+    """
+    sample_ids = data["sample_id"].unique(maintain_order=True).to_numpy()
+    return [
+        data.filter(pl.col("sample_id").is_in(pl.Series(shard_ids)))
+        for shard_ids in np.array_split(sample_ids, n_shards)
+        if len(shard_ids) > 0
+    ]
+
+
+def fit_by_sample(
+    data: pl.DataFrame,
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+    n_chains: int,
+    seed: int,
+    n_shards: int,
+    chain_method: str = "sequential",
+    n_jobs: int = None,
+) -> list[Inference]:
+    """
+    Fit a model separately to shards of the data
+    split by sample with split_by_sample(), in a pool of
+    worker processes. This gives the same posterior as
+    a fit to all the data if the model shares no
+    parameters between samples, as for the individual
+    titer model (see SHARDABLE_MODELS). Stitch the fits
+    together with stitch_condition_fits(), and put the
+    titers back in the order of a fit to all the data
+    with align_titer_fit().
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Cleaned data to fit to.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model to fit.
+
+    n_chains : int
+        Number of chains per shard.
+
+    seed : int
+        Random seed for the fit. Each shard is fit
+        with a seed spawned from it by spawn_seeds().
+
+    n_shards : int
+        Number of shards.
+
+    chain_method : str
+        How to run the chains of each shard;
+        see fit_in_pool(). Default "sequential".
+
+    n_jobs : int
+        Number of worker processes. If None, one per
+        shard, up to the number of CPUs. Default None.
+
+    Returns
+    -------
+    A list of fit Inference objects, one per
+    shard, in the order of split_by_sample().
+    """
+    shard_data = split_by_sample(data, n_shards)
+    return fit_in_pool(
+        shard_data,
+        mcmc_config,
+        prior_params,
+        model_name,
+        n_chains,
+        spawn_seeds(seed, len(shard_data)),
+        chain_method=chain_method,
+        n_jobs=n_jobs,
+    )
+
+
+def fit_in_pool(
+    data_subsets: list[pl.DataFrame],
+    mcmc_config: dict,
+    prior_params: dict,
+    model_name: str,
+    n_chains: int,
+    seeds: list[int],
+    chain_method: str = "sequential",
+    n_jobs: int = None,
+) -> list[Inference]:
+    """
+    Fit a model separately to each of several
+    subsets of the data, in a pool of worker processes.
+
+    Parameters
+    ----------
+    data_subsets : list[pl.DataFrame]
+        Cleaned data to fit to, one DataFrame per fit.
+
+    mcmc_config : dict
+        MCMC configuration, as a dictionary loaded
+        from a TOML-formatted file.
+
+    prior_params : dict
+        Hyperparameter values for prior distributions.
+
+    model_name : str
+        Name of the model to fit.
+
+    n_chains : int
+        Number of chains per fit.
+
+    seeds : list[int]
+        Random seed for each fit.
+
+    chain_method : str
+        How to run the chains of each fit. Workers
+        have a single device and do not start processes of
+        their own, so "parallel" and "processes" run
+        sequentially, with a warning. Default "sequential".
+
+    n_jobs : int
+        Number of worker processes. If None, one per
+        fit, up to the number of CPUs. Default None.
+
+    Returns
+    -------
+    A list of fit Inference objects, one
+    per subset, in the order given.
+    """
+    if chain_method in ["parallel", "processes"]:
+        warnings.warn(
+            "Worker processes run their chains sequentially; "
+            "ignoring chain_method '{}'".format(chain_method)
+        )
+        chain_method = "sequential"
+    if n_jobs is None:
+        n_jobs = min(len(data_subsets), os.cpu_count())
+    # JAX is multithreaded, so start workers
+    # fresh rather than forking
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        futures = [
+            executor.submit(
+                run_fit_in_worker,
+                data_subset,
+                mcmc_config,
+                prior_params,
+                model_name,
+                subset_seed,
+                n_chains=n_chains,
+                chain_method=chain_method,
+            )
+            for data_subset, subset_seed in zip(data_subsets, seeds)
+        ]
+        return [future.result() for future in futures]
+
+
+def stitch_samples(
+    samples: list[dict],
+    n_sample_dims: int = 1,
+) -> dict:
+    """
+    Stitch together samples from fits of a model to
+    disjoint subsets of the data (see fit_by_condition()),
+    concatenating each site along its last axis, so that
+    site entries follow the concatenated ids of the fits.
+
+    Parameters
+    ----------
+    samples : list[dict]
+        Samples of each fit, as dictionaries of arrays
+        indexed by site name, e.g. the output of
+        MCMC.get_samples() or of a Predictive.
+
+    n_sample_dims : int
+        Number of leading axes that index draws rather
+        than entries of the site: 1 for MCMC.get_samples()
+        and Predictive output, 2 for samples grouped by
+        chain. Default 1.
+
+    Returns
+    -------
+    The stitched samples, as a dictionary
+    of arrays indexed by site name.
+
+    Raises
+    ------
+    ValueError if a site is a single parameter
+    for each fit, which would be shared between
+    the subsets in a fit to all the data.
+    """
+    stitched = {}
+    for name, site_samples in samples[0].items():
+        if jnp.ndim(site_samples) <= n_sample_dims:
+            raise ValueError(
+                "Site '{}' has no entries to stitch; a parameter "
+                "shared between subsets of the data means the "
+                "posterior does not factorize over them".format(name)
+            )
+        stitched[name] = jnp.concatenate(
+            [fit_samples[name] for fit_samples in samples], axis=-1
+        )
+    return stitched
+
+
+def stitch_condition_fits(infers: list[Inference]) -> Inference:
+    """
+    Stitch per-condition fits from fit_by_condition()
+    (or per-shard fits from fit_by_sample()) into a
+    single result, as if all conditions had been
+    fit together.
+
+    The result's run_data unique_external_ids
+    concatenate those of all the fits, to match the
+    stitched samples (see stitch_samples()). Other
+    entries of run_data are those of the first fit.
+    Boolean extra fields are True at a draw if True
+    for any condition (e.g. diverging), the
+    ADDITIVE_EXTRA_FIELDS are summed, and other extra
+    fields, which have no joint value (e.g.
+    accept_prob), are dropped. Each condition
+    adapts its own step size and mass matrix, so the
+    result's last state holds only the stitched last
+    positions, without adaptation state, and the result
+    cannot be resumed.
+
+    Parameters
+    ----------
+    infers : list[Inference]
+        Per-condition fits, each with the
+        same number of chains and draws.
+
+    Returns
+    -------
+    The stitched Inference object, a copy
+    of the first fit.
+    """
+    if len(infers) == 1:
+        return infers[0]
+    runners = [infer.mcmc_runner for infer in infers]
+    runner = copy.copy(runners[0])
+    merged = copy.copy(infers[0])
+    merged.mcmc_runner = runner
+    sample_field = runner._sample_field
+    states = {
+        sample_field: stitch_samples(
+            [fit._states[sample_field] for fit in runners],
+            n_sample_dims=2,
+        )
+    }
+    for field in runner._states:
+        if field == sample_field:
+            continue
+        field_values = jnp.stack([fit._states[field] for fit in runners])
+        if field_values.dtype == jnp.bool_:
+            states[field] = jnp.any(field_values, axis=0)
+        elif field in ADDITIVE_EXTRA_FIELDS:
+            states[field] = jnp.sum(field_values, axis=0)
+    runner._states = states
+    runner._states_flat = jax.tree_util.tree_map(
+        lambda states: jnp.reshape(states, (-1,) + states.shape[2:]),
+        states,
+    )
+    # keep only the stitched positions of the last state,
+    # which numpyro reads to tell latent sites apart
+    last_state_type = type(runner._last_state)
+    runner._last_state = last_state_type(
+        *[None] * len(last_state_type._fields)
+    )._replace(
+        **{
+            sample_field: stitch_samples(
+                [getattr(fit._last_state, sample_field) for fit in runners],
+                n_sample_dims=int(runner.num_chains > 1),
+            )
+        }
+    )
+    runner._warmup_state = None
+
+    unique_external_ids = merged.run_data["unique_external_ids"]
+    merged.run_data = dict(
+        merged.run_data,
+        unique_external_ids={
+            key: np.concatenate(
+                [
+                    infer.run_data["unique_external_ids"][key]
+                    for infer in infers
+                ]
+            )
+            for key in unique_external_ids
+        },
+    )
+    return merged
+
+
+def align_titer_fit(
+    infer: Inference,
+    args: tuple,
+    kwargs: dict,
+    run_model,
+) -> Inference:
+    """
+    Put the titers of a fit stitched from per-shard
+    fits (see fit_by_sample()) in the order of a fit
+    of the same model to all the data, and give it that
+    fit's model arguments, run_data, and run_model, so
+    that it can be used (e.g. for predictive checks or
+    arviz.from_numpyro()) as if it were that fit.
+
+    Parameters
+    ----------
+    infer : Inference
+        The stitched fit.
+
+    args : tuple
+        Positional arguments with which the fit to
+        all the data calls its numpyro model, e.g. as
+        output by preview.get_model_arguments().
+
+    kwargs : dict
+        Keyword arguments to the model.
+
+    run_model :
+        Pyter Model object for all the data.
+
+    Returns
+    -------
+    An aligned copy of the fit.
+
+    Raises
+    ------
+    ValueError if the fits have different titers, or
+    a site is not indexed by titer along its last axis.
+    """
+    run_data = kwargs["data"] if "data" in kwargs else args[0]
+    titer_ids = run_data["unique_external_ids"]["titer"]
+    stitched_ids = infer.run_data["unique_external_ids"]["titer"]
+    stitched_index = {
+        titer_id: i_titer for i_titer, titer_id in enumerate(stitched_ids)
+    }
+    if len(stitched_ids) != len(titer_ids) or not all(
+        titer_id in stitched_index for titer_id in titer_ids
+    ):
+        raise ValueError("Stitched fit and full fit have different titers")
+    order = np.array([stitched_index[titer_id] for titer_id in titer_ids])
+
+    def reorder(values):
+        if values.ndim == 0 or values.shape[-1] != len(order):
+            raise ValueError(
+                "Cannot align a site of shape {} with {} "
+                "titers".format(values.shape, len(order))
+            )
+        return values[..., order]
+
+    runner = copy.copy(infer.mcmc_runner)
+    aligned = copy.copy(infer)
+    aligned.mcmc_runner = runner
+    sample_field = runner._sample_field
+    runner._states = dict(
+        runner._states,
+        **{
+            sample_field: jax.tree_util.tree_map(
+                reorder, runner._states[sample_field]
+            )
+        },
+    )
+    runner._states_flat = jax.tree_util.tree_map(
+        lambda states: jnp.reshape(states, (-1,) + states.shape[2:]),
+        runner._states,
+    )
+    runner._last_state = runner._last_state._replace(
+        **{
+            sample_field: jax.tree_util.tree_map(
+                reorder, getattr(runner._last_state, sample_field)
+            )
+        }
+    )
+    runner._args = args
+    runner._kwargs = kwargs
+    # the kernel's model may hold per-shard data, e.g.
+    # a CompressedWellModel's counts of positive wells
+    runner.sampler = copy.copy(runner.sampler)
+    runner.sampler._model = run_model.model
+    aligned.run_data = run_data
+    aligned.run_model = run_model
+    return aligned
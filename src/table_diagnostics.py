@@ -32,7 +32,10 @@ def main(
 
     mcmc = ana.load_mcmc(mcmc_path)[0].mcmc_runner
 
-    az_mcmc = az.from_numpyro(mcmc)
+    # the diagnostics need no log likelihood, which
+    # cannot be computed if the fit stores only some
+    # sites (see chain_storage.prune_inference())
+    az_mcmc = az.from_numpyro(mcmc, log_likelihood=False)
 
     tab = az.summary(
         az_mcmc, kind="diagnostics", round_to=5
@@ -0,0 +1,189 @@
+"""
+Compression of well-level titration data
+into counts of positive wells, and a binomial
+likelihood for fitting Pyter models to the counts
+"""
+
+import jax.numpy as jnp
+import numpyro.distributions as dist
+import polars as pl
+from numpyro.primitives import Messenger
+
+
+def compress_well_data(data: pl.DataFrame) -> pl.DataFrame:
+    """
+    Collapse exchangeable wells into counts. Wells
+    are exchangeable if they share a sample, a
+    dilution, and a well volume (and so every other
+    column of the cleaned data except the well status).
+
+    Parameters
+    ----------
+    data : pl.DataFrame
+        Tidy cleaned data, with one row per well.
+
+    Returns
+    -------
+    A polars DataFrame with one row per group of
+    exchangeable wells, with all the columns of the
+    data except well_status, plus n_positive (the
+    number of positive wells in the group) and
+    n_wells (the number of wells in the group), in
+    order of first appearance in the data.
+    """
+    group_columns = [
+        column for column in data.columns if column != "well_status"
+    ]
+    return data.group_by(group_columns, maintain_order=True).agg(
+        n_positive=pl.col("well_status").cast(pl.Int64).sum(),
+        n_wells=pl.len().cast(pl.Int64),
+    )
+
+
+def get_binomial_likelihood(fn, total_count) -> dist.Distribution:
+    """
+    Get the binomial counterpart of a Bernoulli
+    distribution of well statuses: the distribution of
+    the number of successes among total_count draws
+    with the same probability of success, parametrized
+    as fn is (by probabilities or by logits), and
+    expanded, masked, or with batch dimensions
+    reinterpreted as event dimensions as fn is.
+
+    Parameters
+    ----------
+    fn : dist.Distribution
+        A Bernoulli distribution, possibly wrapped
+        in ExpandedDistribution, MaskedDistribution,
+        or Independent.
+
+    total_count : array-like
+        Number of draws of each element.
+
+    Returns
+    -------
+    The binomial distribution.
+
+    Raises
+    ------
+    TypeError if fn is not a (wrapped)
+    Bernoulli distribution.
+    """
+    if isinstance(fn, dist.ExpandedDistribution):
+        return get_binomial_likelihood(fn.base_dist, total_count).expand(
+            fn.batch_shape
+        )
+    elif isinstance(fn, dist.MaskedDistribution):
+        return get_binomial_likelihood(fn.base_dist, total_count).mask(
+            fn._mask
+        )
+    elif isinstance(fn, dist.Independent):
+        return get_binomial_likelihood(fn.base_dist, total_count).to_event(
+            fn.reinterpreted_batch_ndims
+        )
+    elif isinstance(fn, dist.BernoulliLogits):
+        return dist.Binomial(total_count=total_count, logits=fn.logits)
+    elif isinstance(fn, dist.BernoulliProbs):
+        return dist.Binomial(total_count=total_count, probs=fn.probs)
+    raise TypeError(
+        "Expected a Bernoulli well status distribution; "
+        "got {}".format(type(fn).__name__)
+    )
+
+
+class WellCountLikelihood(Messenger):
+    """
+    numpyro effect handler that replaces the
+    Bernoulli likelihood of each well's status at
+    a model's well status sample site with a binomial
+    likelihood for the number of positive wells among
+    n_wells exchangeable wells with the same probability
+    of being positive. Since the binomial coefficient
+    does not depend on the parameters, the posterior
+    is the same as that of the individual wells.
+
+    Parameters
+    ----------
+    fn : callable
+        Model to handle. Default None.
+
+    n_positive : array-like
+        Number of positive wells in each group,
+        indexed like the model's wells.
+
+    n_wells : array-like
+        Number of wells in each group.
+
+    site_name : str
+        Name of the well status sample site.
+        Default "well_status".
+    """
+
+    def __init__(
+        self,
+        fn=None,
+        n_positive=None,
+        n_wells=None,
+        site_name: str = "well_status",
+    ):
+        self.n_positive = jnp.asarray(n_positive)
+        self.n_wells = jnp.asarray(n_wells)
+        self.site_name = site_name
+        super().__init__(fn)
+
+    def process_message(self, msg):
+        if msg["type"] != "sample" or msg["name"] != self.site_name:
+            return
+        msg["fn"] = get_binomial_likelihood(msg["fn"], self.n_wells)
+        if msg["is_observed"]:
+            msg["value"] = self.n_positive
+
+
+class CompressedWellModel:
+    """
+    Wrap a Pyter model so that it is fit to counts
+    of positive wells, as output by compress_well_data(),
+    using WellCountLikelihood. Other attributes are
+    those of the wrapped model.
+
+    Parameters
+    ----------
+    base_model :
+        Pyter model, set up with data with one
+        "well" per group of exchangeable wells.
+
+    n_positive : array-like
+        Number of positive wells in each group.
+
+    n_wells : array-like
+        Number of wells in each group.
+
+    well_data :
+        Pyter data with one row per well, for
+        predictive checks of the individual wells.
+        Default None.
+    """
+
+    def __init__(self, base_model, n_positive, n_wells, well_data=None):
+        self.base_model = base_model
+        self.n_positive = n_positive
+        self.n_wells = n_wells
+        self.well_data = well_data
+
+    def __getattr__(self, name):
+        # guard against recursion before base_model
+        # is set, e.g. when unpickling
+        if name == "base_model":
+            raise AttributeError(name)
+        return getattr(self.base_model, name)
+
+    def model(self, *args, **kwargs):
+        """
+        The numpyro model of the wrapped Pyter
+        model, with the binomial well count likelihood.
+        """
+        with WellCountLikelihood(
+            n_positive=self.n_positive, n_wells=self.n_wells
+        ):
+            return self.base_model.model(*args, **kwargs)
+